@@ -27,7 +27,11 @@ with DAG(
     # 2️⃣ Splitting task
     split = BashOperator(
         task_id="split_sroie",
-        bash_command="python /opt/airflow/src/split_data.py"
+        bash_command=(
+            "cd /opt/airflow && python src/split_data.py"
+            " --input data/processed/sroie_cleaned.csv --where has_all=True"
+            " --key-column label_path --output-dir data/splits/sroie"
+        )
     )
 
     # 3️⃣ Optional: DVC push (if remote storage configured)
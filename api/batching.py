@@ -0,0 +1,149 @@
+"""
+Dynamic Micro-Batching
+Coalesces concurrent single-row predictions into one model call
+"""
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Queue single feature rows and score them together
+
+    Rows are collected until either `max_batch_size` items are queued or
+    `max_wait_ms` has elapsed since the first row of the batch arrived.
+    The combined matrix is scored with one `predict_fn` call (run on the
+    default executor so the event loop stays responsive) and each caller's
+    future is resolved with its own row of the result.
+    """
+
+    def __init__(self, predict_fn: Callable[[np.ndarray], np.ndarray],
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # Rows taken off the queue whose futures are not resolved yet
+        self._in_flight: List[Tuple[np.ndarray, asyncio.Future, float]] = []
+
+        # Power-of-two batch size buckets: 1, 2, 4, ... >= max_batch_size
+        self._bucket_bounds = []
+        bound = 1
+        while bound < max_batch_size:
+            self._bucket_bounds.append(bound)
+            bound *= 2
+        self._bucket_bounds.append(max_batch_size)
+        self._bucket_counts = [0] * len(self._bucket_bounds)
+        self._batches = 0
+        self._items = 0
+        self._latency_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    async def start(self):
+        """Start the background batching loop on the running event loop"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the batching loop, failing any rows still queued or being scored"""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        pending = self._in_flight
+        self._in_flight = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        self._fail(pending, RuntimeError("Micro-batcher stopped"))
+
+    async def submit(self, row: np.ndarray) -> np.ndarray:
+        """Queue one feature row and wait for its prediction row"""
+        if not self.running:
+            raise RuntimeError("Micro-batcher is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> List[Tuple[np.ndarray, asyncio.Future, float]]:
+        # Collected straight into _in_flight so stop() can fail a partial batch
+        batch = self._in_flight = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            try:
+                # Mismatched rows fail here, and only this batch
+                rows = np.vstack([row for row, _, _ in batch])
+                outputs = await loop.run_in_executor(None, self.predict_fn, rows)
+                if len(outputs) != len(batch):
+                    raise ValueError(f"predict_fn returned {len(outputs)} rows for a batch of {len(batch)}")
+            except Exception as e:
+                self._fail(batch, e)
+                self._in_flight = []
+                continue
+
+            self._record(batch)
+            for i, (_, future, _) in enumerate(batch):
+                if not future.done():
+                    future.set_result(outputs[i])
+            self._in_flight = []
+
+    @staticmethod
+    def _fail(batch, error: BaseException):
+        for _, future, _ in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    def _record(self, batch):
+        size = len(batch)
+        now = time.perf_counter()
+        for i, bound in enumerate(self._bucket_bounds):
+            if size <= bound:
+                self._bucket_counts[i] += 1
+                break
+        self._batches += 1
+        self._items += size
+        self._latency_seconds += sum(now - enqueued for _, _, enqueued in batch)
+
+    def stats(self) -> Dict:
+        """Batch-size histogram and queueing summary"""
+        return {
+            "enabled": True,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches": self._batches,
+            "items": self._items,
+            "mean_batch_size": self._items / self._batches if self._batches else 0.0,
+            "mean_item_latency_ms": 1000.0 * self._latency_seconds / self._items if self._items else 0.0,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "batch_size_histogram": {
+                f"le_{bound}": count
+                for bound, count in zip(self._bucket_bounds, self._bucket_counts)
+            }
+        }
@@ -2,14 +2,30 @@
 FastAPI Inference Service
 Serves trained model predictions
 """
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-import joblib
+from fastapi import FastAPI, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+from typing import Any, Dict, List, Optional, Union
 import numpy as np
 from pathlib import Path
-import json
+import os
+import sys
+import time
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from api.batching import MicroBatcher
+from api.metrics import CONTENT_TYPE, Gauge, MetricsMiddleware, ServiceMetrics, record_stages
+from api.model_registry import ModelRegistry
+from api.prediction_cache import PredictionCache
+from api.request_log import RequestLogger
+from src.features import RAW_FEATURES, records_matrix
+
 # Initialize FastAPI
 app = FastAPI(
     title="LedgerX Document Quality Prediction API",
@@ -17,13 +33,67 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# Load model and scaler
-MODEL_DIR = Path("models")
-model = joblib.load(MODEL_DIR / "baseline_model.pkl")
-scaler = joblib.load(MODEL_DIR / "scaler.pkl")
+# In-process cache of /predict outputs; PREDICTION_CACHE_SIZE=0 disables it
+prediction_cache = PredictionCache(
+    max_entries=int(os.environ.get("PREDICTION_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.environ.get("PREDICTION_CACHE_TTL_SECONDS", "300"))
+)
+
+# Model artifacts are owned by the registry and swapped atomically on reload.
+# MODEL_LOAD_MODE=lazy loads in the background after startup so /health answers
+# immediately; MODEL_MMAP=true memory-maps array artifacts so workers share pages.
+MODEL_DIR = Path(os.environ.get("MODEL_DIR", "models"))
+MODEL_WATCH_INTERVAL_SECONDS = float(os.environ.get("MODEL_WATCH_INTERVAL_SECONDS", "0"))
+MODEL_LOAD_MODE = os.environ.get("MODEL_LOAD_MODE", "eager").lower()
+MODEL_MMAP = os.environ.get("MODEL_MMAP", "false").lower() in ("1", "true", "yes")
+registry = ModelRegistry(MODEL_DIR, mmap_mode="r" if MODEL_MMAP else None)
+registry.add_listener(lambda bundle: prediction_cache.invalidate())
+if MODEL_LOAD_MODE != "lazy":
+    registry.reload(force=True)
+
+# Upper bound on documents accepted by /predict/batch
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", "1000"))
+
+# Opt-in dynamic micro-batching of concurrent /predict calls
+MICROBATCH_ENABLED = os.environ.get("MICROBATCH_ENABLED", "false").lower() in ("1", "true", "yes")
+MICROBATCH_MAX_SIZE = int(os.environ.get("MICROBATCH_MAX_SIZE", "32"))
+MICROBATCH_MAX_WAIT_MS = float(os.environ.get("MICROBATCH_MAX_WAIT_MS", "5"))
+batcher: Optional[MicroBatcher] = None
 
-with open(MODEL_DIR / "model_metadata.json") as f:
-    model_metadata = json.load(f)
+# Opt-in request telemetry: inputs, outputs and stage timings appended to rotated
+# JSONL segments under REQUEST_LOG_DIR by a background thread (src/drift_monitor.py reads them)
+REQUEST_LOG_ENABLED = os.environ.get("REQUEST_LOG_ENABLED", "false").lower() in ("1", "true", "yes")
+request_logger: Optional[RequestLogger] = None
+if REQUEST_LOG_ENABLED:
+    request_logger = RequestLogger(
+        os.environ.get("REQUEST_LOG_DIR", "logs/requests"),
+        segment_max_bytes=int(float(os.environ.get("REQUEST_LOG_SEGMENT_MB", "64")) * 2**20)
+    )
+
+# Prometheus /metrics: request counts, errors and per-stage latency histograms
+# recorded by an ASGI middleware into per-thread shards; METRICS_ENABLED=false removes it
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+metrics: Optional[ServiceMetrics] = None
+if METRICS_ENABLED:
+    metrics = ServiceMetrics(
+        model_info=lambda: {
+            (registry.current.version, registry.current.metadata.get("model_type", "unknown")): 1
+        } if registry.loaded else None,
+        extra=[
+            Gauge("ledgerx_prediction_cache_hits_total", "Prediction cache hits",
+                  lambda: prediction_cache.hits, metric_type="counter"),
+            Gauge("ledgerx_prediction_cache_misses_total", "Prediction cache misses",
+                  lambda: prediction_cache.misses, metric_type="counter"),
+        ]
+    )
+    app.add_middleware(MetricsMiddleware, metrics=metrics, routes=app.routes, excluded=("/metrics",))
+
+# /predict serializes straight to JSON bytes with orjson, skipping response-model
+# validation; PREDICT_FAST_RESPONSE=false (or no orjson) restores the Pydantic path
+PREDICT_FAST_RESPONSE = (
+    orjson is not None
+    and os.environ.get("PREDICT_FAST_RESPONSE", "true").lower() in ("1", "true", "yes")
+)
 
 # Request model
 class DocumentMetadata(BaseModel):
@@ -48,71 +118,344 @@ class DocumentMetadata(BaseModel):
 class PredictionResponse(BaseModel):
     predicted_class: str
     confidence: float
-    probabilities: dict
+    probabilities: Union[dict, List[float]]
+    timestamp: str
+    model_version: str
+
+# Batch request/response models
+class BatchPredictionRequest(BaseModel):
+    """Row-oriented (`documents`) or columnar (`columns`) batch payload"""
+    documents: Optional[List[Dict[str, Any]]] = None
+    columns: Optional[Dict[str, List[Any]]] = None
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "documents": [
+                    {
+                        "file_size_bytes": 45000,
+                        "image_width": 800,
+                        "image_height": 1000,
+                        "quality_score": 0.65,
+                        "has_blur": False
+                    }
+                ]
+            }
+        }
+
+    def rows(self) -> List[Any]:
+        """Return the payload as a list of per-document rows"""
+        if self.documents is not None and self.columns is not None:
+            raise ValueError("Provide either 'documents' or 'columns', not both")
+        if self.documents is not None:
+            return self.documents
+        if self.columns is None:
+            return []
+        lengths = {len(values) for values in self.columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("All columns must have the same length")
+        n_rows = lengths.pop() if lengths else 0
+        names = list(self.columns)
+        return [{name: self.columns[name][i] for name in names} for i in range(n_rows)]
+
+class BatchItemResult(BaseModel):
+    index: int
+    predicted_class: Optional[str] = None
+    confidence: Optional[float] = None
+    probabilities: Optional[dict] = None
+    error: Optional[str] = None
+
+class BatchPredictionResponse(BaseModel):
+    results: List[BatchItemResult]
+    n_succeeded: int
+    n_failed: int
     timestamp: str
     model_version: str
 
+def build_feature_matrix(docs: List[DocumentMetadata]) -> np.ndarray:
+    """Build the (n, 8) feature matrix for a list of documents in one pass"""
+    return records_matrix(docs)
+
+def current_bundle():
+    """Current model bundle, or 503 while the initial load is still running"""
+    if not registry.loaded:
+        raise HTTPException(status_code=503, detail="Model is still loading")
+    return registry.current
+
+def score_features(features: np.ndarray) -> List[tuple]:
+    """(bundle, probabilities) per row of a raw (unscaled) feature matrix
+
+    The micro-batcher scores a batch with whatever bundle is current when
+    it runs, so each row carries the bundle that produced it.
+    """
+    bundle = registry.current
+    return [(bundle, row) for row in bundle.predict_proba(features)]
+
+def validate_batch_item(row: Any) -> DocumentMetadata:
+    """Validate one batch row, raising ValueError with a readable message"""
+    try:
+        doc = DocumentMetadata.model_validate(row)
+    except ValidationError as e:
+        raise ValueError("; ".join(
+            f"{'.'.join(str(loc) for loc in err['loc']) or 'document'}: {err['msg']}"
+            for err in e.errors()
+        ))
+    if doc.image_width <= 0 or doc.image_height <= 0:
+        raise ValueError("image_width and image_height must be positive")
+    return doc
+
+@app.on_event("startup")
+async def start_background_services():
+    global batcher
+    if MODEL_LOAD_MODE == "lazy":
+        registry.load_in_background()
+    registry.start_watching(MODEL_WATCH_INTERVAL_SECONDS)
+    if request_logger is not None:
+        request_logger.start()
+    if MICROBATCH_ENABLED:
+        batcher = MicroBatcher(
+            score_features,
+            max_batch_size=MICROBATCH_MAX_SIZE,
+            max_wait_ms=MICROBATCH_MAX_WAIT_MS
+        )
+        await batcher.start()
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    global batcher
+    registry.stop_watching()
+    if request_logger is not None:
+        request_logger.stop()
+    if batcher is not None:
+        await batcher.stop()
+        batcher = None
+
 @app.get("/")
 def root():
     """Health check endpoint"""
+    metadata = current_bundle().metadata
     return {
         "status": "healthy",
         "service": "LedgerX Inference API",
         "version": "1.0.0",
-        "model_type": model_metadata["model_type"],
-        "trained_date": model_metadata["trained_date"]
+        "model_type": metadata["model_type"],
+        "trained_date": metadata["trained_date"]
     }
 
 @app.get("/health")
 def health():
-    """Detailed health check"""
+    """Detailed health check; answers before the model has finished loading"""
+    if not registry.loaded:
+        return {
+            "status": "loading",
+            "model_loaded": False,
+            "scaler_loaded": False,
+            "model_version": None,
+            "timestamp": datetime.now().isoformat()
+        }
+    bundle = registry.current
     return {
         "status": "healthy",
-        "model_loaded": model is not None,
-        "scaler_loaded": scaler is not None,
+        "model_loaded": bundle.model is not None,
+        "scaler_loaded": bundle.scaler is not None or bundle.scaler_folded,
+        "model_version": bundle.version,
         "timestamp": datetime.now().isoformat()
     }
 
 @app.get("/model/info")
 def model_info():
     """Get model metadata"""
-    return model_metadata
+    return current_bundle().metadata
+
+@app.post("/admin/reload")
+def admin_reload(force: bool = False):
+    """Reload model artifacts from MODEL_DIR and swap them in atomically"""
+    result = registry.reload(force=force)
+    result["registry"] = registry.status()
+    return result
 
 @app.post("/predict", response_model=PredictionResponse)
-def predict(data: DocumentMetadata):
-    """Predict document quality class"""
+async def predict(
+    data: DocumentMetadata,
+    probability_format: str = Query("dict", alias="probabilities", pattern="^(dict|array)$")
+):
+    """Predict document quality class
+
+    `?probabilities=array` returns the probabilities as a list in the
+    fixed order of the model metadata's `classes` (see /model/info)
+    instead of a class-keyed object.
+    """
+    start = time.perf_counter()
+    bundle = current_bundle()
     try:
-        # Prepare features
-        features = np.array([[
-            data.file_size_bytes,
-            data.image_width,
-            data.image_height,
-            data.quality_score,
-            int(data.has_blur),
-            data.image_width / data.image_height,
-            data.image_width * data.image_height,
-            data.file_size_bytes / (data.image_width * data.image_height)
-        ]])
+        fields = data.model_dump()
+        cache_key = PredictionCache.make_key(bundle.version, fields)
+        probabilities = prediction_cache.get(cache_key)
+        cache_hit = probabilities is not None
+        timings = {}
+        if not cache_hit:
+            features = build_feature_matrix([data])
+            features_at = time.perf_counter()
+            timings["features_ms"] = (features_at - start) * 1e3
+            if batcher is not None:
+                scored_by, probabilities = await batcher.submit(features[0])
+                if scored_by is not bundle:
+                    # A reload landed before the batch ran: label and cache with the model that scored it
+                    bundle = scored_by
+                    cache_key = PredictionCache.make_key(bundle.version, fields)
+                # Includes the time spent waiting for the micro-batch to fill
+                timings["predict_ms"] = (time.perf_counter() - features_at) * 1e3
+            else:
+                probabilities = (await run_in_threadpool(bundle.predict_proba, features, timings))[0]
+            prediction_cache.put(cache_key, probabilities)
         
-        features_scaled = scaler.transform(features)
-        prediction = model.predict(features_scaled)[0]
-        probabilities = model.predict_proba(features_scaled)[0]
+        values = probabilities.tolist()
+        best = int(probabilities.argmax())
+        if probability_format == "array":
+            prob_out = [values[i] for i in bundle.class_order]
+        else:
+            prob_out = dict(zip(bundle.classes, values))
         
-        classes = model.classes_
-        prob_dict = {cls: float(prob) for cls, prob in zip(classes, probabilities)}
-        confidence = float(max(probabilities))
+        if request_logger is not None:
+            timings["total_ms"] = (time.perf_counter() - start) * 1e3
+            request_logger.log({
+                "ts": time.time(),
+                "endpoint": "/predict",
+                "model_version": bundle.version,
+                "cache_hit": cache_hit,
+                "inputs": fields,
+                "predicted_class": bundle.classes[best],
+                "probabilities": dict(zip(bundle.classes, values)),
+                "timings_ms": timings
+            })
+        if metrics is not None:
+            metrics.predictions.inc(("/predict", bundle.version, bundle.classes[best]))
+            record_stages(start, timings)
+        
+        if PREDICT_FAST_RESPONSE:
+            # orjson formats the naive datetime exactly like isoformat()
+            return Response(orjson.dumps({
+                "predicted_class": bundle.classes[best],
+                "confidence": values[best],
+                "probabilities": prob_out,
+                "timestamp": datetime.now(),
+                "model_version": bundle.version
+            }), media_type="application/json")
         
         return PredictionResponse(
-            predicted_class=str(prediction),
-            confidence=confidence,
-            probabilities=prob_dict,
+            predicted_class=bundle.classes[best],
+            confidence=values[best],
+            probabilities=prob_out,
             timestamp=datetime.now().isoformat(),
-            model_version="1.0.0"
+            model_version=bundle.version
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/cache/stats")
+def cache_stats():
+    """Prediction cache hit/miss/eviction counters"""
+    return prediction_cache.stats()
+
+@app.get("/telemetry/stats")
+def telemetry_stats():
+    """Request-log queue and writer counters"""
+    if request_logger is None:
+        return {"enabled": False}
+    return request_logger.stats()
+
+@app.get("/batching/stats")
+def batching_stats():
+    """Micro-batching batch-size histogram and queueing summary"""
+    if batcher is None:
+        return {"enabled": False}
+    return batcher.stats()
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus text exposition of the service metrics"""
+    if metrics is None:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS_ENABLED=false)")
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
+
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+def predict_batch(request: BatchPredictionRequest):
+    """Predict document quality classes for a batch of documents
+
+    Invalid items are reported individually and do not fail the batch;
+    results are returned in request order.
+    """
+    try:
+        rows = request.rows()
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    if len(rows) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {len(rows)} documents exceeds MAX_BATCH_SIZE={MAX_BATCH_SIZE}"
+        )
+
+    handler_start = time.perf_counter()
+    bundle = current_bundle()
+    results: List[Optional[BatchItemResult]] = [None] * len(rows)
+    valid_docs = []
+    valid_index = []
+    for i, row in enumerate(rows):
+        try:
+            valid_docs.append(validate_batch_item(row))
+            valid_index.append(i)
+        except ValueError as e:
+            results[i] = BatchItemResult(index=i, error=str(e))
+
+    start = time.perf_counter()
+    timings = {"validation_ms": (start - handler_start) * 1e3}
+    if valid_docs:
+        try:
+            features = build_feature_matrix(valid_docs)
+            timings["features_ms"] = (time.perf_counter() - start) * 1e3
+            probabilities = bundle.predict_proba(features, timings)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        if request_logger is not None:
+            timings["total_ms"] = (time.perf_counter() - start) * 1e3
+            # One columnar record per batch; the writer thread serializes the arrays
+            request_logger.log({
+                "ts": time.time(),
+                "endpoint": "/predict/batch",
+                "model_version": bundle.version,
+                "batch_size": len(valid_docs),
+                "inputs": {name: features[:, i].copy() for i, name in enumerate(RAW_FEATURES)},
+                "predicted_class": [bundle.classes[i] for i in probabilities.argmax(axis=1).tolist()],
+                "probabilities": {name: probabilities[:, i].copy() for i, name in enumerate(bundle.classes)},
+                "timings_ms": timings
+            })
+
+        classes = bundle.classes
+        best = probabilities.argmax(axis=1)
+        for row_probs, best_idx, i in zip(probabilities.tolist(), best.tolist(), valid_index):
+            results[i] = BatchItemResult(
+                index=i,
+                predicted_class=classes[best_idx],
+                confidence=row_probs[best_idx],
+                probabilities=dict(zip(classes, row_probs))
+            )
+        if metrics is not None:
+            for class_index, count in enumerate(np.bincount(best, minlength=len(classes)).tolist()):
+                if count:
+                    metrics.predictions.inc(("/predict/batch", bundle.version, classes[class_index]), count)
+
+    if metrics is not None:
+        record_stages(handler_start, timings)
+    return BatchPredictionResponse(
+        results=results,
+        n_succeeded=len(valid_docs),
+        n_failed=len(rows) - len(valid_docs),
+        timestamp=datetime.now().isoformat(),
+        model_version=bundle.version
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
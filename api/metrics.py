@@ -0,0 +1,388 @@
+"""
+Service Metrics
+Prometheus text-format counters and histograms with per-thread shards, plus
+an ASGI middleware that times every request stage
+"""
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+Labels = Tuple[str, ...]
+
+# Seconds; tuned for a sub-millisecond model behind a ~1 ms HTTP stack
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                   0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+STAGES = ("validation", "features", "scale", "predict", "serialization")
+NAN = float("nan")
+NO_STAGES = (NAN,) * len(STAGES)
+# Starlette appends "; charset=utf-8" to text/* media types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+class _Shards:
+    """One accumulator per thread, merged only when metrics are scraped
+
+    Each shard is written by a single thread, so recording needs no lock;
+    the lock is only taken the first time a thread records anything.
+    Shards are keyed by thread ident, which the OS reuses, so a threadpool
+    that recycles workers does not grow the table (a dead thread's shard
+    simply passes to its successor).
+    """
+
+    def __init__(self, factory: Callable):
+        self._factory = factory
+        self._shards: Dict[int, Dict] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def local(self) -> Dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            with self._lock:
+                shard = self._shards.setdefault(threading.get_ident(), self._factory())
+            self._local.shard = shard
+            return shard
+
+    def all(self) -> List[Dict]:
+        with self._lock:
+            return list(self._shards.values())
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._shards = _Shards(dict)
+
+    def inc(self, labels: Labels = (), amount: float = 1):
+        shard = self._shards.local()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def values(self) -> Dict[Labels, float]:
+        merged: Dict[Labels, float] = {}
+        for shard in self._shards.all():
+            for labels, value in list(shard.items()):
+                merged[labels] = merged.get(labels, 0) + value
+        return merged
+
+    def render(self) -> List[str]:
+        return _counter_lines(self.name, self.documentation, self.labelnames, self.values())
+
+
+class RequestMetrics:
+    """Request counts, errors, latency and per-stage histograms
+
+    `record` only appends the request's row (key id, total latency and
+    the `STAGES` durations) to the calling thread's buffer. Buffers are
+    folded into the bucket counts with NumPy once they hold `fold_every`
+    rows, and every buffer is drained when metrics are scraped, so the
+    per-request cost is a dict lookup and a list append while bucketing
+    runs vectorised.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS, fold_every: int = 1024):
+        self.buckets = np.asarray(sorted(buckets), dtype=np.float64)
+        self.fold_every = fold_every
+        self._buffers = _Shards(list)
+        self._lock = threading.Lock()
+        self._key_ids: Dict[Tuple[str, str, int], int] = {}
+        self._keys: List[Tuple[str, str, int]] = []
+        # (key, series, bucket) counts and (key, series) sums; series 0 is the total latency
+        self._counts = np.zeros((0, len(STAGES) + 1, len(self.buckets) + 1), dtype=np.int64)
+        self._sums = np.zeros((0, len(STAGES) + 1))
+
+    def record(self, endpoint: str, method: str, status: int, latency: float,
+               stages: Tuple[float, ...] = NO_STAGES):
+        """`stages` are seconds in `STAGES` order; NaN marks a stage that did not run"""
+        key = (endpoint, method, status)
+        key_id = self._key_ids.get(key)
+        if key_id is None:
+            key_id = self._register(key)
+        buffer = self._buffers.local()
+        buffer.append((key_id, latency) + stages)
+        if len(buffer) >= self.fold_every:
+            self._fold([buffer])
+
+    def _register(self, key) -> int:
+        with self._lock:
+            key_id = self._key_ids.get(key)
+            if key_id is None:
+                key_id = len(self._keys)
+                self._keys.append(key)
+                self._key_ids[key] = key_id
+            return key_id
+
+    def _fold(self, buffers: List[List]):
+        with self._lock:
+            rows = []
+            for buffer in buffers:
+                # Owners only ever append, so draining a prefix is safe without their cooperation
+                n = len(buffer)
+                rows.extend(buffer[:n])
+                del buffer[:n]
+            if not rows:
+                return
+            n_keys = len(self._keys)
+            if n_keys > len(self._counts):
+                grow = n_keys - len(self._counts)
+                self._counts = np.concatenate([self._counts, np.zeros((grow,) + self._counts.shape[1:], np.int64)])
+                self._sums = np.concatenate([self._sums, np.zeros((grow,) + self._sums.shape[1:])])
+            table = np.array(rows, dtype=np.float64)
+            key_ids = table[:, 0].astype(np.int64)
+            values = table[:, 1:]
+            n_series, width = self._counts.shape[1:]
+            observed = ~np.isnan(values)
+            series = key_ids[:, None] * n_series + np.arange(n_series)
+            cells = series * width + np.searchsorted(self.buckets, values, side="left")
+            self._counts += np.bincount(cells[observed], minlength=self._counts.size).reshape(self._counts.shape)
+            self._sums += np.bincount(series[observed], weights=values[observed],
+                                      minlength=self._sums.size).reshape(self._sums.shape)
+
+    def values(self) -> Tuple[List[Tuple[str, str, int]], np.ndarray, np.ndarray]:
+        """(keys, bucket counts, sums) after draining every thread's buffer"""
+        self._fold(self._buffers.all())
+        with self._lock:
+            return list(self._keys), self._counts.copy(), self._sums.copy()
+
+    def render(self) -> List[str]:
+        keys, counts, sums = self.values()
+        buckets = tuple(self.buckets.tolist())
+        requests: Dict[Labels, float] = {}
+        errors: Dict[Labels, float] = {}
+        latency: Dict[Labels, Tuple[List[int], float]] = {}
+        stages: Dict[Labels, Tuple[List[int], float]] = {}
+        for (endpoint, method, status), key_counts, key_sums in zip(keys, counts.tolist(), sums.tolist()):
+            total = sum(key_counts[0])
+            requests[(endpoint, method, str(status))] = total
+            if status >= 400:
+                errors[(endpoint, str(status))] = errors.get((endpoint, str(status)), 0) + total
+            _add_histogram(latency, (endpoint,), key_counts[0], key_sums[0])
+            for stage, run, stage_sum in zip(STAGES, key_counts[1:], key_sums[1:]):
+                if any(run):
+                    _add_histogram(stages, (endpoint, stage), run, stage_sum)
+        return (
+            _counter_lines("ledgerx_http_requests_total", "HTTP requests handled",
+                           ("endpoint", "method", "status"), requests)
+            + _counter_lines("ledgerx_http_request_errors_total", "HTTP requests answered with a 4xx/5xx status",
+                             ("endpoint", "status"), errors)
+            + _histogram_lines("ledgerx_http_request_duration_seconds", "Time from request start to response start",
+                               ("endpoint",), buckets, latency)
+            + _histogram_lines("ledgerx_stage_duration_seconds", "Time spent per inference stage",
+                               ("endpoint", "stage"), buckets, stages)
+        )
+
+
+def _add_histogram(histograms: Dict, labels: Labels, counts: List[int], total: float):
+    previous = histograms.get(labels)
+    if previous is None:
+        histograms[labels] = (list(counts), total)
+    else:
+        histograms[labels] = ([a + b for a, b in zip(previous[0], counts)], previous[1] + total)
+
+
+def _counter_lines(name: str, documentation: str, labelnames: Sequence[str], values: Dict) -> List[str]:
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} counter"]
+    for labels, value in sorted(values.items()):
+        lines.append(f"{name}{_labels(labelnames, labels)} {_number(value)}")
+    return lines
+
+
+def _histogram_lines(name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float],
+                     values: Dict) -> List[str]:
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} histogram"]
+    names = tuple(labelnames) + ("le",)
+    for labels, (counts, total) in sorted(values.items()):
+        cumulative = 0
+        for bound, count in zip(tuple(buckets) + (float("inf"),), counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(names, labels + (_number(bound),))} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labelnames, labels)} {_number(total)}")
+        lines.append(f"{name}_count{_labels(labelnames, labels)} {cumulative}")
+    return lines
+
+
+class Gauge:
+    """Value read from `callback` at scrape time: a number or {labels: number}
+
+    `metric_type="counter"` exposes a total some other component already
+    keeps (e.g. the prediction cache's hit count) without double counting.
+    """
+
+    def __init__(self, name: str, documentation: str, callback: Callable, labelnames: Sequence[str] = (),
+                 metric_type: str = "gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self.metric_type = metric_type
+
+    def render(self) -> List[str]:
+        value = self.callback()
+        if value is None:
+            return []
+        values = value if isinstance(value, dict) else {(): value}
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for labels, number in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(number)}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Labels) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def resident_memory_bytes() -> Optional[int]:
+    """Current RSS from /proc, else the peak RSS getrusage reports"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Stage timings of the request being handled; the middleware sets a fresh
+# dict per request and handlers fill it in through `record_stages`
+_request_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_stages", default=None)
+
+
+def record_stages(handler_start: float, timings: Dict[str, float]):
+    """Hand a handler's stage timings (milliseconds) to the metrics middleware
+
+    `handler_start` is the perf_counter reading on entering the handler;
+    everything before it (body read, parsing, Pydantic validation) is
+    counted as validation, and everything after this call until the
+    response starts as serialization. A no-op outside the middleware.
+    """
+    stages = _request_stages.get()
+    if stages is None:
+        return
+    stages.update(timings, handler_start=handler_start, handler_done=time.perf_counter())
+
+
+class ServiceMetrics:
+    """The inference service's metrics and their exposition"""
+
+    def __init__(self, model_info: Callable[[], Optional[Dict[Labels, float]]] = lambda: None,
+                 extra: Iterable = ()):
+        self.started_at = time.time()
+        self.registry = MetricsRegistry()
+        self.requests = self.registry.register(RequestMetrics())
+        self.predictions = self.registry.register(Counter(
+            "ledgerx_predictions_total", "Documents scored", ("endpoint", "model_version", "predicted_class")))
+        self.registry.register(Gauge("ledgerx_model_info", "Loaded model (value is always 1)",
+                                     model_info, ("model_version", "model_type")))
+        for metric in extra:
+            self.registry.register(metric)
+        self.registry.register(Gauge("process_resident_memory_bytes", "Resident memory size in bytes",
+                                     resident_memory_bytes))
+        self.registry.register(Gauge("process_cpu_seconds_total", "User and system CPU time in seconds",
+                                     lambda: sum(os.times()[:2]), metric_type="counter"))
+        self.registry.register(Gauge("process_start_time_seconds", "Start time since the epoch in seconds",
+                                     lambda: self.started_at))
+
+    def render(self) -> str:
+        return self.registry.render()
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request counts, errors and stage latencies
+
+    Paths that are not routes of the app are counted as "other" so stray
+    URLs cannot blow up label cardinality. `excluded` paths (the scrape
+    endpoint itself) are not recorded.
+    """
+
+    def __init__(self, app, metrics: ServiceMetrics, routes: Iterable = (), excluded: Iterable[str] = ()):
+        self.app = app
+        self.metrics = metrics
+        self.routes = routes
+        self.excluded = frozenset(excluded)
+        self._paths: Optional[frozenset] = None
+
+    def _endpoint(self, path: str) -> str:
+        if self._paths is None:
+            self._paths = frozenset(getattr(route, "path", None) for route in self.routes)
+        return path if path in self._paths else "other"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.excluded:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        stages: Dict[str, float] = {}
+        token = _request_stages.set(stages)
+        response = {"status": 500, "at": None}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["at"] = time.perf_counter()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stages.reset(token)
+            self._record(scope, start, stages, response["status"], response["at"] or time.perf_counter())
+
+    def _record(self, scope, start: float, stages: Dict[str, float], status: int, responded_at: float):
+        handler_start = stages.get("handler_start")
+        if handler_start is None:
+            values = NO_STAGES
+        else:
+            # Handlers report milliseconds (shared with the request log); Prometheus wants seconds
+            values = (
+                handler_start - start + stages.get("validation_ms", 0.0) * 1e-3,
+                stages.get("features_ms", NAN) * 1e-3,
+                stages.get("scale_ms", NAN) * 1e-3,
+                stages.get("predict_ms", NAN) * 1e-3,
+                max(responded_at - stages["handler_done"], 0.0),
+            )
+        self.metrics.requests.record(self._endpoint(scope["path"]), scope["method"], status,
+                                     responded_at - start, values)
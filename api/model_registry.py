@@ -0,0 +1,260 @@
+"""
+Model Registry
+Loads, validates and atomically swaps the serving model artifacts
+"""
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.model_export import load_inference_model
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_MODEL_NAME = "baseline_model_fused"
+
+# Raw feature row used to smoke-test a freshly loaded bundle
+WARMUP_FEATURES = np.array([[45000, 800, 1000, 0.65, 0, 0.8, 800000, 0.05625]], dtype=np.float64)
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    """Model, scaler and metadata that were loaded and validated together
+
+    Request handlers read `registry.current` once and use that bundle for
+    the whole request, so a concurrent swap can never pair a new scaler
+    with an old model. `scaler` is None when it is folded into the model.
+    """
+    model: Any
+    scaler: Any
+    metadata: Dict
+    version: str
+    fingerprint: Tuple
+    loaded_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    # Derived once at load so request handlers never rebuild them
+    classes: Tuple[str, ...] = field(init=False)
+    ordered_classes: Tuple[str, ...] = field(init=False)
+    class_order: Tuple[int, ...] = field(init=False)
+
+    def __post_init__(self):
+        # `classes` is the model's probability column order; `ordered_classes`
+        # is the metadata's (low, medium, high) order used for array responses
+        classes = tuple(str(c) for c in self.model.classes_)
+        expected = tuple(str(c) for c in self.metadata.get("classes") or ())
+        ordered = expected if sorted(expected) == sorted(classes) else classes
+        object.__setattr__(self, "classes", classes)
+        object.__setattr__(self, "ordered_classes", ordered)
+        object.__setattr__(self, "class_order", tuple(classes.index(c) for c in ordered))
+
+    @property
+    def scaler_folded(self) -> bool:
+        return getattr(self.model, "scaler_folded", False)
+
+    def predict_proba(self, features: np.ndarray, timings: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """Class probabilities for a raw (unscaled) feature matrix
+
+        If `timings` is given, the scale and predict stage durations are
+        stored in it in milliseconds (scale is 0 when the scaler is folded).
+        """
+        start = time.perf_counter()
+        scaled = features if self.scaler_folded else self.scaler.transform(features)
+        scaled_at = time.perf_counter()
+        probabilities = self.model.predict_proba(scaled)
+        if timings is not None:
+            timings["scale_ms"] = (scaled_at - start) * 1e3
+            timings["predict_ms"] = (time.perf_counter() - scaled_at) * 1e3
+        return probabilities
+
+
+class ModelRegistry:
+    """Owns the current ModelBundle and replaces it without downtime
+
+    `reload` builds a complete new bundle off to the side, runs a warm-up
+    prediction, and only then swaps the `current` reference. A failed load
+    keeps serving the previous bundle. `start_watching` polls the model
+    directory and reloads when any artifact's size or mtime changes.
+
+    Fused array artifacts are loaded without importing joblib or sklearn,
+    optionally memory-mapped (`mmap_mode="r"`) so worker processes share
+    one page-cached copy of the model.
+    """
+
+    def __init__(self, model_dir="models", mmap_mode: Optional[str] = None):
+        self.model_dir = Path(model_dir)
+        self.mmap_mode = mmap_mode
+        self._current: Optional[ModelBundle] = None
+        self._reload_lock = threading.Lock()
+        self._listeners: List[Callable[[ModelBundle], None]] = []
+        self._watcher: Optional[threading.Thread] = None
+        self._loader: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def current(self) -> ModelBundle:
+        bundle = self._current
+        if bundle is None:
+            raise RuntimeError("No model loaded")
+        return bundle
+
+    @property
+    def loaded(self) -> bool:
+        return self._current is not None
+
+    def add_listener(self, callback: Callable[[ModelBundle], None]):
+        """Call `callback(new_bundle)` after every successful swap"""
+        self._listeners.append(callback)
+
+    def fingerprint(self) -> Tuple:
+        """Size and mtime of every file under the model directory"""
+        entries = []
+        for path in sorted(self.model_dir.rglob("*")):
+            if path.is_file():
+                stat = path.stat()
+                entries.append((str(path.relative_to(self.model_dir)), stat.st_size, stat.st_mtime_ns))
+        return tuple(entries)
+
+    def load_bundle(self) -> ModelBundle:
+        """Load and validate a new bundle without touching the current one"""
+        fingerprint = self.fingerprint()
+
+        with open(self.model_dir / "model_metadata.json") as f:
+            metadata = json.load(f)
+
+        inference_dir = self.model_dir / metadata.get("inference_model", INFERENCE_MODEL_NAME)
+        if inference_dir.exists():
+            model = load_inference_model(inference_dir, mmap_mode=self.mmap_mode)
+        else:
+            model = self._unpickle("baseline_model.pkl")
+        scaler = None
+        if not getattr(model, "scaler_folded", False):
+            scaler = self._unpickle("scaler.pkl")
+
+        if self.fingerprint() != fingerprint:
+            raise RuntimeError("Model directory changed while loading; retry later")
+
+        bundle = ModelBundle(
+            model=model,
+            scaler=scaler,
+            metadata=metadata,
+            version=str(metadata.get("trained_date", "unknown")),
+            fingerprint=fingerprint
+        )
+        self.validate(bundle)
+        return bundle
+
+    def _unpickle(self, name: str):
+        # Deferred: importing joblib/sklearn dominates cold start for fused artifacts
+        import joblib
+        return joblib.load(self.model_dir / name)
+
+    def validate(self, bundle: ModelBundle):
+        """Warm-up prediction: checks shapes, probabilities and class labels"""
+        n_features = getattr(bundle.model, "n_features_in_", WARMUP_FEATURES.shape[1])
+        if n_features != WARMUP_FEATURES.shape[1]:
+            raise ValueError(f"Model expects {n_features} features, API builds {WARMUP_FEATURES.shape[1]}")
+        if not bundle.scaler_folded and bundle.scaler.n_features_in_ != n_features:
+            raise ValueError("Scaler and model feature counts differ")
+
+        probabilities = bundle.predict_proba(WARMUP_FEATURES)
+        if probabilities.shape != (1, len(bundle.classes)):
+            raise ValueError(f"Unexpected warm-up output shape {probabilities.shape}")
+        if not np.isfinite(probabilities).all() or abs(probabilities.sum() - 1.0) > 1e-6:
+            raise ValueError("Warm-up probabilities are not a valid distribution")
+
+        expected = bundle.metadata.get("classes")
+        if expected and set(expected) != set(bundle.classes):
+            raise ValueError(f"Model classes {bundle.classes} do not match metadata {expected}")
+
+    def reload(self, force: bool = False) -> Dict:
+        """Load, validate and swap in the artifacts currently on disk"""
+        with self._reload_lock:
+            previous = self._current
+            if not force and previous is not None and previous.fingerprint == self.fingerprint():
+                return {"reloaded": False, "reason": "unchanged", "version": previous.version}
+            try:
+                bundle = self.load_bundle()
+            except Exception as e:
+                self.failed_reloads += 1
+                self.last_error = str(e)
+                logger.error(f"Model reload failed, keeping current model: {e}")
+                if previous is None:
+                    raise
+                return {"reloaded": False, "reason": "error", "error": str(e), "version": previous.version}
+
+            self._current = bundle
+            self.reloads += 1
+            self.last_error = None
+
+        for callback in self._listeners:
+            callback(bundle)
+        logger.info(f"Model {bundle.version} loaded from {self.model_dir}")
+        return {
+            "reloaded": True,
+            "version": bundle.version,
+            "previous_version": previous.version if previous else None
+        }
+
+    def load_in_background(self):
+        """Start the initial load in a daemon thread so the service can answer health checks"""
+        if self._loader is not None or self.loaded:
+            return
+
+        def load():
+            try:
+                self.reload(force=True)
+            except Exception as e:
+                logger.error(f"Initial model load failed: {e}")
+
+        self._loader = threading.Thread(target=load, name="model-registry-loader", daemon=True)
+        self._loader.start()
+
+    def wait_until_loaded(self, timeout: Optional[float] = None) -> bool:
+        if self._loader is not None:
+            self._loader.join(timeout)
+        return self.loaded
+
+    def start_watching(self, interval_seconds: float):
+        """Poll the model directory every `interval_seconds` in a daemon thread"""
+        if self._watcher is not None or interval_seconds <= 0:
+            return
+        self._stop.clear()
+
+        def watch():
+            while not self._stop.wait(interval_seconds):
+                try:
+                    self.reload()
+                except Exception as e:
+                    logger.error(f"Model watcher error: {e}")
+
+        self._watcher = threading.Thread(target=watch, name="model-registry-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        if self._watcher is None:
+            return
+        self._stop.set()
+        self._watcher.join()
+        self._watcher = None
+
+    def status(self) -> Dict:
+        bundle = self._current
+        return {
+            "model_dir": str(self.model_dir),
+            "version": bundle.version if bundle else None,
+            "loaded_at": bundle.loaded_at if bundle else None,
+            "scaler_folded": bundle.scaler_folded if bundle else None,
+            "mmap_mode": self.mmap_mode,
+            "watching": self._watcher is not None,
+            "reloads": self.reloads,
+            "failed_reloads": self.failed_reloads,
+            "last_error": self.last_error
+        }
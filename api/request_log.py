@@ -0,0 +1,176 @@
+"""
+Request Log
+Non-blocking telemetry: request records are queued in memory and written to
+rotated JSONL segments in batches by a background thread
+"""
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SEGMENT_PREFIX = "requests-"
+SEGMENT_SUFFIX = ".jsonl"
+
+
+def _default(value):
+    # Non-contiguous arrays and NumPy scalars orjson cannot take natively
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _dumps(record: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(record, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(record, separators=(",", ":"), default=_default).encode()
+
+
+class RequestLogger:
+    """Background JSONL writer that never blocks or fails a request
+
+    `log` only appends to a bounded queue; when the queue is full the
+    record is dropped and counted rather than slowing the request down.
+    A daemon thread drains the queue in batches of up to `batch_size`
+    records (or whatever arrived within `flush_interval_s`), writes each
+    batch with a single write call, and starts a new segment once the
+    current one exceeds `segment_max_bytes` or `segment_max_seconds`.
+    Segment names carry the start time and pid, so several workers can
+    share one directory.
+    """
+
+    def __init__(self, log_dir="logs/requests", max_queue: int = 10000, batch_size: int = 256,
+                 flush_interval_s: float = 1.0, segment_max_bytes: int = 64 << 20,
+                 segment_max_seconds: float = 3600.0):
+        self.log_dir = Path(log_dir)
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.segment_max_bytes = segment_max_bytes
+        self.segment_max_seconds = segment_max_seconds
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._segment = None
+        self._segment_path: Optional[Path] = None
+        self._segment_started = 0.0
+        self._segment_bytes = 0
+        self.logged = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.segments = 0
+        self.write_errors = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="request-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Flush everything queued so far and close the current segment
+
+        Never raises: the writer checks the stop event between batches, and
+        the None sentinel only wakes it early. If it has not drained the
+        queue within `timeout` it is left to finish as a daemon thread.
+        """
+        if self._thread is None:
+            return
+        self._stopping.set()
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            # A full queue means the writer is not idle waiting for a record
+            pass
+        self._thread.join(timeout)
+        self._thread = None
+
+    def log(self, record: Dict[str, Any]) -> bool:
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.logged += 1
+        return True
+
+    def _open_segment(self):
+        self._close_segment()
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        self._segment_path = self.log_dir / f"{SEGMENT_PREFIX}{stamp}-{os.getpid()}-{self.segments:04d}{SEGMENT_SUFFIX}"
+        self._segment = open(self._segment_path, "ab")
+        self._segment_started = time.monotonic()
+        self._segment_bytes = 0
+        self.segments += 1
+
+    def _close_segment(self):
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+    def _write(self, records):
+        payload = b"".join(_dumps(record) + b"\n" for record in records)
+        if (self._segment is None
+                or self._segment_bytes >= self.segment_max_bytes
+                or time.monotonic() - self._segment_started >= self.segment_max_seconds):
+            self._open_segment()
+        self._segment.write(payload)
+        self._segment.flush()
+        self._segment_bytes += len(payload)
+        self.written += len(records)
+        self.batches += 1
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval_s)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    break
+                continue
+            batch = [] if first is None else [first]
+            while len(batch) < self.batch_size:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is not None:
+                    batch.append(record)
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception:
+                    # Telemetry must never take the service down; count and carry on
+                    self.write_errors += 1
+            # On stop, keep draining until everything queued before it is written
+            if self._stopping.is_set() and self._queue.empty():
+                break
+        self._close_segment()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": True,
+            "running": self.running,
+            "log_dir": str(self.log_dir),
+            "current_segment": self._segment_path.name if self._segment_path else None,
+            "queued": self._queue.qsize(),
+            "logged": self.logged,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "segments": self.segments,
+            "write_errors": self.write_errors,
+        }
@@ -0,0 +1,80 @@
+"""
+Feature Benchmark
+Per-row and per-batch cost of src.features against the previous pandas
+(trainer) and per-document (API) implementations
+"""
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from api.main import DocumentMetadata
+from src.features import RAW_FEATURES, feature_matrix, records_matrix
+
+
+def legacy_pandas(df):
+    """BaselineModelTrainer.prepare_features before src.features"""
+    features = df[list(RAW_FEATURES)].copy()
+    features['has_blur'] = features['has_blur'].astype(int)
+    features['aspect_ratio'] = features['image_width'] / features['image_height']
+    features['pixel_count'] = features['image_width'] * features['image_height']
+    features['size_per_pixel'] = features['file_size_bytes'] / features['pixel_count']
+    return features
+
+
+def legacy_api(docs):
+    """api.main.build_feature_matrix before src.features"""
+    size = np.array([d.file_size_bytes for d in docs], dtype=np.float64)
+    width = np.array([d.image_width for d in docs], dtype=np.float64)
+    height = np.array([d.image_height for d in docs], dtype=np.float64)
+    quality = np.array([d.quality_score for d in docs], dtype=np.float64)
+    blur = np.array([d.has_blur for d in docs], dtype=np.float64)
+    pixel_count = width * height
+    return np.column_stack([size, width, height, quality, blur, width / height, pixel_count, size / pixel_count])
+
+
+def per_call_us(fn, arg):
+    number, _ = timeit.Timer(lambda: fn(arg)).autorange()
+    best = min(timeit.repeat(lambda: fn(arg), number=number, repeat=5))
+    return best / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--metadata", default="data/splits/train_metadata.csv")
+    parser.add_argument("--sizes", default="1,32,1024,100000")
+    args = parser.parse_args()
+
+    base = pd.read_csv(args.metadata, usecols=list(RAW_FEATURES))
+    results = {}
+    print(f"{'rows':>7} {'pandas us':>10} {'columns us':>11} {'speedup':>8} {'api old us':>11} "
+          f"{'api new us':>11} {'speedup':>8}")
+    for n in (int(size) for size in args.sizes.split(",")):
+        df = base.sample(n, replace=True, random_state=0).reset_index(drop=True)
+        columns = {name: df[name].to_numpy() for name in RAW_FEATURES}
+        docs = [DocumentMetadata(**row) for row in df.head(min(n, 1024)).to_dict("records")]
+        np.testing.assert_allclose(feature_matrix(columns), legacy_pandas(df).to_numpy(dtype=float))
+        np.testing.assert_allclose(records_matrix(docs), legacy_api(docs))
+
+        r = {
+            "pandas_us": per_call_us(legacy_pandas, df),
+            "columns_us": per_call_us(feature_matrix, columns),
+            "api_rows": len(docs),
+            "api_legacy_us": per_call_us(legacy_api, docs),
+            "api_us": per_call_us(records_matrix, docs),
+        }
+        results[n] = r
+        print(f"{n:>7} {r['pandas_us']:10.1f} {r['columns_us']:11.1f} {r['pandas_us'] / r['columns_us']:8.1f} "
+              f"{r['api_legacy_us']:11.1f} {r['api_us']:11.1f} {r['api_legacy_us'] / r['api_us']:8.2f}")
+    print("(times are per call; API columns use at most 1024 documents)")
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Flat Forest Benchmark
+Compares scaler + sklearn RandomForest inference with the flat array
+predictor and the fused (scaler-folded) artifact
+"""
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src.model_export import FlatForest
+from src.model_trainer import BaselineModelTrainer
+
+
+def time_call(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    warnings.filterwarnings("ignore")
+    model = joblib.load("models/baseline_model.pkl")
+    scaler = joblib.load("models/scaler.pkl")
+    flat = FlatForest.from_sklearn(model)
+    fused = flat.fold_scaler(scaler)
+
+    df = pd.read_csv("data/processed/all_metadata.csv")
+    X_raw = BaselineModelTrainer().prepare_features(df).values
+    X = scaler.transform(X_raw)
+
+    expected = model.predict_proba(X)
+    print(f"Trees: {flat.n_trees} | Nodes: {flat.n_nodes} | Max depth: {flat.max_depth}")
+    print(f"Max |sklearn - flat| probability difference:  {np.abs(expected - flat.predict_proba(X)).max():.2e}")
+    print(f"Max |sklearn - fused| probability difference: {np.abs(expected - fused.predict_proba(X_raw)).max():.2e}")
+
+    print("\n" + "=" * 70)
+    print(f"{'Rows':>8} | {'scaler+sklearn (ms)':>20} | {'scaler+flat (ms)':>17} | {'fused (ms)':>11}")
+    print("=" * 70)
+    for n_rows, repeat in [(1, 200), (32, 100), (1000, 20), (len(X), 5)]:
+        batch = X_raw[:n_rows]
+        sk = time_call(lambda: model.predict_proba(scaler.transform(batch)), repeat)
+        fl = time_call(lambda: flat.predict_proba(scaler.transform(batch)), repeat)
+        fu = time_call(lambda: fused.predict_proba(batch), repeat)
+        print(f"{n_rows:>8} | {sk * 1000:>20.3f} | {fl * 1000:>17.3f} | {fu * 1000:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
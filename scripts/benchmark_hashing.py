@@ -0,0 +1,69 @@
+"""
+Checksum Benchmark
+Compares the legacy 4 KiB MD5 loop against the hashing layer's buffered,
+memory-mapped and thread-pooled variants over the processed images
+"""
+import argparse
+import hashlib
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.hashing import available_algorithms, hash_file, hash_files
+from src.ingestion import scan_images
+
+
+def legacy_md5(path) -> str:
+    hash_md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(4096), b""):
+            hash_md5.update(chunk)
+    return hash_md5.hexdigest()
+
+
+def timed(fn, repeats: int):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--data-dir", default="data/processed/dataset1")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    paths = [str(p) for p in scan_images(args.data_dir)]
+    total_mb = sum(Path(p).stat().st_size for p in paths) / 2**20
+    print(f"{len(paths)} files, {total_mb:.1f} MiB (best of {args.repeats}, warm page cache)")
+
+    baseline, expected = timed(lambda: [legacy_md5(p) for p in paths], args.repeats)
+    cases = {"md5 4KiB loop (legacy)": baseline}
+    for algorithm in available_algorithms():
+        seconds, digests = timed(lambda: [hash_file(p, algorithm) for p in paths], args.repeats)
+        cases[f"{algorithm} 1MiB buffer"] = seconds
+        if algorithm == "md5":
+            assert digests == expected, "buffered MD5 differs from legacy checksums"
+    cases["md5 mmap"], _ = timed(lambda: [hash_file(p, use_mmap=True) for p in paths], args.repeats)
+    cases[f"md5 {args.workers} threads"], digests = timed(
+        lambda: hash_files(paths, workers=args.workers), args.repeats)
+    assert list(digests.values()) == expected
+
+    results = {}
+    for name, seconds in cases.items():
+        results[name] = {"seconds": seconds, "files_per_s": len(paths) / seconds,
+                         "mib_per_s": total_mb / seconds, "speedup": baseline / seconds}
+        print(f"{name:<28} {seconds:7.3f}s {len(paths) / seconds:9.0f} files/s "
+              f"{total_mb / seconds:8.1f} MiB/s  x{baseline / seconds:.2f}")
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
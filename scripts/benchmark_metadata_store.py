@@ -0,0 +1,73 @@
+"""
+Metadata Storage Benchmark
+Load time and memory of all_metadata as CSV versus typed Parquet, for a
+full read, the trainer's column projection and a filtered read
+"""
+import argparse
+import gc
+import json
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.metadata_store import read_metadata, write_metadata
+from src.model_trainer import TRAINING_COLUMNS
+
+
+def measure(fn, repeats: int):
+    best, frame = float("inf"), None
+    for _ in range(repeats):
+        frame = None
+        gc.collect()
+        start = time.perf_counter()
+        frame = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--metadata", default="data/processed/all_metadata.csv")
+    parser.add_argument("--scale", type=int, default=50, help="replicate the table N times")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    base = pd.read_csv(args.metadata)
+    df = pd.concat([base] * args.scale, ignore_index=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_file = Path(tmp) / "all_metadata.csv"
+        df.to_csv(csv_file, index=False)
+        parquet_file = write_metadata(df, Path(tmp) / "all_metadata.parquet")
+        del df
+        print(f"{len(base) * args.scale} rows; CSV {csv_file.stat().st_size / 2**20:.1f} MiB, "
+              f"Parquet {parquet_file.stat().st_size / 2**20:.1f} MiB (best of {args.repeats})")
+
+        cases = {
+            "csv full (pd.read_csv)": lambda: pd.read_csv(csv_file),
+            "parquet full": lambda: read_metadata(parquet_file),
+            "csv trainer columns": lambda: pd.read_csv(csv_file, usecols=TRAINING_COLUMNS),
+            "parquet trainer columns": lambda: read_metadata(parquet_file, columns=TRAINING_COLUMNS),
+            "csv quality_bin == low": lambda: (lambda d: d[d["quality_bin"] == "low"])(pd.read_csv(csv_file)),
+            "parquet quality_bin == low": lambda: read_metadata(parquet_file, filters=[("quality_bin", "=", "low")]),
+        }
+        results = {}
+        for name, fn in cases.items():
+            seconds, frame = measure(fn, args.repeats)
+            results[name] = {
+                "seconds": seconds,
+                "rows": len(frame),
+                "frame_mib": frame.memory_usage(deep=True).sum() / 2**20,
+            }
+            print(f"{name:<28} {seconds:7.3f}s {len(frame):>9} rows {results[name]['frame_mib']:8.1f} MiB in memory")
+        results["max_rss_mib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
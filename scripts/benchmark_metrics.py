@@ -0,0 +1,77 @@
+"""
+Metrics Overhead Benchmark
+Per-request cost of the /metrics instrumentation: what MetricsMiddleware
+records for one /predict call, single-threaded and from several threads
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from api.metrics import MetricsMiddleware, ServiceMetrics, _request_stages, record_stages
+
+SCOPE = {"type": "http", "path": "/predict", "method": "POST"}
+TIMINGS = {"features_ms": 0.02, "scale_ms": 0.001, "predict_ms": 0.03}
+
+
+class Route:
+    path = "/predict"
+
+
+def one_request(middleware, metrics):
+    """Everything instrumentation adds to a /predict call, minus the ASGI hop"""
+    start = time.perf_counter()
+    stages = {}
+    token = _request_stages.set(stages)
+    metrics.predictions.inc(("/predict", "v1", "medium"))
+    record_stages(start, TIMINGS)
+    _request_stages.reset(token)
+    middleware._record(SCOPE, start, stages, 200, time.perf_counter())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200000, help="per thread in the threaded run")
+    args = parser.parse_args()
+
+    metrics = ServiceMetrics()
+    middleware = MetricsMiddleware(None, metrics, routes=[Route()])
+    number, _ = timeit.Timer(lambda: one_request(middleware, metrics)).autorange()
+    single_us = min(timeit.repeat(lambda: one_request(middleware, metrics), number=number, repeat=5)) / number * 1e6
+
+    # Fresh metrics for the threaded run so the final count can be checked exactly
+    metrics = ServiceMetrics()
+    middleware = MetricsMiddleware(None, metrics, routes=[Route()])
+
+    def worker():
+        for _ in range(args.requests):
+            one_request(middleware, metrics)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    threaded_us = (time.perf_counter() - start) / (args.threads * args.requests) * 1e6
+    expected = args.threads * args.requests
+    counted = int(metrics.requests.values()[1][:, 0].sum())
+    assert counted == expected, f"lost updates: counted {counted} of {expected}"
+
+    render_ms = min(timeit.repeat(metrics.render, number=20, repeat=3)) / 20 * 1e3
+    results = {"single_thread_us": single_us, "threaded_us": threaded_us, "threads": args.threads,
+               "counted": counted, "expected": expected, "render_ms": render_ms}
+    print(f"{'per request, 1 thread':<28} {single_us:8.2f} us")
+    print(f"{f'per request, {args.threads} threads':<28} {threaded_us:8.2f} us")
+    print(f"{'render /metrics':<28} {render_ms:8.2f} ms")
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
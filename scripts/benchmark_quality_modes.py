@@ -0,0 +1,81 @@
+"""
+Quality Mode Benchmark
+Speed of each ingestion quality mode and its agreement with the exact mode
+(quality_score error, has_blur and quality_bin agreement) on the processed images
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.data_pipeline import QUALITY_MODES
+from src.ingestion import process_image, scan_images
+
+CONFIGS = {
+    "exact": {"mode": "exact"},
+    "fast": {"mode": "fast"},
+    "reduced/2": {"mode": "reduced", "reduce_factor": 2},
+    "reduced/4": {"mode": "reduced", "reduce_factor": 4},
+    "tiles": {"mode": "tiles", "tile_size": 64, "tiles": 16},
+}
+
+
+def score(paths, quality):
+    start = time.perf_counter()
+    records = [process_image(path, quality=quality) for path in paths]
+    seconds = time.perf_counter() - start
+    failed = [r for r in records if "error" in r]
+    if failed:
+        raise RuntimeError(f"{len(failed)} images failed, e.g. {failed[0]}")
+    quality_score = np.array([r["quality_score"] for r in records])
+    has_blur = np.array([r["has_blur"] for r in records])
+    return seconds, quality_score, has_blur
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--data-dir", default="data/processed")
+    parser.add_argument("--limit", type=int, default=0, help="score only the first N images")
+    args = parser.parse_args()
+    assert {c["mode"] for c in CONFIGS.values()} == set(QUALITY_MODES)
+
+    paths = [str(p) for p in scan_images(args.data_dir)]
+    if args.limit:
+        paths = paths[:args.limit]
+    # Warm the page cache so every mode pays the same I/O
+    for path in paths:
+        Path(path).read_bytes()
+
+    exact_s, exact_q, exact_blur = score(paths, CONFIGS["exact"])
+    # Same equal-width edges as DataPipeline.add_quality_bins on the exact scores
+    edges = np.linspace(exact_q.min(), exact_q.max(), 4)[1:-1]
+    exact_bins = np.digitize(exact_q, edges)
+
+    results = {}
+    print(f"{len(paths)} images")
+    print(f"{'mode':<10} {'seconds':>8} {'img/s':>8} {'speedup':>8} {'score MAE':>10} {'max err':>8} "
+          f"{'blur agree':>11} {'bin agree':>10}")
+    for name, quality in CONFIGS.items():
+        seconds, q, blur = (exact_s, exact_q, exact_blur) if name == "exact" else score(paths, quality)
+        results[name] = {
+            "seconds": seconds,
+            "images_per_s": len(paths) / seconds,
+            "speedup": exact_s / seconds,
+            "score_mae": float(np.abs(q - exact_q).mean()),
+            "score_max_error": float(np.abs(q - exact_q).max()),
+            "has_blur_agreement": float((blur == exact_blur).mean()),
+            "quality_bin_agreement": float((np.digitize(q, edges) == exact_bins).mean()),
+        }
+        r = results[name]
+        print(f"{name:<10} {seconds:8.2f} {r['images_per_s']:8.0f} {r['speedup']:8.2f} {r['score_mae']:10.4f} "
+              f"{r['score_max_error']:8.4f} {r['has_blur_agreement']:11.4f} {r['quality_bin_agreement']:10.4f}")
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
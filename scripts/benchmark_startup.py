@@ -0,0 +1,85 @@
+"""
+API Startup Benchmark
+Measures import-to-ready time and memory of the inference service per
+loading mode, each in a fresh interpreter (one uvicorn worker's cold start)
+"""
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROBE = r"""
+import json, resource, sys, time
+start = time.perf_counter()
+import api.main as main
+imported = time.perf_counter() - start
+if not main.registry.loaded:
+    main.registry.load_in_background()
+    main.registry.wait_until_loaded()
+ready = time.perf_counter() - start
+stats = {"import_s": imported, "ready_s": ready,
+         "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+         "sklearn_imported": "sklearn" in sys.modules}
+try:
+    import psutil
+    info = psutil.Process().memory_full_info()
+    stats["rss_mb"] = info.rss / 2**20
+    stats["uss_mb"] = info.uss / 2**20
+except ImportError:
+    pass
+print(json.dumps(stats))
+"""
+
+
+def pickle_only_model_dir(tmp: Path) -> Path:
+    """Copy of models/ without the fused artifact, i.e. the pre-export layout"""
+    target = tmp / "models"
+    shutil.copytree(ROOT / "models", target, ignore=shutil.ignore_patterns("baseline_model_fused"))
+    metadata = json.loads((target / "model_metadata.json").read_text())
+    metadata.pop("inference_model", None)
+    (target / "model_metadata.json").write_text(json.dumps(metadata))
+    return target
+
+
+def run_probe(env: dict, repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE],
+            cwd=ROOT, env={**os.environ, **env}, capture_output=True, text=True, check=True
+        )
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    summary = {key: statistics.median(run[key] for run in runs)
+               for key in runs[0] if key != "sklearn_imported"}
+    summary["sklearn_imported"] = runs[0]["sklearn_imported"]
+    return summary
+
+
+def main(repeat: int = 5):
+    with tempfile.TemporaryDirectory() as tmp:
+        modes = {
+            "pickle + scaler (eager)": {"MODEL_DIR": str(pickle_only_model_dir(Path(tmp)))},
+            "fused arrays (eager)": {"MODEL_DIR": "models"},
+            "fused arrays, mmap (eager)": {"MODEL_DIR": "models", "MODEL_MMAP": "true"},
+            "fused arrays, mmap (lazy)": {"MODEL_DIR": "models", "MODEL_MMAP": "true",
+                                          "MODEL_LOAD_MODE": "lazy"},
+        }
+        print("=" * 96)
+        print(f"{'Mode':<28} | {'import (s)':>10} | {'ready (s)':>9} | {'RSS (MB)':>8} | "
+              f"{'USS (MB)':>8} | {'sklearn':>7}")
+        print("=" * 96)
+        for name, env in modes.items():
+            stats = run_probe(env, repeat)
+            print(f"{name:<28} | {stats['import_s']:>10.3f} | {stats['ready_s']:>9.3f} | "
+                  f"{stats.get('rss_mb', stats['max_rss_mb']):>8.1f} | "
+                  f"{stats.get('uss_mb', float('nan')):>8.1f} | {str(stats['sklearn_imported']):>7}")
+
+
+if __name__ == "__main__":
+    main()
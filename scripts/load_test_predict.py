@@ -0,0 +1,135 @@
+"""
+/predict Load Test
+Requests/sec and p50/p99 latency of the Pydantic and orjson response paths,
+against a local uvicorn per mode (or in-process over ASGI with --in-process)
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# (name, PREDICT_FAST_RESPONSE, query string)
+MODES = [
+    ("pydantic", "false", ""),
+    ("orjson", "true", ""),
+    ("orjson+array", "true", "?probabilities=array"),
+]
+
+
+def payload(rng):
+    return {
+        "file_size_bytes": int(rng.integers(5000, 200000)),
+        "image_width": int(rng.integers(200, 2000)),
+        "image_height": int(rng.integers(200, 2000)),
+        "quality_score": float(rng.uniform()),
+        "has_blur": bool(rng.integers(2)),
+    }
+
+
+async def drive(client: httpx.AsyncClient, url: str, concurrency: int, duration: float, warmup: int):
+    rng = np.random.default_rng(0)
+    bodies = [payload(rng) for _ in range(1024)]
+    for body in bodies[:warmup]:
+        (await client.post(url, json=body)).raise_for_status()
+
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def worker(offset):
+        i = offset
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.post(url, json=bodies[i % len(bodies)])
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+            i += concurrency
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(k) for k in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    ms = np.array(latencies) * 1e3
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+
+def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/health").json().get("model_loaded"):
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError("uvicorn did not become ready")
+
+
+def run_uvicorn(fast: str, query: str, args) -> dict:
+    env = dict(os.environ, PREDICT_FAST_RESPONSE=fast, PREDICTION_CACHE_SIZE=str(args.cache_size))
+    base_url = f"http://127.0.0.1:{args.port}"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=ROOT, env=env
+    )
+    try:
+        wait_until_ready(base_url, process)
+        limits = httpx.Limits(max_connections=args.concurrency)
+
+        async def go():
+            async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+                return await drive(client, f"/predict{query}", args.concurrency, args.duration, args.warmup)
+        return asyncio.run(go())
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def run_in_process(fast: str, query: str, args) -> dict:
+    os.environ["PREDICTION_CACHE_SIZE"] = str(args.cache_size)
+    import api.main
+    api.main.PREDICT_FAST_RESPONSE = fast == "true" and api.main.orjson is not None
+
+    async def go():
+        transport = httpx.ASGITransport(app=api.main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await drive(client, f"/predict{query}", args.concurrency, args.duration, args.warmup)
+    return asyncio.run(go())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per mode")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cache-size", type=int, default=0, help="PREDICTION_CACHE_SIZE (0 measures the model)")
+    parser.add_argument("--in-process", action="store_true", help="drive the ASGI app directly, no uvicorn")
+    args = parser.parse_args()
+
+    run = run_in_process if args.in_process else run_uvicorn
+    results = {}
+    print(f"{'mode':<14} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, fast, query in MODES:
+        r = results[name] = run(fast, query, args)
+        print(f"{name:<14} {r['requests']:9d} {r['rps']:8.0f} {r['p50_ms']:8.2f} {r['p99_ms']:8.2f}")
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,78 @@
 import json
 import logging
+import math
+import operator
+import time
 from datetime import datetime
-from typing import List, Dict
+from typing import Any, Dict, Iterable, List, Optional
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLDS = {
+    "quality_score_min": 0.5,
+    "blur_rate_max": 0.1,
+    "missing_values_max": 0.05,
+    "duplicate_rate_max": 0.02,
+    "feature_psi_max": 0.2,
+    "feature_ks_max": 0.2
+}
+
+# (metric, comparison, threshold key, message); a metric that is absent is not checked
+RULES = [
+    ("avg_quality_score", "<", "quality_score_min", "Quality score below threshold"),
+    ("blur_rate", ">", "blur_rate_max", "Blur rate exceeds threshold"),
+    ("missing_rate", ">", "missing_values_max", "Missing values exceed threshold"),
+    ("duplicate_rate", ">", "duplicate_rate_max", "Duplicate rate exceeds threshold"),
+    ("max_psi", ">", "feature_psi_max", "Feature drift (PSI) exceeds threshold"),
+    ("max_ks", ">", "feature_ks_max", "Feature drift (KS) exceeds threshold"),
+]
+COMPARISONS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+# Fields every metadata record / logged request is expected to carry
+REQUIRED_FIELDS = ("file_size_bytes", "image_width", "image_height", "quality_score", "has_blur")
+
+
 class AlertSystem:
-    def __init__(self):
-        self.config = {
-            "thresholds": {
-                "quality_score_min": 0.5,
-                "blur_rate_max": 0.1,
-                "missing_values_max": 0.05
-            }
-        }
+    """Threshold rules from config/alerts_config.json and an append-only alert log
+
+    Besides the built-in `RULES`, the config may list extra rules as
+    {"metric", "op", "threshold", "message"} objects under "rules".
+    """
+
+    def __init__(self, config_path="config/alerts_config.json", log_path="logs/alerts.jsonl"):
+        config = {}
+        if config_path and Path(config_path).exists():
+            with open(config_path) as f:
+                config = json.load(f)
+        self.config = {**config, "thresholds": {**DEFAULT_THRESHOLDS, **config.get("thresholds", {})}}
+        self.rules = [
+            (metric, COMPARISONS[op], self.config["thresholds"][key], message)
+            for metric, op, key, message in RULES
+        ] + [
+            (rule["metric"], COMPARISONS[rule.get("op", ">")], rule["threshold"],
+             rule.get("message", f"{rule['metric']} {rule.get('op', '>')} {rule['threshold']}"))
+            for rule in config.get("rules", [])
+        ]
+        self.log_path = Path(log_path)
         self.alerts_log = []
-    
+        self._saved = 0
+
     def check_thresholds(self, metrics: Dict) -> List[str]:
         violations = []
-        if metrics.get("avg_quality_score", 1.0) < self.config["thresholds"]["quality_score_min"]:
-            violations.append("Quality score below threshold")
-        if metrics.get("blur_rate", 0) > self.config["thresholds"]["blur_rate_max"]:
-            violations.append("Blur rate exceeds threshold")
+        for metric, compare, threshold, message in self.rules:
+            value = metrics.get(metric)
+            if value is not None and compare(value, threshold):
+                violations.append(message)
         return violations
-    
+
+    def raise_alert(self, alert: Dict[str, Any]):
+        """Record an alert and append it to the log file straight away"""
+        alert = {"timestamp": datetime.now().isoformat(), **alert}
+        self.alerts_log.append(alert)
+        self.save_log()
+        return alert
+
     def alert_failure(self, stage: str, error: str):
         alert = {
             "timestamp": datetime.now().isoformat(),
@@ -32,8 +82,279 @@ class AlertSystem:
         }
         self.alerts_log.append(alert)
         print(f"ALERT: {stage} failed - {error}")
-    
-    def save_log(self, path="logs/alerts.json"):
-        Path(path).parent.mkdir(exist_ok=True)
-        with open(path, 'w') as f:
-            json.dump(self.alerts_log, f, indent=2)
+
+    def save_log(self):
+        """Append alerts not yet written to `log_path` as JSON lines; earlier lines are never rewritten"""
+        path = self.log_path
+        pending = self.alerts_log[self._saved:]
+        if not pending:
+            return path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a") as f:
+            f.write("".join(json.dumps(alert) + "\n" for alert in pending))
+        self._saved += len(pending)
+        return path
+
+
+def _missing(value) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _timestamp(record: Dict) -> Optional[float]:
+    ts = record.get("ts")
+    if ts is not None:
+        return float(ts)
+    stamp = record.get("timestamp")
+    if stamp:
+        try:
+            return datetime.fromisoformat(str(stamp)).timestamp()
+        except ValueError:
+            return None
+    return None
+
+
+class SlidingWindowMetrics:
+    """Quality, blur, missing-value and duplicate rates over the last `window_seconds`
+
+    The window is a ring of `n_buckets` time buckets. Each record adds to
+    its bucket and to running totals; when time moves past a bucket, its
+    sums are subtracted from the totals and its duplicate keys released.
+    Every record is therefore added and expired exactly once, so updates
+    and `metrics()` are O(1) amortised whatever the window holds.
+
+    A record counts as missing when any of `required_fields` is absent or
+    NaN, and as a duplicate when its key (the `checksum` field if present,
+    else the required field values) was already seen inside the window.
+    Records older than the window are counted in `late` and skipped.
+    """
+
+    def __init__(self, window_seconds: float = 300.0, n_buckets: int = 60,
+                 required_fields: Iterable[str] = REQUIRED_FIELDS, key_field: Optional[str] = "checksum"):
+        self.window_seconds = window_seconds
+        self.n_buckets = n_buckets
+        self.bucket_seconds = window_seconds / n_buckets
+        self.required_fields = tuple(required_fields)
+        self.key_field = key_field
+        # Per bucket: [records, quality sum, quality count, blurred, missing, duplicates]
+        self._buckets = [[0, 0.0, 0, 0, 0, 0] for _ in range(n_buckets)]
+        self._bucket_keys: List[List] = [[] for _ in range(n_buckets)]
+        self._totals = [0, 0.0, 0, 0, 0, 0]
+        self._key_counts: Dict[Any, int] = {}
+        self._head: Optional[int] = None
+        self.seen = 0
+        self.late = 0
+
+    def _advance(self, bucket: int):
+        # Expire every bucket between the current head and `bucket` (at most the whole ring)
+        start = self._head + 1 if bucket - self._head < self.n_buckets else bucket - self.n_buckets + 1
+        for expired in range(start, bucket + 1):
+            slot = expired % self.n_buckets
+            sums = self._buckets[slot]
+            for i, value in enumerate(sums):
+                self._totals[i] -= value
+                sums[i] = 0
+            key_counts = self._key_counts
+            for key in self._bucket_keys[slot]:
+                remaining = key_counts[key] - 1
+                if remaining:
+                    key_counts[key] = remaining
+                else:
+                    del key_counts[key]
+            self._bucket_keys[slot] = []
+        self._head = bucket
+
+    def expire(self, ts: float):
+        """Drop buckets that have left the window by `ts`, without adding a record"""
+        bucket = int(ts // self.bucket_seconds)
+        if self._head is not None and bucket > self._head:
+            self._advance(bucket)
+
+    def observe(self, record: Dict, ts: Optional[float] = None):
+        if ts is None:
+            ts = _timestamp(record)
+            if ts is None:
+                ts = time.time()
+        bucket = int(ts // self.bucket_seconds)
+        if self._head is None:
+            self._head = bucket
+        elif bucket > self._head:
+            self._advance(bucket)
+        elif bucket <= self._head - self.n_buckets:
+            self.late += 1
+            return
+        slot = bucket % self.n_buckets
+        sums, totals = self._buckets[slot], self._totals
+        self.seen += 1
+        sums[0] += 1
+        totals[0] += 1
+
+        missing = False
+        for field in self.required_fields:
+            if _missing(record.get(field)):
+                missing = True
+                break
+        if missing:
+            sums[4] += 1
+            totals[4] += 1
+        quality = record.get("quality_score")
+        if not _missing(quality):
+            sums[1] += quality
+            totals[1] += quality
+            sums[2] += 1
+            totals[2] += 1
+        if record.get("has_blur"):
+            sums[3] += 1
+            totals[3] += 1
+
+        key = record.get(self.key_field) if self.key_field else None
+        if key is None:
+            key = tuple(record.get(field) for field in self.required_fields)
+        count = self._key_counts.get(key, 0)
+        if count:
+            sums[5] += 1
+            totals[5] += 1
+        self._key_counts[key] = count + 1
+        self._bucket_keys[slot].append(key)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Rates over the window in the shape AlertSystem.check_thresholds expects"""
+        records, quality_sum, quality_count, blurred, missing, duplicates = self._totals
+        metrics = {"records": records, "window_seconds": self.window_seconds}
+        if records:
+            metrics["blur_rate"] = blurred / records
+            metrics["missing_rate"] = missing / records
+            metrics["duplicate_rate"] = duplicates / records
+        if quality_count:
+            metrics["avg_quality_score"] = quality_sum / quality_count
+        return metrics
+
+
+class StreamingAlertMonitor:
+    """Feeds records through sliding windows and raises alerts as rules start failing
+
+    Rules are evaluated at most every `evaluate_every_s` seconds of event
+    time, once a window holds `min_records`. An alert is raised when a
+    rule starts failing and a "resolved" entry when it passes again or
+    its window falls below `min_records`, so a sustained breach produces
+    one log line rather than one per record.
+    """
+
+    def __init__(self, alert_system: Optional[AlertSystem] = None, windows: Iterable[float] = (60.0, 900.0),
+                 evaluate_every_s: float = 10.0, min_records: int = 100, **window_options):
+        self.alert_system = alert_system or AlertSystem()
+        self.windows = {seconds: SlidingWindowMetrics(seconds, **window_options) for seconds in windows}
+        self.evaluate_every_s = evaluate_every_s
+        self.min_records = min_records
+        self.firing: Dict[tuple, Dict] = {}
+        self._next_evaluation: Optional[float] = None
+
+    def observe(self, record: Dict, ts: Optional[float] = None) -> List[Dict]:
+        if ts is None:
+            ts = _timestamp(record)
+            if ts is None:
+                ts = time.time()
+        for window in self.windows.values():
+            window.observe(record, ts)
+        if self._next_evaluation is None:
+            self._next_evaluation = ts + self.evaluate_every_s
+        if ts < self._next_evaluation:
+            return []
+        self._next_evaluation = ts + self.evaluate_every_s
+        return self.evaluate(ts)
+
+    def consume(self, records: Iterable[Dict]) -> List[Dict]:
+        raised = []
+        for record in records:
+            raised.extend(self.observe(record))
+        return raised
+
+    def evaluate(self, ts: Optional[float] = None) -> List[Dict]:
+        """Check every window now; returns the alerts raised or resolved
+
+        With `ts`, windows are first expired up to it, so polling after
+        traffic stops still resolves what was firing. A window holding
+        fewer than `min_records` resolves its alerts rather than keeping
+        them firing on data that has left it.
+        """
+        changed = []
+        for seconds, window in self.windows.items():
+            if ts is not None:
+                window.expire(ts)
+            metrics = window.metrics()
+            if metrics["records"] < self.min_records:
+                violations, reason = set(), "insufficient_data"
+            else:
+                violations, reason = set(self.alert_system.check_thresholds(metrics)), "passing"
+            for message in sorted(violations):
+                if (seconds, message) not in self.firing:
+                    alert = self.alert_system.raise_alert({
+                        "type": "threshold", "status": "firing", "rule": message,
+                        "window_seconds": seconds, "event_time": ts, "metrics": metrics
+                    })
+                    self.firing[(seconds, message)] = alert
+                    changed.append(alert)
+                    logger.warning(f"ALERT [{seconds:g}s window]: {message}")
+            for key in [key for key in self.firing if key[0] == seconds and key[1] not in violations]:
+                del self.firing[key]
+                changed.append(self.alert_system.raise_alert({
+                    "type": "threshold", "status": "resolved", "rule": key[1], "reason": reason,
+                    "window_seconds": seconds, "event_time": ts, "metrics": metrics
+                }))
+        return changed
+
+
+def request_log_records(log_dir) -> Iterable[Dict]:
+    """Flatten the inference request log into one record per scored document"""
+    from src.drift_monitor import iter_log_records
+    for record in iter_log_records(log_dir):
+        inputs = record.get("inputs") or {}
+        ts = record.get("ts")
+        if record.get("batch_size") is None:
+            yield {**inputs, "ts": ts}
+            continue
+        names = list(inputs)
+        for values in zip(*(inputs[name] for name in names)):
+            yield {**dict(zip(names, values)), "ts": ts}
+
+
+def main(argv=None):
+    import argparse
+    from src.metadata_store import iter_metadata
+    parser = argparse.ArgumentParser(description="Stream metadata or request-log records through the alert rules")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--metadata", help="metadata CSV/Parquet (timestamp and checksum columns)")
+    source.add_argument("--log-dir", help="inference request log directory")
+    parser.add_argument("--config", default="config/alerts_config.json")
+    parser.add_argument("--alert-log", default="logs/alerts.jsonl")
+    parser.add_argument("--windows", default="60,900", help="window lengths in seconds")
+    parser.add_argument("--evaluate-every", type=float, default=10.0, help="seconds of event time")
+    parser.add_argument("--min-records", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    monitor = StreamingAlertMonitor(
+        AlertSystem(args.config, log_path=args.alert_log),
+        windows=[float(w) for w in args.windows.split(",")],
+        evaluate_every_s=args.evaluate_every,
+        min_records=args.min_records
+    )
+    if args.metadata:
+        records = (record for chunk in iter_metadata(args.metadata)
+                   for record in chunk.to_dict("records"))
+    else:
+        records = request_log_records(args.log_dir)
+
+    start = time.perf_counter()
+    raised = monitor.consume(records)
+    raised.extend(monitor.evaluate())
+    elapsed = time.perf_counter() - start
+    seen = next(iter(monitor.windows.values())).seen
+    print(f"Processed {seen} records in {elapsed:.2f}s ({seen / elapsed if elapsed else 0:,.0f}/s)")
+    for seconds, window in monitor.windows.items():
+        print(f"  {seconds:g}s window: {window.metrics()}")
+    for alert in raised:
+        print(f"ALERT {alert['status']}: {alert['rule']} ({alert['window_seconds']:g}s window)")
+    return raised
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,153 @@
 import pandas as pd
 import numpy as np
 import json
+import os
+import sys
+import yaml
+import joblib
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src.features import FEATURE_NAMES, RAW_FEATURES, feature_matrix
+from src.metadata_store import iter_metadata, metadata_columns
+from src.slice_analysis import SliceStats, dataset_source
+
+DEFAULTS = {
+    "accuracy_gap_max": 0.1,
+    "chunk_rows": 100000,
+    "correlation_max": 0.7,
+    "min_slice_rows": 30,
+    "quality_gap_max": 0.3,
+    "slice_columns": ["doc_type", "file_format", "vendor", "quality_bin", "source"],
+}
+VALUE_COLUMNS = ["quality_score", "file_size_bytes", "image_width", "image_height"]
+RATE_COLUMNS = ["has_blur"]
+SIZE_QUALITY = ("file_size_bytes", "quality_score")
+
 class BiasDetector:
-    def __init__(self):
+    def __init__(self, config_path='config/pipeline_config.yaml'):
         self.report = {"biases": []}
-    
+        # Older callers read the report under this name
+        self.bias_report = self.report
+        config = {}
+        if Path(config_path).exists():
+            with open(config_path) as f:
+                config = yaml.safe_load(f) or {}
+        self.config = {**DEFAULTS, **config.get('bias', {})}
+
     def check_size_bias(self, df):
         corr = df[['file_size_bytes', 'quality_score']].corr().iloc[0, 1]
-        biased = abs(corr) > 0.7
+        biased = abs(corr) > self.config['correlation_max']
         return {"type": "size_bias", "detected": bool(biased), "correlation": float(corr)}
-    
+
     def check_format_bias(self, df):
-        means = df.groupby('file_format')['quality_score'].mean()
+        means = df.groupby('file_format', observed=True)['quality_score'].mean()
         diff = means.max() - means.min()
-        biased = diff > 0.3
+        biased = diff > self.config['quality_gap_max']
         return {"type": "format_bias", "detected": bool(biased), "difference": float(diff)}
-    
-    def analyze(self, csv_path):
-        df = pd.read_csv(csv_path)
-        
-        size_bias = self.check_size_bias(df)
-        format_bias = self.check_format_bias(df)
-        
-        self.report["biases"] = [size_bias, format_bias]
+
+    def slice_stats(self, csv_path, model=None, scaler=None):
+        """One chunked pass over the metadata collecting every slice statistic
+
+        With a `model` (and its `scaler`), each chunk is also scored so
+        accuracy and prediction rates can be compared across slices.
+        """
+        available = set(metadata_columns(csv_path))
+        slice_columns = [c for c in self.config['slice_columns']
+                         if c in available or (c == 'source' and 'source_path' in available)]
+        scoring = model is not None and 'quality_bin' in available
+        value_columns = [c for c in VALUE_COLUMNS if c in available]
+        stats = SliceStats(
+            slice_columns,
+            value_columns=value_columns,
+            rate_columns=[c for c in RATE_COLUMNS if c in available],
+            correlation=SIZE_QUALITY if set(SIZE_QUALITY) <= set(value_columns) else None,
+            label_column='quality_bin' if scoring else None,
+            prediction_column='predicted_class' if scoring else None
+        )
+        columns = [c for c in stats.columns if c in available]
+        if 'source' in slice_columns:
+            columns.append('source_path')
+        if scoring:
+            columns += [c for c in RAW_FEATURES if c not in columns]
+
+        for chunk in iter_metadata(csv_path, columns=columns, batch_rows=self.config['chunk_rows']):
+            chunk = chunk.copy()
+            if 'source' in slice_columns:
+                chunk['source'] = dataset_source(chunk.pop('source_path'))
+            if scoring:
+                X = pd.DataFrame(feature_matrix(chunk), columns=list(FEATURE_NAMES))
+                chunk['predicted_class'] = model.predict(scaler.transform(X) if scaler is not None else X.to_numpy())
+            stats.update(chunk)
+        return stats
+
+    def find_biases(self, stats):
+        """Bias findings from the slice statistics, thresholds from the `bias` config"""
+        config = self.config
+        correlation = stats.correlation_matrix().get('file_size_bytes', {}).get('quality_score')
+        biases = [{
+            "type": "size_bias",
+            "detected": bool(correlation is not None and abs(correlation) > config['correlation_max']),
+            "correlation": correlation
+        }]
+        for column in stats.slice_columns:
+            slices = [s for s in stats.slices(column) if s['count'] >= config['min_slice_rows']]
+            means = {s['value']: s['mean_quality_score'] for s in slices if 'mean_quality_score' in s}
+            gap = max(means.values()) - min(means.values()) if means else 0.0
+            # quality_bin is binned from quality_score, so its quality gap is by construction
+            if column != stats.label_column:
+                biases.append({
+                    # file_format keeps the name the report has always used
+                    "type": "format_bias" if column == 'file_format' else "slice_bias",
+                    "slice": column,
+                    "detected": bool(gap > config['quality_gap_max']),
+                    "difference": float(gap),
+                    "slices": len(means)
+                })
+            accuracy = {s['value']: s['accuracy'] for s in slices if s.get('accuracy') is not None}
+            if accuracy:
+                gap = max(accuracy.values()) - min(accuracy.values())
+                biases.append({
+                    "type": "accuracy_bias",
+                    "slice": column,
+                    "detected": bool(gap > config['accuracy_gap_max']),
+                    "difference": float(gap),
+                    "worst_slice": min(accuracy, key=accuracy.get)
+                })
+        return biases
+
+    def analyze(self, csv_path, model_dir=None, output_path='reports/bias_report.json'):
+        model = scaler = None
+        if model_dir is not None and (Path(model_dir) / 'baseline_model.pkl').exists():
+            model = joblib.load(Path(model_dir) / 'baseline_model.pkl')
+            scaler_path = Path(model_dir) / 'scaler.pkl'
+            scaler = joblib.load(scaler_path) if scaler_path.exists() else None
+
+        stats = self.slice_stats(csv_path, model=model, scaler=scaler)
+
+        self.report["biases"] = self.find_biases(stats)
         self.report["total_biases"] = sum(1 for b in self.report["biases"] if b["detected"])
-        
-        Path("reports").mkdir(exist_ok=True)
-        with open('reports/bias_report.json', 'w') as f:
+        self.report["rows"] = stats.rows
+        self.report["chunks"] = stats.chunks
+        self.report["correlations"] = stats.correlation_matrix()
+        self.report["slices"] = {column: stats.slices(column) for column in stats.slice_columns}
+
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = output_path.with_suffix(output_path.suffix + '.tmp')
+        with open(tmp, 'w') as f:
             json.dump(self.report, f, indent=2)
-        
-        print(f"Bias analysis complete: {self.report['total_biases']} biases detected")
+        os.replace(tmp, output_path)
+
+        print(f"Bias analysis complete: {self.report['total_biases']} biases detected "
+              f"across {stats.rows} rows")
         return self.report
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Slice-based bias analysis of document metadata")
+    parser.add_argument("--metadata", default="data/processed/all_metadata.csv")
+    parser.add_argument("--model-dir", help="score each chunk with this model for per-slice accuracy")
+    parser.add_argument("--output", default="reports/bias_report.json")
+    args = parser.parse_args()
+    BiasDetector().analyze(args.metadata, model_dir=args.model_dir, output_path=args.output)
@@ -2,8 +2,9 @@
 LedgerX Data Pipeline Module
 """
 import os
+import sys
 import json
-import hashlib
+import time
 import logging
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass, asdict
@@ -17,6 +18,55 @@ from PIL import Image
 from sklearn.model_selection import train_test_split
 import yaml
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.hashing import DEFAULT_ALGORITHM, hash_file, hash_files
+from src.metadata_store import parquet_path, read_metadata, write_metadata
+
+BLUR_THRESHOLD = 100
+QUALITY_MODES = ("exact", "fast", "reduced", "tiles")
+
+def laplacian_variance(gray: np.ndarray, mode: str = "exact", tile_size: int = 64, tiles: int = 16) -> float:
+    """Variance of the Laplacian of a grayscale image
+    
+    `exact` is the reference float64 computation. `fast` and `reduced` run
+    the Laplacian in float32 and take mean and variance in one pass
+    (`reduced` differs only in how the caller decoded the image). `tiles`
+    pools the variance of a grid of `tiles` windows of `tile_size` pixels,
+    so no full-size Laplacian buffer is allocated.
+    """
+    if mode == "exact":
+        return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+    if mode not in QUALITY_MODES:
+        raise ValueError(f"Unknown quality mode '{mode}', expected one of {QUALITY_MODES}")
+    
+    height, width = gray.shape[:2]
+    per_side = max(1, int(round(np.sqrt(tiles))))
+    if mode != "tiles" or per_side * (tile_size + 2) >= min(height, width):
+        _, std = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_32F))
+        return float(std[0, 0]) ** 2
+    
+    # Each window carries a 1px border so its Laplacian matches the full image's
+    total, total_sq, count = 0.0, 0.0, 0
+    for y in np.linspace(0, height - tile_size - 2, per_side).astype(int):
+        for x in np.linspace(0, width - tile_size - 2, per_side).astype(int):
+            window = gray[y:y + tile_size + 2, x:x + tile_size + 2]
+            lap = cv2.Laplacian(window, cv2.CV_32F)[1:-1, 1:-1]
+            mean, std = cv2.meanStdDev(lap)
+            n = lap.size
+            total += float(mean[0, 0]) * n
+            total_sq += (float(std[0, 0]) ** 2 + float(mean[0, 0]) ** 2) * n
+            count += n
+    mean = total / count
+    return max(total_sq / count - mean * mean, 0.0)
+
+def laplacian_quality(gray: np.ndarray, mode: str = "exact", **options) -> Tuple[float, bool]:
+    """Quality score in [0, 1] and blur flag from a grayscale image's Laplacian variance"""
+    laplacian_var = laplacian_variance(gray, mode, **options)
+    has_blur = laplacian_var < BLUR_THRESHOLD
+    quality_score = min(laplacian_var / 1000, 1.0)
+    return quality_score, has_blur
+
 @dataclass
 class DocumentMetadata:
     doc_id: str
@@ -32,6 +82,7 @@ class DocumentMetadata:
     vendor: Optional[str]
     timestamp: str
     checksum: str
+    perceptual_hash: Optional[str] = None
 
 class DataPipeline:
     """Complete data pipeline for LedgerX invoice processing"""
@@ -49,21 +100,195 @@ class DataPipeline:
         
         self.metadata_list = []
     
-    def calculate_checksum(self, filepath: str) -> str:
-        hash_md5 = hashlib.md5()
-        with open(filepath, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
+    def calculate_checksum(self, filepath: str, algorithm: str = DEFAULT_ALGORITHM) -> str:
+        return hash_file(filepath, algorithm)
+    
+    def calculate_checksums(self, filepaths, algorithm: str = DEFAULT_ALGORITHM,
+                            workers: Optional[int] = None) -> Dict[str, str]:
+        return hash_files(filepaths, algorithm, workers=workers)
     
-    def assess_image_quality(self, image: np.ndarray) -> Tuple[float, bool]:
+    def assess_image_quality(self, image: np.ndarray, mode: Optional[str] = None) -> Tuple[float, bool]:
+        """Quality of a decoded RGB image; `mode` defaults to the `ingestion.quality` config"""
+        options = dict(self.config.get('ingestion', {}).get('quality') or {})
+        configured = options.pop('mode', 'exact')
+        mode = mode or configured
+        factor = options.pop('reduce_factor', 2)
         gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY) if len(image.shape) == 3 else image
-        laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
-        has_blur = laplacian_var < 100
-        quality_score = min(laplacian_var / 1000, 1.0)
-        return quality_score, has_blur
-    
-    def run_pipeline(self):
-        """Run complete data pipeline"""
-        print("Pipeline execution complete")
-        return {"status": "success"}
+        if mode == 'reduced' and factor > 1:
+            gray = cv2.resize(gray, (max(1, gray.shape[1] // factor), max(1, gray.shape[0] // factor)),
+                              interpolation=cv2.INTER_AREA)
+        return laplacian_quality(gray, mode, **options)
+    
+    def build_ingestion_engine(self, workers: Optional[int] = None, resume: bool = True,
+                               checkpoint_path=None):
+        """Ingestion engine configured from the `ingestion` config section"""
+        from src.ingestion import ImageIngestionEngine
+
+        ingestion = self.config.get('ingestion', {})
+        checkpoint = Path(checkpoint_path or
+                          self.processed_dir / ingestion.get('checkpoint_file', '.ingestion_checkpoint.jsonl'))
+        if not resume and checkpoint.exists():
+            checkpoint.unlink()
+        return ImageIngestionEngine(
+            workers=workers or ingestion.get('workers') or None,
+            chunk_size=ingestion.get('chunk_size', 64),
+            checkpoint_path=checkpoint,
+            default_dpi=self.config['pipeline'].get('target_dpi'),
+            allowed_formats=self.config['validation'].get('allowed_formats'),
+            quality=ingestion.get('quality')
+        )
+    
+    def metadata_frame(self, documents: List[DocumentMetadata]) -> pd.DataFrame:
+        """Metadata table with the equal-width quality bins used downstream"""
+        df = pd.DataFrame([asdict(doc) for doc in documents], columns=list(DocumentMetadata.__dataclass_fields__))
+        return self.add_quality_bins(df)
+    
+    @staticmethod
+    def add_quality_bins(df: pd.DataFrame) -> pd.DataFrame:
+        if len(df):
+            df['quality_bin'] = pd.cut(df['quality_score'], bins=3, labels=['low', 'medium', 'high'])
+        else:
+            df['quality_bin'] = pd.Series(dtype=object)
+        return df
+    
+    def merge_metadata(self, existing: pd.DataFrame, records: List[Dict], drop_paths) -> pd.DataFrame:
+        """Replace `drop_paths` rows of `existing` with fresh `records`
+        
+        Re-ingested files keep their doc_id; new files get ids after the
+        current maximum, so ids already used in splits never move.
+        """
+        columns = list(DocumentMetadata.__dataclass_fields__)
+        existing = existing.reindex(columns=columns)
+        doc_ids = dict(zip(existing['source_path'], existing['doc_id']))
+        kept = existing[~existing['source_path'].isin(set(drop_paths))]
+        
+        numbers = existing['doc_id'].str.extract(r'(\d+)$', expand=False).dropna().astype(int)
+        next_id = int(numbers.max()) + 1 if len(numbers) else 0
+        fresh = []
+        for record in records:
+            doc_id = doc_ids.get(record['source_path'])
+            if doc_id is None:
+                doc_id, next_id = f"doc_{next_id:06d}", next_id + 1
+            fresh.append(asdict(DocumentMetadata(doc_id=doc_id, **record)))
+        
+        frames = [frame for frame in (kept, pd.DataFrame(fresh, columns=columns)) if len(frame)]
+        merged = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+        return merged.sort_values('source_path', kind='stable').reset_index(drop=True)
+    
+    def assign_duplicate_groups(self, df: pd.DataFrame) -> Dict:
+        """Add a `duplicate_group` column: the first doc_id of each near-duplicate group
+        
+        Splitting by this column keeps re-encoded copies and augmentations
+        of one receipt in the same split.
+        """
+        from src.near_duplicates import duplicate_groups
+        
+        dedup = self.config.get('deduplication', {})
+        result = duplicate_groups(
+            df['perceptual_hash'].tolist(),
+            radius=dedup.get('radius', 8),
+            source_paths=df['source_path'].tolist() if dedup.get('group_by_source_name', True) else None
+        )
+        df['duplicate_group'] = df['doc_id'].to_numpy()[result.pop('labels')] if len(df) else []
+        return result
+    
+    def ingestion_manifest(self):
+        from src.ingestion import IngestionManifest
+        
+        return IngestionManifest(
+            self.processed_dir / self.config.get('ingestion', {}).get('manifest_file', 'ingestion_manifest.json')
+        )
+    
+    def plan_ingestion(self, incremental: bool = True) -> Dict:
+        """Scan raw_dir against the manifest and the current metadata
+        
+        Returns the existing metadata table, the manifest plan, the paths
+        that can be `skipped` and the paths still `todo`. Without
+        `incremental` the manifest is reset and every image is todo.
+        """
+        from src.ingestion import scan_images
+        
+        output_path = self.processed_dir / 'all_metadata.csv'
+        manifest = self.ingestion_manifest()
+        if not incremental:
+            manifest.save({})
+        
+        if incremental and (output_path.exists() or parquet_path(output_path).exists()):
+            existing = read_metadata(output_path)
+        else:
+            existing = pd.DataFrame(columns=list(DocumentMetadata.__dataclass_fields__))
+        known = set(existing['source_path'])
+        
+        plan = manifest.plan(scan_images(self.raw_dir, self.config['validation'].get('allowed_formats')),
+                             self.calculate_checksum)
+        # A manifest entry without a metadata row (e.g. the CSV was edited) is re-ingested
+        skipped = [path for path in plan['skipped'] if path in known]
+        todo = [path for path in plan['skipped'] if path not in known] + plan['added'] + plan['updated']
+        return {"existing": existing, "plan": plan, "skipped": skipped, "todo": todo}
+    
+    def finish_ingestion(self, existing: pd.DataFrame, plan: Dict, skipped: List[str],
+                         records: List[Dict]) -> Dict:
+        """Merge freshly ingested `records` into the metadata and write it with the manifest"""
+        known = set(existing['source_path'])
+        # Rows of files that were not skipped are stale, even if re-ingestion failed
+        stale = known - set(skipped)
+        df = self.merge_metadata(existing, records, stale)
+        duplicates = self.assign_duplicate_groups(df)
+        df = self.add_quality_bins(df)
+        output_path = self.processed_dir / 'all_metadata.csv'
+        storage = self.config.get('storage', {})
+        if storage.get('parquet', True):
+            written = write_metadata(df, output_path, export_csv=storage.get('export_csv', True),
+                                     compression=storage.get('compression', 'zstd'))
+            output_path = output_path if storage.get('export_csv', True) else written
+        else:
+            df.to_csv(output_path, index=False)
+            parquet_path(output_path).unlink(missing_ok=True)
+        
+        entries = {path: plan['entries'][path] for path in skipped}
+        for record in records:
+            path = record['source_path']
+            stat = plan['pending'].get(path) or {k: plan['entries'][path][k] for k in ('size', 'mtime_ns')}
+            entries[path] = dict(stat, checksum=record['checksum'])
+        self.ingestion_manifest().save(entries)
+        
+        ingested = {record['source_path'] for record in records}
+        changes = {
+            "skipped": len(skipped),
+            "added": len(ingested - known),
+            "updated": len(ingested & known),
+            "removed": len(stale - ingested)
+        }
+        return {"df": df, "metadata_path": str(output_path), "changes": changes, "duplicates": duplicates}
+    
+    def run_pipeline(self, workers: Optional[int] = None, resume: bool = True, incremental: bool = True):
+        """Run complete data pipeline: ingest raw images and write all_metadata.csv
+        
+        With `incremental`, the ingestion manifest is used to decode and score
+        only new or changed images, rows of deleted images are dropped, and
+        the results are merged into the existing all_metadata.csv. Without
+        it, every image is re-ingested and the table is rebuilt.
+        """
+        start = time.perf_counter()
+        engine = self.build_ingestion_engine(workers=workers, resume=resume)
+        planned = self.plan_ingestion(incremental=incremental)
+        records = engine.process_paths(planned['todo'])
+        result = self.finish_ingestion(planned['existing'], planned['plan'], planned['skipped'], records)
+        # The manifest now covers everything the checkpoint held; failed images are retried next run
+        if engine.checkpoint:
+            engine.checkpoint.clear()
+        
+        df, changes = result['df'], result['changes']
+        report = {
+            "status": "success",
+            "documents": len(df),
+            "metadata_path": result['metadata_path'],
+            "changes": changes,
+            "duplicates": result['duplicates'],
+            "ingestion": engine.stats,
+            "duration_s": time.perf_counter() - start
+        }
+        print(f"Pipeline execution complete: {len(df)} documents "
+              f"({changes['skipped']} skipped, {changes['added']} added, {changes['updated']} updated, "
+              f"{changes['removed']} removed, {engine.stats['errors']} errors) in {report['duration_s']:.1f}s")
+        return report
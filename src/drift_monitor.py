@@ -0,0 +1,240 @@
+"""
+Drift Monitor
+Offline job over the inference API's request log: rolling feature
+distributions, stage latencies, and PSI/KS drift against the training split
+"""
+import argparse
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import yaml
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src.alert_system import DEFAULT_THRESHOLDS, AlertSystem
+from src.features import FEATURE_NAMES, RAW_FEATURES, feature_matrix
+from src.metadata_store import read_split
+
+STAGES = ("features_ms", "scale_ms", "predict_ms", "total_ms")
+PSI_BINS = 10
+# Floor for empty bins so PSI stays finite
+PSI_EPSILON = 1e-4
+
+
+def _loads(line: bytes):
+    return orjson.loads(line) if orjson is not None else json.loads(line)
+
+
+def iter_log_records(log_dir) -> Iterator[Dict]:
+    """Records from every request-log segment, oldest segment first
+
+    Lines that do not parse (e.g. a segment's last line while a worker is
+    still writing it) are skipped.
+    """
+    for segment in sorted(Path(log_dir).glob("requests-*.jsonl")):
+        with open(segment, "rb") as f:
+            for line in f:
+                try:
+                    yield _loads(line)
+                except ValueError:
+                    continue
+
+
+def load_requests(log_dir, since: Optional[float] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """(inputs, timings) frames from the request log
+
+    `inputs` has one row per scored document (batch records are expanded)
+    with its timestamp and the raw feature columns; `timings` has one row
+    per request with the stage durations in milliseconds.
+    """
+    columns = {name: [] for name in ("ts",) + RAW_FEATURES}
+    timings = []
+    for record in iter_log_records(log_dir):
+        ts = record.get("ts", 0.0)
+        if since is not None and ts < since:
+            continue
+        inputs = record.get("inputs") or {}
+        values = [np.atleast_1d(inputs.get(name, np.nan)) for name in RAW_FEATURES]
+        n = max(len(v) for v in values)
+        columns["ts"].append(np.full(n, ts))
+        for name, v in zip(RAW_FEATURES, values):
+            columns[name].append(np.broadcast_to(v, (n,)))
+        timings.append({"ts": ts, "endpoint": record.get("endpoint"), "rows": n,
+                        **{stage: record.get("timings_ms", {}).get(stage) for stage in STAGES}})
+
+    inputs = pd.DataFrame({name: np.concatenate(parts) if parts else np.zeros(0)
+                           for name, parts in columns.items()})
+    return inputs, pd.DataFrame(timings, columns=["ts", "endpoint", "rows", *STAGES])
+
+
+def psi(reference: np.ndarray, current: np.ndarray, bins: int = PSI_BINS) -> float:
+    """Population stability index of `current` against `reference`
+
+    Bins are reference quantiles (deduplicated, so binary and discrete
+    features get one bin per value).
+    """
+    edges = np.unique(np.quantile(reference, np.linspace(0, 1, bins + 1)[1:-1]))
+    expected = np.bincount(np.searchsorted(edges, reference, side="right"), minlength=len(edges) + 1)
+    actual = np.bincount(np.searchsorted(edges, current, side="right"), minlength=len(edges) + 1)
+    p = np.maximum(expected / expected.sum(), PSI_EPSILON)
+    q = np.maximum(actual / actual.sum(), PSI_EPSILON)
+    return float(((q - p) * np.log(q / p)).sum())
+
+
+def ks_statistic(reference: np.ndarray, current: np.ndarray) -> float:
+    """Two-sample Kolmogorov-Smirnov statistic (max distance between the ECDFs)"""
+    reference, current = np.sort(reference), np.sort(current)
+    grid = np.concatenate([reference, current])
+    cdf_reference = np.searchsorted(reference, grid, side="right") / len(reference)
+    cdf_current = np.searchsorted(current, grid, side="right") / len(current)
+    return float(np.abs(cdf_reference - cdf_current).max())
+
+
+def feature_drift(reference: np.ndarray, current: np.ndarray) -> Dict[str, Dict]:
+    """Per-feature distribution summary and drift for (n, len(FEATURE_NAMES)) matrices"""
+    drift = {}
+    for i, name in enumerate(FEATURE_NAMES):
+        ref, cur = reference[:, i], current[:, i]
+        cur = cur[np.isfinite(cur)]
+        if not len(cur):
+            continue
+        p05, p50, p95 = np.percentile(cur, [5, 50, 95])
+        drift[name] = {
+            "mean": float(cur.mean()),
+            "std": float(cur.std()),
+            "p05": float(p05),
+            "p50": float(p50),
+            "p95": float(p95),
+            "reference_mean": float(ref.mean()),
+            "psi": psi(ref, cur),
+            "ks": ks_statistic(ref, cur),
+        }
+    return drift
+
+
+def latency_summary(timings: pd.DataFrame) -> Dict[str, Dict]:
+    summary = {}
+    for stage in STAGES:
+        values = timings[stage].dropna().to_numpy(dtype=float) if len(timings) else np.zeros(0)
+        if len(values):
+            summary[stage] = {"p50": float(np.percentile(values, 50)), "p99": float(np.percentile(values, 99))}
+    return summary
+
+
+def alert_metrics(features: pd.DataFrame, drift: Dict[str, Dict], timings: pd.DataFrame,
+                  psi_threshold: float = DEFAULT_THRESHOLDS["feature_psi_max"]) -> Dict:
+    """Metrics in the shape AlertSystem.check_thresholds expects
+
+    `drifted_features` lists the features whose PSI exceeds `psi_threshold`.
+    """
+    latency = latency_summary(timings)
+    metrics = {
+        "requests": int(len(features)),
+        "avg_quality_score": float(features["quality_score"].mean()) if len(features) else None,
+        "blur_rate": float(features["has_blur"].mean()) if len(features) else None,
+        "max_psi": max((d["psi"] for d in drift.values()), default=0.0),
+        "max_ks": max((d["ks"] for d in drift.values()), default=0.0),
+        "drifted_features": sorted(name for name, d in drift.items() if d["psi"] > psi_threshold),
+        "latency_p99_ms": latency.get("total_ms", {}).get("p99"),
+    }
+    # Leave out what could not be measured; check_thresholds skips absent metrics
+    return {name: value for name, value in metrics.items() if value is not None}
+
+
+def drift_report(log_dir, splits_dir, window_minutes: float = 60.0, min_window_rows: int = 100,
+                 since: Optional[float] = None, psi_threshold: Optional[float] = None) -> Dict:
+    """Rolling-window and overall drift of logged requests against the training split
+
+    `alert_metrics` describe the most recent window with at least
+    `min_window_rows` documents (all requests if no window has that many).
+    `psi_threshold` defaults to `feature_psi_max` from the alerts config,
+    the threshold AlertSystem alerts on.
+    """
+    if psi_threshold is None:
+        psi_threshold = AlertSystem().config["thresholds"]["feature_psi_max"]
+    reference = feature_matrix(read_split(splits_dir, "train", columns=list(RAW_FEATURES)))
+    inputs, timings = load_requests(log_dir, since=since)
+    window_s = window_minutes * 60.0
+    report = {
+        "generated_at": datetime.now().isoformat(),
+        "log_dir": str(log_dir),
+        "reference_rows": int(len(reference)),
+        "requests": int(len(timings)),
+        "documents": int(len(inputs)),
+        "window_minutes": window_minutes,
+        "windows": [],
+    }
+    if not len(inputs):
+        report["overall"] = {"features": {}, "latency_ms": {}}
+        report["alert_metrics"] = alert_metrics(inputs, {}, timings, psi_threshold)
+        return report
+
+    current = feature_matrix(inputs)
+    window_ids = np.floor(inputs["ts"].to_numpy() / window_s).astype(np.int64)
+    timing_ids = np.floor(timings["ts"].to_numpy() / window_s).astype(np.int64)
+    alert_window = None
+    for window in np.unique(window_ids):
+        rows = window_ids == window
+        drift = feature_drift(reference, current[rows])
+        window_timings = timings[timing_ids == window]
+        report["windows"].append({
+            "start": datetime.fromtimestamp(window * window_s, tz=timezone.utc).isoformat(),
+            "documents": int(rows.sum()),
+            "features": drift,
+            "latency_ms": latency_summary(window_timings),
+        })
+        if rows.sum() >= min_window_rows:
+            alert_window = (inputs[rows], drift, window_timings)
+
+    overall = feature_drift(reference, current)
+    report["overall"] = {"features": overall, "latency_ms": latency_summary(timings)}
+    report["alert_metrics"] = alert_metrics(*(alert_window or (inputs, overall, timings)), psi_threshold)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--config", default="config/pipeline_config.yaml")
+    parser.add_argument("--log-dir", default="logs/requests")
+    parser.add_argument("--splits-dir", help="default: data.splits_dir from the config")
+    parser.add_argument("--alerts-config", default="config/alerts_config.json")
+    parser.add_argument("--window-minutes", type=float, default=60.0)
+    parser.add_argument("--min-window-rows", type=int, default=100)
+    parser.add_argument("--since-hours", type=float, help="only requests from the last N hours")
+    parser.add_argument("--output", default="reports/drift_report.json")
+    args = parser.parse_args(argv)
+
+    with open(args.config) as f:
+        config = yaml.safe_load(f)
+    since = datetime.now().timestamp() - args.since_hours * 3600 if args.since_hours else None
+    alerts = AlertSystem(args.alerts_config)
+    report = drift_report(args.log_dir, args.splits_dir or config["data"]["splits_dir"],
+                          window_minutes=args.window_minutes, min_window_rows=args.min_window_rows,
+                          since=since, psi_threshold=alerts.config["thresholds"]["feature_psi_max"])
+    report["violations"] = alerts.check_thresholds(report["alert_metrics"])
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    metrics = report["alert_metrics"]
+    print(f"Drift report: {report['documents']} documents in {len(report['windows'])} windows, "
+          f"max PSI {metrics['max_psi']:.3f}, max KS {metrics['max_ks']:.3f}")
+    for violation in report["violations"]:
+        print(f"ALERT: {violation}")
+    print(f"Saved → {output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
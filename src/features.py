@@ -0,0 +1,47 @@
+"""
+Feature Engineering
+The one definition of the model's input features, shared by the trainer and
+the inference API. NumPy only, so serving never needs pandas
+"""
+from typing import Any, Iterable, Mapping
+
+import numpy as np
+
+RAW_FEATURES = ("file_size_bytes", "image_width", "image_height", "quality_score", "has_blur")
+DERIVED_FEATURES = ("aspect_ratio", "pixel_count", "size_per_pixel")
+FEATURE_NAMES = RAW_FEATURES + DERIVED_FEATURES
+
+
+def safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Element-wise numerator / denominator, 0.0 where the denominator is 0"""
+    out = np.zeros(np.broadcast(numerator, denominator).shape, dtype=np.float64)
+    return np.divide(numerator, denominator, out=out, where=denominator != 0)
+
+
+def feature_matrix(columns: Mapping[str, Any]) -> np.ndarray:
+    """(n, len(FEATURE_NAMES)) float64 matrix from the raw feature columns
+
+    `columns` is anything indexable by column name: a dict of arrays or
+    lists, a NumPy structured array, or a DataFrame. A zero image height
+    gives an aspect ratio of 0, and zero pixels a size_per_pixel of 0,
+    rather than inf/NaN.
+    """
+    size, width, height, quality, blur = (np.asarray(columns[name], dtype=np.float64) for name in RAW_FEATURES)
+    # Filled feature-major so every column write is contiguous; the transpose is free
+    # and is the layout FlatForest.predict_proba traverses
+    matrix = np.empty((len(FEATURE_NAMES), len(size)), dtype=np.float64)
+    matrix[0] = size
+    matrix[1] = width
+    matrix[2] = height
+    matrix[3] = quality
+    matrix[4] = blur
+    matrix[5] = safe_divide(width, height)
+    np.multiply(width, height, out=matrix[6])
+    matrix[7] = safe_divide(size, matrix[6])
+    return matrix.T
+
+
+def records_matrix(records: Iterable[Any]) -> np.ndarray:
+    """feature_matrix for objects exposing the raw features as attributes (e.g. request models)"""
+    records = list(records)
+    return feature_matrix({name: [getattr(record, name) for record in records] for name in RAW_FEATURES})
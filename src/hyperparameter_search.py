@@ -0,0 +1,230 @@
+"""
+Hyperparameter Search
+Random and successive-halving search for the baseline forest, scored on
+validation F1 and inference cost, with a Pareto-optimal pick
+"""
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import f1_score
+
+DEFAULT_SPACE = {
+    "n_estimators": [10, 25, 50, 100, 200],
+    "max_depth": [3, 4, 6, 8, 10, 12, 16],
+    "min_samples_leaf": [1, 2, 5, 10, 20],
+    "max_features": ["sqrt", 0.5, 1.0],
+}
+
+# Set once per worker process by _init_worker so trials don't re-pickle the data
+_DATA: Dict = {}
+
+
+def sample_configs(space: Dict[str, Sequence], n_trials: int, seed: int) -> List[Dict]:
+    """`n_trials` distinct parameter sets drawn uniformly from `space`"""
+    rng = np.random.RandomState(seed)
+    n_combinations = math.prod(len(values) for values in space.values())
+    configs, seen = [], set()
+    while len(configs) < min(n_trials, n_combinations):
+        params = {name: values[rng.randint(len(values))] for name, values in sorted(space.items())}
+        key = tuple(sorted(params.items(), key=lambda item: item[0]))
+        if key not in seen:
+            seen.add(key)
+            configs.append({name: (v.item() if hasattr(v, "item") else v) for name, v in params.items()})
+    return configs
+
+
+def decision_cost(model, X) -> float:
+    """Mean tree nodes visited per row, summed over trees: the work one prediction does"""
+    path = model.decision_path(X)
+    # Forests return (indicator, node offsets); a single tree returns the indicator
+    indicator = path[0] if isinstance(path, tuple) else path
+    return float(indicator.sum() / len(X))
+
+
+def measure_latency_us(model, row: np.ndarray, repeats: int = 200) -> float:
+    """Median single-row predict_proba latency of the compiled form the API serves"""
+    from src.model_export import FlatForest
+
+    forest = FlatForest.from_sklearn(model)
+    row = np.asarray(row, dtype=np.float64).reshape(1, -1)
+    forest.predict_proba(row)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        forest.predict_proba(row)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1e6)
+
+
+def pareto_front(scores: Sequence[float], costs: Sequence[float]) -> List[int]:
+    """Indices not dominated on (higher score, lower cost)"""
+    front = []
+    for i, (score, cost) in enumerate(zip(scores, costs)):
+        dominated = any(
+            (s >= score and c <= cost) and (s > score or c < cost)
+            for j, (s, c) in enumerate(zip(scores, costs)) if j != i
+        )
+        if not dominated:
+            front.append(i)
+    return front
+
+
+def pareto_ranks(scores: Sequence[float], costs: Sequence[float]) -> List[int]:
+    """Non-dominated sorting: 0 for the front, 1 for the front without it, ..."""
+    ranks = [None] * len(scores)
+    remaining = list(range(len(scores)))
+    rank = 0
+    while remaining:
+        front = pareto_front([scores[i] for i in remaining], [costs[i] for i in remaining])
+        for position in front:
+            ranks[remaining[position]] = rank
+        remaining = [i for k, i in enumerate(remaining) if k not in set(front)]
+        rank += 1
+    return ranks
+
+
+def _init_worker(X_train, y_train, X_val, y_val):
+    _DATA.update(X_train=X_train, y_train=y_train, X_val=X_val, y_val=y_val)
+
+
+def _fit_trial(trial_id: int, params: Dict, rows: Optional[np.ndarray], seed: int) -> Dict:
+    X_train, y_train = _DATA["X_train"], _DATA["y_train"]
+    if rows is not None:
+        X_train, y_train = X_train[rows], y_train[rows]
+    start = time.perf_counter()
+    model = RandomForestClassifier(**params, random_state=seed, n_jobs=1)
+    model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - start
+    val_pred = model.predict(_DATA["X_val"])
+    return {
+        "trial": trial_id,
+        "params": params,
+        "train_rows": len(X_train),
+        "val_f1": float(f1_score(_DATA["y_val"], val_pred, average="weighted")),
+        "decision_cost": decision_cost(model, _DATA["X_val"]),
+        "fit_seconds": fit_s,
+        "model": model,
+    }
+
+
+class HyperparameterSearch:
+    """Random or successive-halving search over RandomForest parameters
+
+    Successive halving starts every configuration on a small, nested
+    subsample of the training rows and promotes the best 1/`eta` of each
+    rung to `eta` times more rows, so weak configurations stop early. A
+    rung is ranked by Pareto rank on (validation F1, cost) and then F1.
+
+    `latency_objective` picks the cost: "decision_cost" (nodes visited per
+    row, deterministic, so the whole search and its pick reproduce exactly
+    from `seed`) or "measured" (median single-row latency, noisy). Measured
+    latency is always recorded for the final candidates. The pick is the
+    cheapest model on the final Pareto front whose F1 is within
+    `f1_tolerance` of the best.
+    """
+
+    def __init__(self, strategy: str = "successive_halving", n_trials: int = 27, eta: int = 3,
+                 min_fraction: float = 0.1, workers: Optional[int] = None, seed: int = 42,
+                 space: Optional[Dict[str, Sequence]] = None, latency_objective: str = "decision_cost",
+                 f1_tolerance: float = 0.005, latency_repeats: int = 200):
+        if strategy not in ("random", "successive_halving"):
+            raise ValueError(f"Unknown search strategy '{strategy}'")
+        if latency_objective not in ("decision_cost", "measured"):
+            raise ValueError(f"Unknown latency objective '{latency_objective}'")
+        self.strategy = strategy
+        self.n_trials = n_trials
+        self.eta = max(2, eta)
+        self.min_fraction = min_fraction
+        self.workers = workers or os.cpu_count() or 1
+        self.seed = seed
+        self.space = space or DEFAULT_SPACE
+        self.latency_objective = latency_objective
+        self.f1_tolerance = f1_tolerance
+        self.latency_repeats = latency_repeats
+
+    def rung_fractions(self, n_configs: int) -> List[float]:
+        if self.strategy == "random":
+            return [1.0]
+        n_rungs = max(1, int(math.floor(math.log(max(n_configs, 1), self.eta) + 1e-9)) + 1)
+        return [max(self.min_fraction, self.eta ** (k - n_rungs + 1)) for k in range(n_rungs)]
+
+    def _run_rung(self, executor, configs: List[Dict], rows: Optional[np.ndarray]) -> List[Dict]:
+        # Trial seeds depend only on the search seed and trial id, never on scheduling
+        jobs = [(trial_id, params, rows, self.seed + trial_id) for trial_id, params in configs]
+        if executor is None:
+            return [_fit_trial(*job) for job in jobs]
+        return list(executor.map(_fit_trial, *zip(*jobs)))
+
+    def _cost(self, trial: Dict) -> float:
+        return trial["latency_us"] if self.latency_objective == "measured" else trial["decision_cost"]
+
+    def run(self, X_train, y_train, X_val, y_val, log_trial=None) -> Dict:
+        """Search, then return the selected trial, the final front and every trial
+
+        `log_trial(trial, rung)` is called in this process for each finished
+        trial (the trainer logs it as a nested MLflow run).
+        """
+        X_train, y_train = np.asarray(X_train), np.asarray(y_train)
+        X_val, y_val = np.asarray(X_val), np.asarray(y_val)
+        start = time.perf_counter()
+        configs = list(enumerate(sample_configs(self.space, self.n_trials, self.seed)))
+        order = np.random.RandomState(self.seed).permutation(len(X_train))
+        row = X_val[:1]
+
+        fractions = self.rung_fractions(len(configs))
+        executor = None
+        if self.workers > 1:
+            executor = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                           initargs=(X_train, y_train, X_val, y_val))
+        else:
+            _init_worker(X_train, y_train, X_val, y_val)
+        history = []
+        try:
+            for rung, fraction in enumerate(fractions):
+                n_rows = max(1, int(round(fraction * len(X_train))))
+                rows = None if n_rows >= len(X_train) else np.sort(order[:n_rows])
+                trials = self._run_rung(executor, configs, rows)
+                last = rung == len(fractions) - 1
+                if last or self.latency_objective == "measured":
+                    for trial in trials:
+                        trial["latency_us"] = measure_latency_us(trial["model"], row, self.latency_repeats)
+                for trial in trials:
+                    trial["rung"] = rung
+                    if log_trial:
+                        log_trial(trial, rung)
+                history.extend(trials)
+                if last:
+                    break
+
+                scores = [t["val_f1"] for t in trials]
+                ranks = pareto_ranks(scores, [self._cost(t) for t in trials])
+                ranked = sorted(range(len(trials)), key=lambda i: (ranks[i], -scores[i], trials[i]["trial"]))
+                keep = max(1, int(math.ceil(len(trials) / self.eta)))
+                configs = [(trials[i]["trial"], trials[i]["params"]) for i in ranked[:keep]]
+                for trial in trials:
+                    trial.pop("model")
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        final = [t for t in history if "model" in t]
+        scores = [t["val_f1"] for t in final]
+        costs = [self._cost(t) for t in final]
+        front = [final[i] for i in pareto_front(scores, costs)]
+        best_f1 = max(scores)
+        eligible = [t for t in front if t["val_f1"] >= best_f1 - self.f1_tolerance]
+        selected = min(eligible, key=lambda t: (self._cost(t), -t["val_f1"], t["trial"]))
+        return {
+            "selected": selected,
+            "front": front,
+            "trials": history,
+            "strategy": self.strategy,
+            "latency_objective": self.latency_objective,
+            "rung_fractions": fractions,
+            "duration_s": time.perf_counter() - start,
+        }
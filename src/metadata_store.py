@@ -0,0 +1,297 @@
+"""
+LedgerX Metadata Store
+Typed Parquet storage for document metadata with column projection and
+predicate pushdown, falling back to the legacy CSV files
+"""
+import shutil
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+QUALITY_BINS = ["low", "medium", "high"]
+
+# Column dtypes shared by all_metadata and the splits; unknown columns are left as read
+CATEGORICAL_COLUMNS = {
+    "doc_type": None,
+    "file_format": None,
+    "quality_bin": pd.CategoricalDtype(QUALITY_BINS, ordered=True),
+}
+INTEGER_COLUMNS = ["file_size_bytes", "image_width", "image_height"]
+NULLABLE_INTEGER_COLUMNS = ["dpi"]
+FLOAT_COLUMNS = ["quality_score"]
+BOOLEAN_COLUMNS = ["has_blur", "has_all"]
+STRING_COLUMNS = ["doc_id", "source_path", "vendor", "timestamp", "checksum",
+                  "perceptual_hash", "duplicate_group"]
+
+# Arrow-backed strings avoid one Python object per cell
+STRING_DTYPE = "string[pyarrow]" if pa is not None else "string"
+
+# Hive-partitioned (split=train/val/test) Parquet dataset next to the split CSVs
+SPLITS_DATASET = "metadata.parquet"
+
+Filter = Tuple[str, str, object]
+
+
+def parquet_available() -> bool:
+    return pa is not None
+
+
+def _cast(df: pd.DataFrame, column: str, dtype):
+    if column in df and df[column].dtype != dtype:
+        df[column] = df[column].astype(dtype)
+
+
+def normalize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast known metadata columns to compact, explicit dtypes"""
+    df = df.copy(deep=False)
+    for column, dtype in CATEGORICAL_COLUMNS.items():
+        if column in df and not (dtype is None and isinstance(df[column].dtype, pd.CategoricalDtype)):
+            _cast(df, column, dtype or "category")
+    for column in INTEGER_COLUMNS:
+        _cast(df, column, "int64")
+    for column in NULLABLE_INTEGER_COLUMNS:
+        _cast(df, column, "Int64")
+    for column in FLOAT_COLUMNS:
+        _cast(df, column, "float64")
+    for column in BOOLEAN_COLUMNS:
+        if column in df and df[column].dtype != bool:
+            df[column] = df[column].map({True: True, False: False, "True": True, "False": False}).astype("boolean")
+    for column in STRING_COLUMNS:
+        _cast(df, column, STRING_DTYPE)
+    return df
+
+
+def parquet_path(path) -> Path:
+    """Parquet location for a metadata path given with either suffix"""
+    path = Path(path)
+    return path.with_suffix(".parquet") if path.suffix == ".csv" else path
+
+
+def csv_path(path) -> Path:
+    path = Path(path)
+    return path.with_suffix(".csv") if path.suffix == ".parquet" else path
+
+
+def write_metadata(df: pd.DataFrame, path, partition_cols: Optional[List[str]] = None,
+                   export_csv: bool = False, compression: str = "zstd") -> Path:
+    """Write `df` as Parquet at `path` (a directory of partitions if `partition_cols`)
+
+    With `export_csv` the CSV twin is written too, for tools that still
+    read text. Without pyarrow only the CSV is written.
+    """
+    target = parquet_path(path)
+    if export_csv or not parquet_available():
+        df.to_csv(csv_path(path), index=False)
+        if not parquet_available():
+            return csv_path(path)
+
+    table = pa.Table.from_pandas(normalize_dtypes(df), preserve_index=False)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if partition_cols:
+        pq.write_to_dataset(table, target, partition_cols=partition_cols, compression=compression,
+                            existing_data_behavior="delete_matching")
+    else:
+        tmp = target.with_name(target.name + ".tmp")
+        pq.write_table(table, tmp, compression=compression)
+        tmp.replace(target)
+    return target
+
+
+def _compare(values, op: str, value):
+    """Shared comparison for Arrow expressions and pandas Series"""
+    if op in ("=", "=="):
+        return values == value
+    if op == "!=":
+        return values != value
+    if op == "<":
+        return values < value
+    if op == "<=":
+        return values <= value
+    if op == ">":
+        return values > value
+    if op == ">=":
+        return values >= value
+    if op == "in":
+        return values.isin(list(value))
+    if op == "not in":
+        return ~values.isin(list(value))
+    raise ValueError(f"Unsupported filter operator '{op}'")
+
+
+def _filter_expression(filters: Sequence[Filter]):
+    expression = None
+    for column, op, value in filters:
+        term = _compare(ds.field(column), op, value)
+        expression = term if expression is None else expression & term
+    return expression
+
+
+def _apply_filters(df: pd.DataFrame, filters: Sequence[Filter]) -> pd.DataFrame:
+    mask = np.ones(len(df), dtype=bool)
+    for column, op, value in filters:
+        mask &= _compare(df[column], op, value).fillna(False).to_numpy(dtype=bool)
+    return df[mask].reset_index(drop=True)
+
+
+def _arrow_to_pandas(data) -> pd.DataFrame:
+    # Map Arrow strings straight to Arrow-backed pandas strings instead of Python objects
+    strings = pd.StringDtype("pyarrow")
+    return normalize_dtypes(data.to_pandas(types_mapper={pa.string(): strings, pa.large_string(): strings}.get))
+
+
+def read_metadata(path, columns: Optional[Iterable[str]] = None,
+                  filters: Optional[Sequence[Filter]] = None) -> pd.DataFrame:
+    """Read metadata, preferring Parquet and falling back to CSV
+
+    `columns` projects the read, so unused long strings (source_path,
+    checksum, ...) are never decoded. `filters` are (column, op, value)
+    triples ANDed together; on Parquet they prune partitions and row
+    groups before any rows are materialised. Either suffix may be passed.
+    """
+    columns = list(columns) if columns is not None else None
+    filters = list(filters or [])
+    target = parquet_path(path)
+    if parquet_available() and target.exists():
+        dataset = ds.dataset(target, format="parquet", partitioning="hive")
+        table = dataset.to_table(columns=columns, filter=_filter_expression(filters) if filters else None)
+        return _arrow_to_pandas(table)
+
+    source = csv_path(path)
+    filter_columns = [column for column, _, _ in filters]
+    usecols = None if columns is None else list(dict.fromkeys(columns + filter_columns))
+    df = normalize_dtypes(pd.read_csv(source, usecols=usecols))
+    if filters:
+        df = _apply_filters(df, filters)
+    return df[columns] if columns is not None else df
+
+
+def read_split(splits_dir, split: str, columns: Optional[Iterable[str]] = None,
+               filters: Optional[Sequence[Filter]] = None) -> pd.DataFrame:
+    """One split from the `split`-partitioned dataset, else from `<split>_metadata.csv`"""
+    splits_dir = Path(splits_dir)
+    dataset = splits_dir / SPLITS_DATASET
+    if parquet_available() and dataset.exists():
+        columns = list(columns) if columns is not None else None
+        df = read_metadata(dataset, columns=columns, filters=[("split", "=", split)] + list(filters or []))
+        return df if columns is not None else df.drop(columns="split")
+    return read_metadata(splits_dir / f"{split}_metadata.csv", columns=columns, filters=filters)
+
+
+def iter_metadata(path, columns: Optional[Iterable[str]] = None,
+                  filters: Optional[Sequence[Filter]] = None,
+                  batch_rows: int = 65536) -> Iterator[pd.DataFrame]:
+    """Like read_metadata, but yields DataFrames of at most `batch_rows` rows
+
+    Only one batch is materialised at a time, so memory is bounded by
+    `batch_rows` rather than the file size.
+    """
+    columns = list(columns) if columns is not None else None
+    filters = list(filters or [])
+    target = parquet_path(path)
+    if parquet_available() and target.exists():
+        dataset = ds.dataset(target, format="parquet", partitioning="hive")
+        batches = dataset.to_batches(columns=columns, batch_size=batch_rows,
+                                     filter=_filter_expression(filters) if filters else None)
+        for batch in batches:
+            if batch.num_rows:
+                yield _arrow_to_pandas(batch)
+        return
+
+    filter_columns = [column for column, _, _ in filters]
+    usecols = None if columns is None else list(dict.fromkeys(columns + filter_columns))
+    for chunk in pd.read_csv(csv_path(path), usecols=usecols, chunksize=batch_rows):
+        chunk = normalize_dtypes(chunk)
+        if filters:
+            chunk = _apply_filters(chunk, filters)
+        if len(chunk):
+            yield chunk[columns] if columns is not None else chunk
+
+
+def iter_split(splits_dir, split: str, columns: Optional[Iterable[str]] = None,
+               filters: Optional[Sequence[Filter]] = None, batch_rows: int = 65536) -> Iterator[pd.DataFrame]:
+    """read_split in batches of at most `batch_rows` rows"""
+    splits_dir = Path(splits_dir)
+    dataset = splits_dir / SPLITS_DATASET
+    if parquet_available() and dataset.exists():
+        columns = list(columns) if columns is not None else None
+        for batch in iter_metadata(dataset, columns=columns, batch_rows=batch_rows,
+                                   filters=[("split", "=", split)] + list(filters or [])):
+            yield batch if columns is not None else batch.drop(columns="split")
+        return
+    yield from iter_metadata(splits_dir / f"{split}_metadata.csv", columns=columns,
+                             filters=filters, batch_rows=batch_rows)
+
+
+def metadata_columns(path) -> List[str]:
+    """Column names without reading any rows"""
+    target = parquet_path(path)
+    if parquet_available() and target.exists():
+        return ds.dataset(target, format="parquet", partitioning="hive").schema.names
+    return list(pd.read_csv(csv_path(path), nrows=0).columns)
+
+
+def csv_to_parquet(source, target=None, partition_cols: Optional[List[str]] = None,
+                   extra_columns: Optional[dict] = None, compression: str = "zstd",
+                   block_size: int = 1 << 24) -> Path:
+    """Convert a CSV to Parquet in streamed record batches (bounded memory)
+
+    `extra_columns` adds constant columns, e.g. {"split": "train"} before
+    appending to a dataset partitioned by split.
+    """
+    target = parquet_path(target or source)
+    reader = pa_csv.open_csv(source, read_options=pa_csv.ReadOptions(block_size=block_size))
+
+    def to_table(frame: pd.DataFrame):
+        frame = normalize_dtypes(frame)
+        for column, value in (extra_columns or {}).items():
+            frame[column] = value
+        return pa.Table.from_pandas(frame, preserve_index=False)
+
+    def batches():
+        empty = True
+        for batch in reader:
+            empty = False
+            yield to_table(batch.to_pandas())
+        if empty:
+            # A header-only CSV still replaces the previous output
+            yield to_table(reader.schema.empty_table().to_pandas())
+
+    if partition_cols:
+        if all(column in (extra_columns or {}) for column in partition_cols):
+            # delete_matching only clears partitions a batch writes to, and an empty
+            # CSV writes none, so clear this file's partition up front
+            partition = target.joinpath(*(f"{column}={extra_columns[column]}" for column in partition_cols))
+            if partition.exists():
+                shutil.rmtree(partition)
+        for i, table in enumerate(batches()):
+            pq.write_to_dataset(table, target, partition_cols=partition_cols, compression=compression,
+                                basename_template=f"part-{i}-{{i}}.parquet",
+                                existing_data_behavior="delete_matching" if i == 0 else "overwrite_or_ignore")
+        if target.exists() and not any(target.rglob("*.parquet")):
+            # An empty dataset has no schema to read; readers fall back to the CSVs
+            shutil.rmtree(target)
+        return target
+
+    writer = None
+    tmp = target.with_name(target.name + ".tmp")
+    try:
+        for table in batches():
+            if writer is None:
+                writer = pq.ParquetWriter(tmp, table.schema, compression=compression)
+            writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is not None:
+        tmp.replace(target)
+    return target
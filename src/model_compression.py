@@ -0,0 +1,126 @@
+"""
+Model Compression
+Greedy tree pruning and single-tree distillation of a trained forest into
+a family of candidates measured on accuracy, per-row latency and size
+"""
+import copy
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.tree import DecisionTreeClassifier
+
+from src.hyperparameter_search import decision_cost, measure_latency_us
+from src.model_export import export_inference_model
+
+OBJECTIVES = ("decision_cost", "latency_us", "artifact_bytes")
+
+
+def tree_probabilities(model, X) -> np.ndarray:
+    """(n_trees, n_rows, n_classes) per-tree class probabilities"""
+    X = np.asarray(X, dtype=np.float32)
+    return np.stack([tree.predict_proba(X) for tree in model.estimators_])
+
+
+def greedy_tree_selection(model, X_val, y_val, max_trees: Optional[int] = None) -> List[int]:
+    """Forward selection of trees by validation accuracy of the averaged ensemble
+
+    Each step adds the tree whose inclusion gives the highest accuracy,
+    breaking ties on the mean probability of the true class and then on
+    the lowest tree index, so the order is deterministic. Any prefix of the
+    returned order is the greedily best sub-forest of that size.
+    """
+    probs = tree_probabilities(model, X_val)
+    class_index = {label: i for i, label in enumerate(model.classes_)}
+    target = np.array([class_index[label] for label in np.asarray(y_val)])
+    rows = np.arange(len(target))
+
+    n_trees = len(probs) if max_trees is None else min(max_trees, len(probs))
+    remaining = list(range(len(probs)))
+    total = np.zeros(probs.shape[1:])
+    order = []
+    while len(order) < n_trees:
+        trial = total[None] + probs[remaining]
+        accuracy = (trial.argmax(axis=2) == target).mean(axis=1)
+        margin = trial[:, rows, target].mean(axis=1) / (len(order) + 1)
+        best = max(range(len(remaining)), key=lambda k: (accuracy[k], margin[k], -remaining[k]))
+        tree = remaining.pop(best)
+        order.append(tree)
+        total += probs[tree]
+    return order
+
+
+def subforest(model, indices: Sequence[int]):
+    """Shallow copy of a fitted forest restricted to `indices` of its trees"""
+    pruned = copy.copy(model)
+    pruned.estimators_ = [model.estimators_[i] for i in indices]
+    pruned.n_estimators = len(pruned.estimators_)
+    return pruned
+
+
+def distill_tree(teacher, X_train, max_depth: int, seed: int = 42) -> DecisionTreeClassifier:
+    """Single decision tree fitted to the teacher's predictions on the training rows"""
+    student = DecisionTreeClassifier(max_depth=max_depth, random_state=seed)
+    return student.fit(X_train, teacher.predict(X_train))
+
+
+def artifact_bytes(model, scaler) -> int:
+    """On-disk size of the fused inference artifact the API would load"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = export_inference_model(model, scaler, Path(tmp) / "model")
+        if path is None:
+            return 0
+        return sum(f.stat().st_size for f in Path(path).iterdir())
+
+
+def n_nodes(model) -> int:
+    return sum(tree.tree_.node_count for tree in getattr(model, "estimators_", [model]))
+
+
+def candidate_family(model, scaler, X_train, X_val, y_val, tree_counts: Sequence[int] = (1, 3, 5, 10, 20, 50),
+                     distill_depths: Sequence[int] = (4, 6, 8), seed: int = 42,
+                     latency_repeats: int = 200) -> List[Dict]:
+    """The full forest, its greedily pruned prefixes and distilled trees, each measured"""
+    X_val = np.asarray(X_val)
+    candidates = [("full", "forest", model)]
+    if hasattr(model, "estimators_"):
+        counts = sorted({k for k in tree_counts if 0 < k < len(model.estimators_)})
+        if counts:
+            order = greedy_tree_selection(model, X_val, y_val, max_trees=max(counts))
+            candidates += [(f"pruned_{k}", "pruned", subforest(model, order[:k])) for k in counts]
+    candidates += [(f"distilled_depth_{depth}", "distilled", distill_tree(model, X_train, depth, seed))
+                   for depth in distill_depths]
+
+    family = []
+    for name, kind, candidate in candidates:
+        pred = candidate.predict(X_val)
+        family.append({
+            "name": name,
+            "kind": kind,
+            "n_trees": len(getattr(candidate, "estimators_", [candidate])),
+            "n_nodes": n_nodes(candidate),
+            "val_accuracy": float(accuracy_score(y_val, pred)),
+            "val_f1": float(f1_score(y_val, pred, average="weighted")),
+            "decision_cost": decision_cost(candidate, X_val),
+            "latency_us": measure_latency_us(candidate, X_val[:1], latency_repeats),
+            "artifact_bytes": artifact_bytes(candidate, scaler),
+            "model": candidate,
+        })
+    return family
+
+
+def select_candidate(family: List[Dict], accuracy_tolerance: float = 0.005,
+                     objective: str = "decision_cost") -> Dict:
+    """Cheapest candidate whose validation accuracy is within `accuracy_tolerance` of the full model
+
+    `decision_cost` (nodes visited per row) is deterministic and tracks
+    latency; `latency_us` uses the measured timings; `artifact_bytes`
+    minimises the served file size.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown compression objective '{objective}'")
+    reference = next(c for c in family if c["name"] == "full")
+    eligible = [c for c in family if c["val_accuracy"] >= reference["val_accuracy"] - accuracy_tolerance]
+    return min(eligible, key=lambda c: (c[objective], -c["val_accuracy"], c["n_nodes"], c["name"]))
@@ -0,0 +1,414 @@
+"""
+Model Export
+Flattens trained models into contiguous NumPy arrays for serving, with the
+StandardScaler folded in so inference runs directly on raw features
+"""
+import json
+import os
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+FLAT_FORMAT_VERSION = 1
+FLAT_ARRAYS = ["feature", "threshold", "left", "right", "value", "roots"]
+# Traversal layout derived by FlatForest._compile, persisted so it can be memory-mapped too
+COMPILED_ARRAYS = ["slot_feature", "slot_threshold", "slot_children"]
+LINEAR_ARRAYS = ["coef", "intercept"]
+
+
+def _save_array(path: Path, name: str, array: np.ndarray):
+    # Write-then-rename: processes that memory-mapped the old file keep its inode
+    tmp = path / f".{name}.npy.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, np.asarray(array))
+    os.replace(tmp, path / f"{name}.npy")
+
+
+def _save_header(path: Path, header: dict):
+    tmp = path / ".model.json.tmp"
+    with open(tmp, "w") as f:
+        json.dump(header, f, indent=2)
+    os.replace(tmp, path / "model.json")
+
+
+def scaler_affine(scaler, n_features: int):
+    """Return (mean, scale) such that scaler.transform(x) == (x - mean) / scale"""
+    mean = getattr(scaler, "mean_", None)
+    scale = getattr(scaler, "scale_", None)
+    mean = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+    scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+    return mean, scale
+
+
+def fold_thresholds(threshold, mean, scale, max_iter: int = 200) -> np.ndarray:
+    """Map split thresholds from scaled space back to raw-feature space
+
+    sklearn decides a split with `float32((x - mean) / scale) <= t`, which
+    is non-decreasing in x, so there is an exact largest raw value that
+    still goes left. `t * scale + mean` is within a float32 ulp of it; a
+    vectorized bisection over float64 pins down the exact boundary so the
+    folded forest reproduces the scaler+model pair bit for bit.
+    """
+    threshold = np.asarray(threshold, dtype=np.float64)
+
+    def goes_left(x):
+        scaled = ((x - mean) / scale).astype(np.float32).astype(np.float64)
+        return scaled <= threshold
+
+    guess = threshold * scale + mean
+    width = 1e-5 * (np.abs(guess) + scale)
+    lo, hi = guess - width, guess + width
+    for _ in range(32):
+        bad_lo, bad_hi = ~goes_left(lo), goes_left(hi)
+        if not (bad_lo.any() or bad_hi.any()):
+            break
+        width = np.where(bad_lo | bad_hi, width * 16, width)
+        lo = np.where(bad_lo, guess - width, lo)
+        hi = np.where(bad_hi, guess + width, hi)
+    else:
+        raise ValueError("Could not bracket folded thresholds")
+
+    for _ in range(max_iter):
+        mid = lo + (hi - lo) / 2
+        active = (mid != lo) & (mid != hi)
+        if not active.any():
+            break
+        left = goes_left(mid)
+        lo = np.where(active & left, mid, lo)
+        hi = np.where(active & ~left, mid, hi)
+    return lo
+
+
+class FlatForest:
+    """Array-backed random forest predictor
+
+    Every tree is stored in the same set of contiguous arrays (split feature,
+    split threshold, child pointers and per-node class distributions) and
+    all trees are traversed together with vectorized NumPy indexing. Leaf
+    nodes point to themselves, so a fixed `max_depth` iterations reaches a
+    leaf for every (row, tree) pair without per-node branching.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots,
+                 classes: List[str], max_depth: int, n_features: int,
+                 scaler_folded: bool = False, compiled: Optional[dict] = None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes_ = np.asarray(classes)
+        self.max_depth = int(max_depth)
+        self.n_features_in_ = int(n_features)
+        self.scaler_folded = bool(scaler_folded)
+        # Folded thresholds live in raw-feature space, where float32 would lose precision
+        self.input_dtype = np.float64 if self.scaler_folded else np.float32
+        if compiled is not None:
+            self._slot_feature = compiled["slot_feature"]
+            self._slot_threshold = compiled["slot_threshold"]
+            self._slot_children = compiled["slot_children"]
+        else:
+            self._compile()
+        self._slot_roots = (2 * np.asarray(self.roots)).astype(np.intp)[:, None]
+
+    def _compile(self):
+        """Derive the traversal layout used by predict_proba
+
+        Node `i` owns slots `2i` (go right) and `2i + 1` (go left), so one
+        step is `slot = children[slot + go_left]` with no `np.where`. sklearn
+        compares float32 inputs against float64 thresholds; rounding each
+        threshold down to the nearest float32 keeps `x <= t` exact while the
+        comparison runs entirely in float32.
+        """
+        threshold = self.threshold.astype(self.input_dtype)
+        rounded_up = threshold.astype(np.float64) > self.threshold
+        threshold[rounded_up] = np.nextafter(threshold[rounded_up], self.input_dtype(-np.inf))
+
+        self._slot_feature = np.repeat(self.feature, 2).astype(np.intp)
+        self._slot_threshold = np.repeat(threshold, 2)
+        self._slot_children = (2 * np.stack([self.right, self.left], axis=1)).ravel().astype(np.intp)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @classmethod
+    def from_sklearn(cls, model) -> "FlatForest":
+        """Build from a fitted RandomForestClassifier (or single decision tree)"""
+        estimators = getattr(model, "estimators_", [model])
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == -1
+            local = np.arange(n)
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            lefts.append(np.where(is_leaf, local, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, local, tree.children_right) + offset)
+
+            # Per-node class distribution, normalised as in DecisionTreeClassifier.predict_proba
+            node_values = tree.value[:, 0, :].astype(np.float64)
+            totals = node_values.sum(axis=1, keepdims=True)
+            totals[totals == 0] = 1.0
+            values.append(node_values / totals)
+
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.int32),
+            right=np.concatenate(rights).astype(np.int32),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int32),
+            classes=[str(c) for c in model.classes_],
+            max_depth=max_depth,
+            n_features=model.n_features_in_
+        )
+
+    def fold_scaler(self, scaler) -> "FlatForest":
+        """Return a copy that accepts unscaled features
+
+        StandardScaler is a per-feature increasing affine map, so the split
+        `(x - mean) / scale <= t` is the same as `x <= t * scale + mean`
+        (made exact by `fold_thresholds`). Rewriting the thresholds removes
+        the transform pass at inference.
+        """
+        if self.scaler_folded:
+            raise ValueError("Scaler already folded into this forest")
+        mean, scale = scaler_affine(scaler, self.n_features_in_)
+        return FlatForest(
+            feature=self.feature,
+            threshold=fold_thresholds(self.threshold, mean[self.feature], scale[self.feature]),
+            left=self.left,
+            right=self.right,
+            value=self.value,
+            roots=self.roots,
+            classes=list(self.classes_),
+            max_depth=self.max_depth,
+            n_features=self.n_features_in_,
+            scaler_folded=True
+        )
+
+    def _predict_proba_chunk(self, X_t: np.ndarray) -> np.ndarray:
+        # X_t is feature-major (n_features, n_rows), so row r of feature f is f * n + r
+        n_rows = X_t.shape[1]
+        flat_x = X_t.ravel()
+        rows = np.arange(n_rows, dtype=np.intp)
+        slot = np.repeat(self._slot_roots, n_rows, axis=1)
+        for _ in range(self.max_depth):
+            idx = self._slot_feature.take(slot)
+            idx *= n_rows
+            idx += rows
+            slot += flat_x.take(idx) <= self._slot_threshold.take(slot)
+            slot = self._slot_children.take(slot)
+        # Summing over the leading tree axis accumulates trees in order, as sklearn does
+        return self.value.take(slot >> 1, axis=0).sum(axis=0) / self.n_trees
+
+    def predict_proba(self, X, chunk_size: int = 1024) -> np.ndarray:
+        """Class probabilities, matching sklearn's RandomForest predict_proba"""
+        X = np.asarray(X, dtype=self.input_dtype)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"Expected input of shape (n, {self.n_features_in_}), got {X.shape}"
+            )
+        X_t = X.T
+        if len(X) <= chunk_size:
+            return self._predict_proba_chunk(np.ascontiguousarray(X_t))
+        return np.concatenate([
+            self._predict_proba_chunk(np.ascontiguousarray(X_t[:, start:start + chunk_size]))
+            for start in range(0, len(X), chunk_size)
+        ])
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def save(self, path):
+        """Write one uncompressed .npy file per array plus a JSON header into `path`"""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in FLAT_ARRAYS:
+            _save_array(path, name, getattr(self, name))
+        for name in COMPILED_ARRAYS:
+            _save_array(path, name, getattr(self, f"_{name}"))
+        header = {
+            "format_version": FLAT_FORMAT_VERSION,
+            "kind": "forest",
+            "classes": [str(c) for c in self.classes_],
+            "scaler_folded": self.scaler_folded,
+            "max_depth": self.max_depth,
+            "n_features": self.n_features_in_,
+            "n_trees": self.n_trees,
+            "n_nodes": self.n_nodes
+        }
+        _save_header(path, header)
+        return path
+
+    @classmethod
+    def load(cls, path, mmap_mode: Optional[str] = None) -> "FlatForest":
+        """Load a saved forest
+
+        With `mmap_mode="r"` the arrays are memory-mapped read-only instead of
+        copied into the heap, so worker processes serving the same artifact
+        share one page-cached copy.
+        """
+        path = Path(path)
+        header = _read_header(path, "forest")
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode=mmap_mode) for name in FLAT_ARRAYS}
+        compiled = None
+        if all((path / f"{name}.npy").exists() for name in COMPILED_ARRAYS):
+            compiled = {
+                name: np.load(path / f"{name}.npy", mmap_mode=mmap_mode)
+                for name in COMPILED_ARRAYS
+            }
+        return cls(
+            classes=header["classes"],
+            max_depth=header["max_depth"],
+            n_features=header["n_features"],
+            scaler_folded=header["scaler_folded"],
+            compiled=compiled,
+            **arrays
+        )
+
+
+class FusedLinearModel:
+    """Logistic regression with the StandardScaler folded into its weights
+
+    `coef @ ((x - mean) / scale) + b` equals `(coef / scale) @ x + b'` with
+    `b' = b - (coef / scale) @ mean`, so one matrix product on raw features
+    replaces transform + decision_function.
+    """
+
+    def __init__(self, coef, intercept, classes: List[str], multinomial: bool):
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.classes_ = np.asarray(classes)
+        self.multinomial = bool(multinomial)
+        self.n_features_in_ = self.coef.shape[1]
+        self.scaler_folded = True
+
+    @classmethod
+    def from_sklearn(cls, model, scaler) -> "FusedLinearModel":
+        mean, scale = scaler_affine(scaler, model.n_features_in_)
+        coef = model.coef_ / scale
+        intercept = model.intercept_ - coef @ mean
+        multi_class = getattr(model, "multi_class", "auto")
+        # Linear models without a solver (SGDClassifier) are always one-vs-rest
+        multinomial = (
+            len(model.classes_) > 2
+            and hasattr(model, "solver")
+            and multi_class != "ovr"
+            and getattr(model, "solver", "lbfgs") != "liblinear"
+        )
+        return cls(coef, intercept, [str(c) for c in model.classes_], multinomial)
+
+    def decision_function(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"Expected input of shape (n, {self.n_features_in_}), got {X.shape}"
+            )
+        return X @ self.coef.T + self.intercept
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Class probabilities, matching sklearn's LogisticRegression predict_proba"""
+        scores = self.decision_function(X)
+        if len(self.classes_) == 2:
+            positive = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        if self.multinomial:
+            scores = scores - scores.max(axis=1, keepdims=True)
+            proba = np.exp(scores)
+        else:
+            proba = 1.0 / (1.0 + np.exp(-scores))
+        return proba / proba.sum(axis=1, keepdims=True)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def save(self, path):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in LINEAR_ARRAYS:
+            _save_array(path, name, getattr(self, name))
+        header = {
+            "format_version": FLAT_FORMAT_VERSION,
+            "kind": "linear",
+            "classes": [str(c) for c in self.classes_],
+            "scaler_folded": True,
+            "multinomial": self.multinomial,
+            "n_features": self.n_features_in_
+        }
+        _save_header(path, header)
+        return path
+
+    @classmethod
+    def load(cls, path, mmap_mode: Optional[str] = None) -> "FusedLinearModel":
+        path = Path(path)
+        header = _read_header(path, "linear")
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode=mmap_mode) for name in LINEAR_ARRAYS}
+        return cls(classes=header["classes"], multinomial=header["multinomial"], **arrays)
+
+
+def _read_header(path: Path, kind: Optional[str] = None) -> dict:
+    with open(path / "model.json") as f:
+        header = json.load(f)
+    if header["format_version"] != FLAT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported model format: {header['format_version']}")
+    if kind is not None and header["kind"] != kind:
+        raise ValueError(f"Expected a '{kind}' artifact in {path}, found '{header['kind']}'")
+    return header
+
+
+def export_flat_forest(model, path) -> Optional[Path]:
+    """Export a fitted forest to `path`, returning None for unsupported models"""
+    if not hasattr(model, "estimators_") and not hasattr(model, "tree_"):
+        return None
+    return FlatForest.from_sklearn(model).save(path)
+
+
+def export_inference_model(model, scaler, path) -> Optional[Path]:
+    """Export a single fused scaler+model artifact for the inference API
+
+    Tree ensembles get their thresholds rewritten into raw-feature space and
+    linear models get the affine map folded into their weights. Returns None
+    for model types with no fused form.
+    """
+    if hasattr(model, "estimators_") or hasattr(model, "tree_"):
+        return FlatForest.from_sklearn(model).fold_scaler(scaler).save(path)
+    if hasattr(model, "coef_") and hasattr(model, "predict_proba"):
+        return FusedLinearModel.from_sklearn(model, scaler).save(path)
+    return None
+
+
+def load_inference_model(path, mmap_mode: Optional[str] = None):
+    """Load an artifact written by export_inference_model or export_flat_forest"""
+    header = _read_header(Path(path))
+    if header["kind"] == "forest":
+        return FlatForest.load(path, mmap_mode=mmap_mode)
+    if header["kind"] == "linear":
+        return FusedLinearModel.load(path, mmap_mode=mmap_mode)
+    raise ValueError(f"Unknown model kind: {header['kind']}")
+
+
+if __name__ == "__main__":
+    import joblib
+
+    model_dir = Path("models")
+    model = joblib.load(model_dir / "baseline_model.pkl")
+    scaler = joblib.load(model_dir / "scaler.pkl")
+    out = export_inference_model(model, scaler, model_dir / "baseline_model_fused")
+    print(f"✓ Fused inference model saved: {out}")
@@ -5,63 +5,192 @@ Simple document classifier as proof-of-concept
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.metrics import classification_report, accuracy_score, f1_score, confusion_matrix
 from sklearn.preprocessing import StandardScaler
 import joblib
 import json
+import os
+import sys
+import yaml
 from pathlib import Path
 from datetime import datetime
 import mlflow
 import mlflow.sklearn
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src.model_export import export_inference_model
+from src.features import FEATURE_NAMES, RAW_FEATURES, feature_matrix
+from src.metadata_store import iter_split, read_split
+from src.hyperparameter_search import HyperparameterSearch
+from src.model_compression import candidate_family, select_candidate
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Only the columns features and labels are built from; long strings are never parsed
+TRAINING_COLUMNS = list(RAW_FEATURES)
+LABELS = ['low', 'medium', 'high']
+SPLITS = ('train', 'val', 'test')
+
+def label_edges(low, high):
+    """The bin edges pd.cut(bins=3) picks for quality scores spanning [low, high]"""
+    edges = np.linspace(low, high, len(LABELS) + 1)
+    edges[0] -= (high - low) * 0.001
+    return edges
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB, or None where unsupported"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and KiB on Linux
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+def tree_hyperparameters(model):
+    """Tree count and tree limits of `model` as served: a forest, a sub-forest or one tree"""
+    params = model.get_params()
+    return {
+        "n_estimators": len(getattr(model, 'estimators_', [model])),
+        **{key: params.get(key) for key in ('max_depth', 'min_samples_leaf', 'max_features')}
+    }
+
+def confusion_metrics(confusion):
+    """Accuracy and weighted F1 from a confusion matrix (rows true, columns predicted)"""
+    confusion = np.asarray(confusion, dtype=np.float64)
+    tp = np.diag(confusion)
+    support = confusion.sum(axis=1)
+    denominator = support + confusion.sum(axis=0)
+    f1 = np.divide(2 * tp, denominator, out=np.zeros_like(tp), where=denominator > 0)
+    total = confusion.sum()
+    return {
+        "accuracy": float(tp.sum() / total) if total else 0.0,
+        "f1": float((f1 * support).sum() / total) if total else 0.0
+    }
+
 class BaselineModelTrainer:
     """Train baseline ML model on document metadata"""
     
-    def __init__(self, model_dir="models"):
+    def __init__(self, model_dir="models", config_path='config/pipeline_config.yaml'):
         self.model_dir = Path(model_dir)
         self.model_dir.mkdir(exist_ok=True)
         self.scaler = StandardScaler()
         self.model = None
+        with open(config_path, 'r') as f:
+            self.config = yaml.safe_load(f)
+        self.random_seed = self.config.get('pipeline', {}).get('random_seed', 42)
+        self.training_config = self.config.get('training', {})
+        self.splits_dir = Path(self.config.get('data', {}).get('splits_dir', 'data/splits'))
+        self.label_edges = None
         
     def load_data(self):
-        """Load train/val/test data"""
-        train_df = pd.read_csv('data/splits/train_metadata.csv')
-        val_df = pd.read_csv('data/splits/val_metadata.csv')
-        test_df = pd.read_csv('data/splits/test_metadata.csv')
+        """Load train/val/test data (Parquet split dataset if present, else the CSVs)"""
+        train_df, val_df, test_df = (
+            read_split(self.splits_dir, split, columns=TRAINING_COLUMNS)
+            for split in SPLITS
+        )
         
         return train_df, val_df, test_df
     
     def prepare_features(self, df):
-        """Extract features from metadata"""
-        features = df[[
-            'file_size_bytes',
-            'image_width',
-            'image_height',
-            'quality_score',
-            'has_blur'
-        ]].copy()
-        
-        # Convert boolean to int
-        features['has_blur'] = features['has_blur'].astype(int)
-        
-        # Create derived features
-        features['aspect_ratio'] = features['image_width'] / features['image_height']
-        features['pixel_count'] = features['image_width'] * features['image_height']
-        features['size_per_pixel'] = features['file_size_bytes'] / features['pixel_count']
-        
-        return features
+        """Extract features from metadata (src.features, shared with the API)"""
+        return pd.DataFrame(feature_matrix(df), columns=list(FEATURE_NAMES), index=df.index)
     
-    def create_labels(self, df):
-        """Create classification labels (high/medium/low quality)"""
-        # Use quality_score to create 3 classes
-        labels = pd.cut(df['quality_score'], 
-                       bins=3, 
-                       labels=['low', 'medium', 'high'])
+    def create_labels(self, df, edges=None):
+        """Create classification labels (high/medium/low quality)
+
+        `edges` (from label_edges) fixes the bins so every split and every
+        chunk is labelled alike; scores outside them clamp to low/high.
+        Without it the 3 equal-width bins span this frame's own scores.
+        """
+        if edges is None:
+            edges = label_edges(df['quality_score'].min(), df['quality_score'].max())
+        labels = pd.cut(df['quality_score'],
+                       bins=[-np.inf, *edges[1:-1], np.inf],
+                       labels=LABELS)
         return labels
     
+    def search_hyperparameters(self, X_train, y_train, X_val, y_val):
+        """Run the configured search, logging each trial as a nested MLflow run"""
+        search_config = dict(self.training_config.get('search', {}))
+        search_config.pop('enabled', None)
+        search = HyperparameterSearch(
+            strategy=search_config.get('strategy', 'successive_halving'),
+            n_trials=search_config.get('n_trials', 27),
+            eta=search_config.get('eta', 3),
+            min_fraction=search_config.get('min_fraction', 0.1),
+            workers=search_config.get('workers') or os.cpu_count(),
+            seed=self.random_seed,
+            latency_objective=search_config.get('latency_objective', 'decision_cost'),
+            f1_tolerance=search_config.get('f1_tolerance', 0.005)
+        )
+
+        def log_trial(trial, rung):
+            with mlflow.start_run(run_name=f"trial_{trial['trial']:03d}_rung_{rung}", nested=True):
+                mlflow.log_params(trial['params'])
+                mlflow.log_param("rung", rung)
+                mlflow.log_param("train_rows", trial['train_rows'])
+                mlflow.log_metric("val_f1", trial['val_f1'])
+                mlflow.log_metric("decision_cost", trial['decision_cost'])
+                mlflow.log_metric("fit_seconds", trial['fit_seconds'])
+                if 'latency_us' in trial:
+                    mlflow.log_metric("latency_us", trial['latency_us'])
+
+        result = search.run(X_train, y_train, X_val, y_val, log_trial=log_trial)
+        selected = result['selected']
+        print(f"Search: {len(result['trials'])} trials in {result['duration_s']:.1f}s, "
+              f"selected {selected['params']} (val F1 {selected['val_f1']:.4f}, "
+              f"{selected['latency_us']:.1f} us/row)")
+        summary = {
+            "strategy": result['strategy'],
+            "latency_objective": result['latency_objective'],
+            "random_seed": self.random_seed,
+            "trials": len(result['trials']),
+            "rung_fractions": result['rung_fractions'],
+            "duration_s": result['duration_s'],
+            "selected": {key: selected[key] for key in ('trial', 'params', 'val_f1', 'decision_cost', 'latency_us')},
+            "pareto_front": [
+                {key: trial[key] for key in ('trial', 'params', 'val_f1', 'decision_cost', 'latency_us')}
+                for trial in result['front']
+            ]
+        }
+        return selected['model'], summary
+
+    def compress_model(self, X_train, X_val, y_val):
+        """Prune or distill the trained forest, keeping the cheapest candidate within tolerance"""
+        compression_config = self.training_config.get('compression', {})
+        family = candidate_family(
+            self.model, self.scaler, X_train, X_val, y_val,
+            tree_counts=compression_config.get('tree_counts', [1, 3, 5, 10, 20, 50]),
+            distill_depths=compression_config.get('distill_depths', [4, 6, 8]),
+            seed=self.random_seed
+        )
+        objective = compression_config.get('objective', 'decision_cost')
+        tolerance = compression_config.get('accuracy_tolerance', 0.005)
+        selected = select_candidate(family, accuracy_tolerance=tolerance, objective=objective)
+
+        print(f"{'candidate':<20} {'trees':>5} {'nodes':>7} {'val_acc':>8} {'us/row':>8} {'bytes':>9}")
+        for candidate in family:
+            marker = " *" if candidate is selected else ""
+            print(f"{candidate['name']:<20} {candidate['n_trees']:>5} {candidate['n_nodes']:>7} "
+                  f"{candidate['val_accuracy']:>8.4f} {candidate['latency_us']:>8.1f} "
+                  f"{candidate['artifact_bytes']:>9}{marker}")
+
+        summary = {
+            "objective": objective,
+            "accuracy_tolerance": tolerance,
+            "selected": selected['name'],
+            "candidates": [{key: value for key, value in c.items() if key != 'model'} for c in family]
+        }
+        return selected['model'], summary
+
     def train(self):
         """Train baseline model"""
+        if self.training_config.get('chunked', {}).get('enabled', False):
+            return self.train_chunked()
+
         print("Loading data...")
         train_df, val_df, test_df = self.load_data()
         
@@ -71,10 +200,11 @@ class BaselineModelTrainer:
         X_val = self.prepare_features(val_df)
         X_test = self.prepare_features(test_df)
         
-        # Create labels
-        y_train = self.create_labels(train_df)
-        y_val = self.create_labels(val_df)
-        y_test = self.create_labels(test_df)
+        # Create labels, binned on the training range for every split
+        self.label_edges = label_edges(train_df['quality_score'].min(), train_df['quality_score'].max())
+        y_train = self.create_labels(train_df, self.label_edges)
+        y_val = self.create_labels(val_df, self.label_edges)
+        y_test = self.create_labels(test_df, self.label_edges)
         
         # Scale features
         print("Scaling features...")
@@ -82,21 +212,36 @@ class BaselineModelTrainer:
         X_val_scaled = self.scaler.transform(X_val)
         X_test_scaled = self.scaler.transform(X_test)
         
-        # Train model
-        print("Training Random Forest classifier...")
-        self.model = RandomForestClassifier(
-            n_estimators=100,
-            max_depth=10,
-            random_state=42,
-            n_jobs=-1
-        )
-        
         # MLflow tracking
         mlflow.set_experiment("ledgerx_baseline")
+        search_enabled = self.training_config.get('search', {}).get('enabled', False)
         
-        with mlflow.start_run(run_name="baseline_rf"):
-            # Train
-            self.model.fit(X_train_scaled, y_train)
+        with mlflow.start_run(run_name="rf_search" if search_enabled else "baseline_rf"):
+            search_summary = None
+            if search_enabled:
+                print("Searching Random Forest hyperparameters...")
+                self.model, search_summary = self.search_hyperparameters(
+                    X_train_scaled, y_train, X_val_scaled, y_val
+                )
+            else:
+                # Train model
+                print("Training Random Forest classifier...")
+                model_config = self.training_config.get('model', {})
+                self.model = RandomForestClassifier(
+                    n_estimators=model_config.get('n_estimators', 100),
+                    max_depth=model_config.get('max_depth', 10),
+                    random_state=self.random_seed,
+                    n_jobs=-1
+                )
+                self.model.fit(X_train_scaled, y_train)
+            forest = self.model
+            
+            compression_summary = None
+            if self.training_config.get('compression', {}).get('enabled', False):
+                print("Compressing model...")
+                self.model, compression_summary = self.compress_model(X_train_scaled, X_val_scaled, y_val)
+                mlflow.log_param("compression_selected", compression_summary['selected'])
+                mlflow.log_dict(compression_summary, "compression_candidates.json")
             
             # Predict
             train_pred = self.model.predict(X_train_scaled)
@@ -113,9 +258,15 @@ class BaselineModelTrainer:
             test_f1 = f1_score(y_test, test_pred, average='weighted')
             
             # Log metrics
-            mlflow.log_param("model_type", "RandomForest")
-            mlflow.log_param("n_estimators", 100)
-            mlflow.log_param("max_depth", 10)
+            # Compression may have swapped in a distilled tree or a pruned forest
+            mlflow.log_param("model_type", type(self.model).__name__)
+            mlflow.log_param("random_seed", self.random_seed)
+            hyperparameters = tree_hyperparameters(self.model)
+            mlflow.log_param("n_estimators", hyperparameters['n_estimators'])
+            mlflow.log_param("max_depth", hyperparameters['max_depth'])
+            if self.model is not forest:
+                mlflow.log_param("source_n_estimators", forest.n_estimators)
+                mlflow.log_param("source_max_depth", forest.max_depth)
             
             mlflow.log_metric("train_accuracy", train_acc)
             mlflow.log_metric("val_accuracy", val_acc)
@@ -144,16 +295,25 @@ class BaselineModelTrainer:
             
             joblib.dump(self.model, model_path)
             joblib.dump(self.scaler, scaler_path)
+            inference_path = self.export_inference_model()
             
             # Save metadata
             metadata = {
-                "model_type": "RandomForestClassifier",
+                "model_type": type(self.model).__name__,
                 "trained_date": datetime.now().isoformat(),
                 "train_samples": len(train_df),
                 "val_samples": len(val_df),
                 "test_samples": len(test_df),
                 "features": list(X_train.columns),
-                "classes": ["low", "medium", "high"],
+                "classes": LABELS,
+                "label_edges": [float(edge) for edge in self.label_edges[1:-1]],
+                "inference_model": inference_path.name if inference_path else None,
+                "scaler_folded": inference_path is not None,
+                "hyperparameters": hyperparameters,
+                # The trained forest, when compression replaced it with a smaller model
+                "source_hyperparameters": tree_hyperparameters(forest) if self.model is not forest else None,
+                "hyperparameter_search": search_summary,
+                "compression": compression_summary,
                 "metrics": {
                     "train_accuracy": float(train_acc),
                     "val_accuracy": float(val_acc),
@@ -161,19 +321,133 @@ class BaselineModelTrainer:
                     "train_f1": float(train_f1),
                     "val_f1": float(val_f1),
                     "test_f1": float(test_f1)
-                }
+                },
+                "memory": {"chunked": False, "peak_rss_mb": peak_rss_mb()}
             }
+            mlflow.log_metric("peak_rss_mb", metadata["memory"]["peak_rss_mb"] or 0.0)
             
-            with open(self.model_dir / 'model_metadata.json', 'w') as f:
-                json.dump(metadata, f, indent=2)
+            self.save_metadata(metadata)
             
             print(f"\n✓ Model saved: {model_path}")
             print(f"✓ Scaler saved: {scaler_path}")
+            if inference_path:
+                print(f"✓ Fused inference model saved: {inference_path}")
             print(f"✓ Metadata saved: {self.model_dir / 'model_metadata.json'}")
             print("="*70)
             
             return metadata
 
+    def save_metadata(self, metadata):
+        with open(self.model_dir / 'model_metadata.json', 'w') as f:
+            json.dump(metadata, f, indent=2)
+
+    def iter_features(self, split, chunk_rows):
+        """Yield features per chunk of at most `chunk_rows` rows (quality_score is one of them)"""
+        for chunk in iter_split(self.splits_dir, split, columns=TRAINING_COLUMNS, batch_rows=chunk_rows):
+            yield self.prepare_features(chunk)
+
+    def train_chunked(self):
+        """Out-of-core training: never holds more than `chunk_rows` rows of a split
+
+        Pass 1 streams the training split once for StandardScaler.partial_fit
+        and the quality-score range that fixes the label bins. Each epoch
+        then streams it again into SGDClassifier.partial_fit (logistic loss,
+        rows shuffled within each chunk), and val/test are scored by
+        accumulating confusion matrices chunk by chunk.
+        """
+        chunked = self.training_config.get('chunked', {})
+        chunk_rows = chunked.get('chunk_rows', 50000)
+        epochs = chunked.get('epochs', 5)
+        start = datetime.now()
+
+        mlflow.set_experiment("ledgerx_baseline")
+        with mlflow.start_run(run_name="chunked_sgd"):
+            print(f"Fitting scaler over chunks of {chunk_rows} rows...")
+            low, high = np.inf, -np.inf
+            counts = dict.fromkeys(SPLITS, 0)
+            feature_names = None
+            for X in self.iter_features('train', chunk_rows):
+                self.scaler.partial_fit(X)
+                low, high = min(low, X['quality_score'].min()), max(high, X['quality_score'].max())
+                counts['train'] += len(X)
+                feature_names = list(X.columns)
+            if not counts['train']:
+                raise ValueError(f"No training rows in {self.splits_dir}")
+            self.label_edges = label_edges(low, high)
+
+            print(f"Training SGD classifier for {epochs} epochs...")
+            self.model = SGDClassifier(
+                loss='log_loss',
+                alpha=chunked.get('alpha', 0.0001),
+                random_state=self.random_seed
+            )
+            rng = np.random.RandomState(self.random_seed)
+            for epoch in range(epochs):
+                for X in self.iter_features('train', chunk_rows):
+                    X_scaled = self.scaler.transform(X)
+                    y = np.asarray(self.create_labels(X, self.label_edges))
+                    order = rng.permutation(len(y))
+                    self.model.partial_fit(X_scaled[order], y[order], classes=LABELS)
+
+            metrics = {}
+            for split in SPLITS:
+                confusion = np.zeros((len(LABELS), len(LABELS)), dtype=np.int64)
+                for X in self.iter_features(split, chunk_rows):
+                    y = self.create_labels(X, self.label_edges)
+                    pred = self.model.predict(self.scaler.transform(X))
+                    confusion += confusion_matrix(y, pred, labels=LABELS)
+                    if split != 'train':
+                        counts[split] += len(X)
+                split_metrics = confusion_metrics(confusion)
+                metrics[f"{split}_accuracy"] = split_metrics["accuracy"]
+                metrics[f"{split}_f1"] = split_metrics["f1"]
+
+            memory = {
+                "chunked": True,
+                "chunk_rows": chunk_rows,
+                "peak_rss_mb": peak_rss_mb(),
+                "duration_s": (datetime.now() - start).total_seconds()
+            }
+            mlflow.log_param("model_type", "SGDClassifier")
+            mlflow.log_param("random_seed", self.random_seed)
+            mlflow.log_param("chunk_rows", chunk_rows)
+            mlflow.log_param("epochs", epochs)
+            for name, value in metrics.items():
+                mlflow.log_metric(name, value)
+            mlflow.log_metric("peak_rss_mb", memory["peak_rss_mb"] or 0.0)
+            mlflow.sklearn.log_model(self.model, "model")
+
+            joblib.dump(self.model, self.model_dir / 'baseline_model.pkl')
+            joblib.dump(self.scaler, self.model_dir / 'scaler.pkl')
+            inference_path = self.export_inference_model()
+            metadata = {
+                "model_type": type(self.model).__name__,
+                "trained_date": datetime.now().isoformat(),
+                "train_samples": counts['train'],
+                "val_samples": counts['val'],
+                "test_samples": counts['test'],
+                "features": feature_names,
+                "classes": LABELS,
+                "label_edges": [float(edge) for edge in self.label_edges[1:-1]],
+                "inference_model": inference_path.name if inference_path else None,
+                "scaler_folded": inference_path is not None,
+                "hyperparameters": {"epochs": epochs, "alpha": self.model.alpha},
+                "metrics": metrics,
+                "memory": memory
+            }
+            self.save_metadata(metadata)
+
+            print(f"Val Accuracy:  {metrics['val_accuracy']:.4f} | F1: {metrics['val_f1']:.4f}")
+            print(f"Test Accuracy: {metrics['test_accuracy']:.4f} | F1: {metrics['test_f1']:.4f}")
+            if memory['peak_rss_mb'] is not None:
+                print(f"Peak RSS: {memory['peak_rss_mb']:.1f} MiB with chunks of {chunk_rows} rows")
+            print(f"✓ Metadata saved: {self.model_dir / 'model_metadata.json'}")
+            return metadata
+
+    def export_inference_model(self):
+        """Export the model with the scaler folded in for the inference API"""
+        return export_inference_model(self.model, self.scaler, self.model_dir / 'baseline_model_fused')
+
 if __name__ == "__main__":
     trainer = BaselineModelTrainer()
     trainer.train()
@@ -0,0 +1,199 @@
+"""
+LedgerX Near-Duplicate Detection
+Perceptual hashes, a multi-index Hamming index and duplicate grouping
+"""
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import cv2
+import numpy as np
+
+# Roboflow exports name augmented copies `<source>.rf.<32 hex>.<ext>`
+ROBOFLOW_NAME = re.compile(r"^(?P<source>.+)\.rf\.[0-9a-f]{32}\.[A-Za-z0-9]+$")
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+
+def dhash(gray: np.ndarray, hash_size: int = 16) -> str:
+    """Difference hash of a grayscale image as a hex string of hash_size**2 bits"""
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return np.packbits(bits.ravel()).tobytes().hex()
+
+
+def hash_matrix(hashes: Iterable[str]) -> np.ndarray:
+    """(n, n_bytes) uint8 matrix from equal-length hex hashes"""
+    hashes = list(hashes)
+    if not hashes:
+        return np.zeros((0, 0), dtype=np.uint8)
+    return np.frombuffer(bytes.fromhex("".join(hashes)), dtype=np.uint8).reshape(len(hashes), -1)
+
+
+def hamming(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Row-wise Hamming distance between two (m, n_bytes) hash matrices"""
+    return _POPCOUNT[np.bitwise_xor(a, b)].sum(axis=-1)
+
+
+class MultiIndexHashIndex:
+    """Finds every pair of hashes within `radius` bits without comparing all pairs
+
+    The hash is cut into radius + 1 disjoint blocks; by the pigeonhole
+    principle two hashes within `radius` agree exactly on at least one
+    block. Each block is sorted once and only hashes sharing a block value
+    are compared, so the work is O(n log n) plus the candidate pairs rather
+    than O(n^2). Buckets larger than `max_bucket` (e.g. blank margins that
+    hash to all-zero blocks) are verified in bounded-memory tiles instead
+    of materialising their candidate pairs.
+    """
+
+    def __init__(self, hashes: Iterable[str], radius: int = 8, max_bucket: int = 64):
+        self.codes = hash_matrix(hashes)
+        self.radius = radius
+        self.max_bucket = max_bucket
+        n_bits = self.codes.shape[1] * 8
+        if n_bits and radius + 1 > n_bits:
+            raise ValueError(f"radius {radius} too large for {n_bits}-bit hashes")
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def _block_keys(self) -> Iterable[np.ndarray]:
+        n_bits = self.codes.shape[1] * 8
+        # At least radius + 1 blocks, each narrow enough to pack into a uint64 key
+        n_blocks = max(self.radius + 1, -(-n_bits // 64))
+        edges = np.linspace(0, n_bits, n_blocks + 1).astype(int)
+        for start, stop in zip(edges[:-1], edges[1:]):
+            # Unpack only the bytes this block spans to keep memory at O(n * block)
+            first, last = start // 8, (stop + 7) // 8
+            bits = np.unpackbits(self.codes[:, first:last], axis=1)[:, start - 8 * first:stop - 8 * first]
+            yield bits.astype(np.uint64) @ (np.uint64(1) << np.arange(bits.shape[1], dtype=np.uint64))
+
+    def _bucket_pairs(self, keys: np.ndarray) -> List[np.ndarray]:
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        lengths = np.diff(np.r_[starts, len(keys)])
+
+        found = []
+        small = (lengths >= 2) & (lengths <= self.max_bucket)
+        if small.any():
+            run = np.repeat(np.arange(len(starts)), lengths)
+            in_small = small[run]
+            positions = np.flatnonzero(in_small)
+            for offset in range(1, int(lengths[small].max())):
+                left = positions[:-offset]
+                right = positions[offset:]
+                same = run[left] == run[right]
+                if same.any():
+                    found.append(np.column_stack([order[left[same]], order[right[same]]]))
+
+        for start, length in zip(starts[lengths > self.max_bucket], lengths[lengths > self.max_bucket]):
+            found.append(self._verified_pairs(order[start:start + length]))
+        return found
+
+    def _verified_pairs(self, members: np.ndarray, tile: int = 512) -> np.ndarray:
+        members = np.sort(members)
+        found = []
+        for a in range(0, len(members), tile):
+            rows = members[a:a + tile]
+            for b in range(a, len(members), tile):
+                cols = members[b:b + tile]
+                dist = hamming(self.codes[rows][:, None, :], self.codes[cols][None, :, :])
+                i, j = np.nonzero(dist <= self.radius)
+                keep = rows[i] < cols[j]
+                found.append(np.column_stack([rows[i][keep], cols[j][keep]]))
+        return np.concatenate(found) if found else np.zeros((0, 2), dtype=np.int64)
+
+    def pairs(self) -> np.ndarray:
+        """(m, 2) array of index pairs i < j with Hamming distance <= radius"""
+        n = len(self.codes)
+        if n < 2:
+            return np.zeros((0, 2), dtype=np.int64)
+        candidates = []
+        for keys in self._block_keys():
+            candidates.extend(self._bucket_pairs(keys))
+        if not candidates:
+            return np.zeros((0, 2), dtype=np.int64)
+        pairs = np.sort(np.concatenate(candidates).astype(np.int64), axis=1)
+        pairs = np.unique(pairs[:, 0] * n + pairs[:, 1])
+        pairs = np.column_stack([pairs // n, pairs % n])
+        distance = hamming(self.codes[pairs[:, 0]], self.codes[pairs[:, 1]])
+        return pairs[distance <= self.radius]
+
+
+class DisjointSet:
+    """Union-find over 0..n-1 whose roots are the smallest member of each set"""
+
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, a: int, b: int):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+    def labels(self) -> np.ndarray:
+        return np.array([self.find(i) for i in range(len(self.parent))], dtype=np.int64)
+
+
+def source_key(path: str) -> Optional[str]:
+    """Original image name of a Roboflow augmentation, or None for other files"""
+    match = ROBOFLOW_NAME.match(Path(str(path)).name)
+    return match.group("source") if match else None
+
+
+def duplicate_groups(perceptual_hashes: List[Optional[str]], radius: int = 8,
+                     source_paths: Optional[List[str]] = None) -> Dict:
+    """Group labels (index of each group's first member) and grouping statistics
+
+    Two documents share a group when their perceptual hashes are within
+    `radius` bits, or, if `source_paths` is given, when they are
+    augmentations of the same Roboflow source image. Groups are transitive.
+    Documents without a hash only join groups through their source name.
+    """
+    n = len(perceptual_hashes)
+    sets = DisjointSet(n)
+
+    valid = [i for i, h in enumerate(perceptual_hashes) if isinstance(h, str) and h]
+    by_length: Dict[int, List[int]] = {}
+    for i in valid:
+        by_length.setdefault(len(perceptual_hashes[i]), []).append(i)
+    n_pairs = 0
+    for members in by_length.values():
+        index = MultiIndexHashIndex([perceptual_hashes[i] for i in members], radius)
+        pairs = index.pairs()
+        n_pairs += len(pairs)
+        for a, b in pairs:
+            sets.union(members[a], members[b])
+
+    n_source_links = 0
+    if source_paths is not None:
+        first: Dict[str, int] = {}
+        for i, path in enumerate(source_paths):
+            key = source_key(path)
+            if key is None:
+                continue
+            if key in first:
+                sets.union(first[key], i)
+                n_source_links += 1
+            else:
+                first[key] = i
+
+    labels = sets.labels()
+    sizes = np.bincount(labels, minlength=n) if n else np.zeros(0, dtype=np.int64)
+    return {
+        "labels": labels,
+        "near_duplicate_pairs": n_pairs,
+        "source_name_links": n_source_links,
+        "groups": int((sizes > 0).sum()),
+        "grouped_documents": int(sizes[sizes > 1].sum()),
+        "largest_group": int(sizes.max()) if n else 0,
+    }
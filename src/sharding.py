@@ -0,0 +1,238 @@
+"""
+Sharded Ingestion
+Plan / ingest-shard / merge steps that split raw-image ingestion into
+independent shards (dataset x path-hash prefix). Airflow maps one task over
+the shards; `run_sharded` runs the same steps locally.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src.data_pipeline import DataPipeline, DocumentMetadata
+from src.metadata_store import parquet_path, read_metadata
+
+PLAN_FILE = "plan.json"
+# Files directly under raw_dir, outside any dataset directory
+ROOT_DATASET = "_root"
+
+
+def shard_key(path, raw_dir, prefix_chars: int = 1) -> str:
+    """`<dataset>-<prefix>` for one raw image
+
+    The dataset is the first directory under `raw_dir`; the prefix is the
+    first `prefix_chars` hex digits of the MD5 of the path relative to it.
+    Hashing the path rather than the content keeps planning free of file
+    reads and puts a file in the same shard on every run.
+    """
+    relative = Path(path).relative_to(raw_dir)
+    dataset = relative.parts[0] if len(relative.parts) > 1 else ROOT_DATASET
+    prefix = hashlib.md5(relative.as_posix().encode()).hexdigest()[:prefix_chars]
+    return f"{dataset}-{prefix}"
+
+
+def group_shards(paths: Iterable, raw_dir, prefix_chars: int = 1) -> Dict[str, List[str]]:
+    """Shard id -> sorted paths, shards in id order; empty shards are left out"""
+    shards = defaultdict(list)
+    for path in paths:
+        shards[shard_key(path, raw_dir, prefix_chars)].append(str(path))
+    return {shard_id: sorted(shards[shard_id]) for shard_id in sorted(shards)}
+
+
+def shard_dir(pipeline: DataPipeline) -> Path:
+    return pipeline.processed_dir / pipeline.config.get('ingestion', {}).get('shard_dir', '.shards')
+
+
+def _write_json(data, path: Path):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def plan_shards(config_path: str = 'config/pipeline_config.yaml', incremental: bool = True,
+                prefix_chars: Optional[int] = None, resume: bool = True) -> List[Dict]:
+    """Plan an ingestion run and split the images to ingest into shards
+
+    The full plan (manifest entries, skipped paths, each shard's paths) is
+    written to the shard directory; the returned shard summaries are small
+    enough to pass between Airflow tasks. Shard outputs of an earlier run
+    are removed, as are their checkpoints unless `resume`.
+    """
+    pipeline = DataPipeline(config_path)
+    prefix_chars = prefix_chars or pipeline.config.get('ingestion', {}).get('shard_prefix_chars', 1)
+    directory = shard_dir(pipeline)
+    directory.mkdir(parents=True, exist_ok=True)
+    for stale in directory.glob("*.records.json"):
+        stale.unlink()
+    if not resume:
+        for checkpoint in directory.glob("*.checkpoint.jsonl"):
+            checkpoint.unlink()
+
+    start = time.perf_counter()
+    planned = pipeline.plan_ingestion(incremental=incremental)
+    shards = group_shards(planned['todo'], pipeline.raw_dir, prefix_chars)
+    summaries = [{"shard_id": shard_id, "files": len(paths)} for shard_id, paths in shards.items()]
+    _write_json({
+        "incremental": incremental,
+        "prefix_chars": prefix_chars,
+        "plan": planned['plan'],
+        "skipped": planned['skipped'],
+        "shards": shards,
+        "plan_s": time.perf_counter() - start,
+    }, directory / PLAN_FILE)
+    return summaries
+
+
+def load_plan(config_path: str = 'config/pipeline_config.yaml') -> Dict:
+    plan_file = shard_dir(DataPipeline(config_path)) / PLAN_FILE
+    if not plan_file.exists():
+        raise FileNotFoundError(f"No shard plan at {plan_file}; run plan_shards first")
+    with open(plan_file) as f:
+        return json.load(f)
+
+
+def ingest_shard(shard_id: str, config_path: str = 'config/pipeline_config.yaml',
+                 workers: int = 1) -> Dict:
+    """Ingest one planned shard and write its records; returns the shard's timings
+
+    Records are checkpointed per shard, so a retried task only decodes the
+    images the failed attempt did not finish.
+    """
+    start = time.perf_counter()
+    pipeline = DataPipeline(config_path)
+    directory = shard_dir(pipeline)
+    paths = load_plan(config_path)['shards'][shard_id]
+
+    engine = pipeline.build_ingestion_engine(workers=workers,
+                                             checkpoint_path=directory / f"{shard_id}.checkpoint.jsonl")
+    records = engine.process_paths(paths)
+    ingested = time.perf_counter()
+
+    stats = engine.stats
+    summary = {
+        "shard_id": shard_id,
+        "files": len(paths),
+        "records": len(records),
+        "resumed": stats['resumed'],
+        "errors": stats['errors'],
+        "failed_paths": stats['failed_paths'],
+        "ingest_s": ingested - start,
+        "images_per_s": stats['images_per_s'],
+    }
+    _write_json({"summary": summary, "records": records}, directory / f"{shard_id}.records.json")
+    summary["duration_s"] = time.perf_counter() - start
+    return summary
+
+
+def merge_shards(config_path: str = 'config/pipeline_config.yaml', cleanup: bool = True) -> Dict:
+    """Merge every shard's records into all_metadata.csv and the manifest
+
+    Reads shard outputs from disk rather than from the ingest tasks'
+    return values, so a run with nothing to ingest (no shards) still drops
+    removed files and rewrites the manifest. Fails if a planned shard has
+    no output.
+    """
+    start = time.perf_counter()
+    pipeline = DataPipeline(config_path)
+    directory = shard_dir(pipeline)
+    plan = load_plan(config_path)
+
+    records, shards = [], []
+    for shard_id in plan['shards']:
+        output = directory / f"{shard_id}.records.json"
+        if not output.exists():
+            raise FileNotFoundError(f"Shard {shard_id} has no output at {output}")
+        with open(output) as f:
+            shard = json.load(f)
+        records.extend(shard['records'])
+        shards.append(shard['summary'])
+    # Same row order as a single-process run, whatever order shards finished in
+    records.sort(key=lambda record: record['source_path'])
+
+    output_path = pipeline.processed_dir / 'all_metadata.csv'
+    if plan['incremental'] and (output_path.exists() or parquet_path(output_path).exists()):
+        existing = read_metadata(output_path)
+    else:
+        existing = pd.DataFrame(columns=list(DocumentMetadata.__dataclass_fields__))
+    loaded = time.perf_counter()
+    result = pipeline.finish_ingestion(existing, plan['plan'], plan['skipped'], records)
+    if cleanup:
+        shutil.rmtree(directory)
+
+    ingest = [shard['ingest_s'] for shard in shards]
+    report = {
+        "status": "success",
+        "documents": len(result['df']),
+        "metadata_path": result['metadata_path'],
+        "changes": result['changes'],
+        "duplicates": result['duplicates'],
+        "errors": sum(shard['errors'] for shard in shards),
+        "shards": shards,
+        "timings": {
+            "plan_s": plan['plan_s'],
+            # Wall time of the ingest step with one worker per shard
+            "critical_path_s": max(ingest, default=0.0),
+            "total_ingest_s": sum(ingest),
+            "load_s": loaded - start,
+            "merge_s": time.perf_counter() - loaded,
+        },
+    }
+    return report
+
+
+def run_sharded(config_path: str = 'config/pipeline_config.yaml', incremental: bool = True,
+                prefix_chars: Optional[int] = None, parallel: Optional[int] = None,
+                resume: bool = True) -> Dict:
+    """Plan, ingest every shard (`parallel` at a time) and merge, without Airflow"""
+    start = time.perf_counter()
+    shards = plan_shards(config_path, incremental=incremental, prefix_chars=prefix_chars, resume=resume)
+    parallel = parallel or os.cpu_count() or 1
+    if parallel == 1 or len(shards) <= 1:
+        for shard in shards:
+            ingest_shard(shard['shard_id'], config_path)
+    else:
+        with ProcessPoolExecutor(max_workers=parallel) as executor:
+            list(executor.map(ingest_shard, [s['shard_id'] for s in shards], [config_path] * len(shards)))
+    report = merge_shards(config_path)
+    report["duration_s"] = time.perf_counter() - start
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--config", default="config/pipeline_config.yaml")
+    parser.add_argument("--prefix-chars", type=int,
+                        help="hex digits of the path hash per shard (default: ingestion.shard_prefix_chars)")
+    parser.add_argument("--parallel", type=int, help="shards ingested at once (default: CPU count)")
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and re-ingest everything")
+    parser.add_argument("--no-resume", action="store_true", help="discard shard checkpoints")
+    args = parser.parse_args(argv)
+
+    report = run_sharded(args.config, incremental=not args.full, prefix_chars=args.prefix_chars,
+                         parallel=args.parallel, resume=not args.no_resume)
+    print(f"{'shard':<16} {'files':>7} {'errors':>7} {'ingest_s':>9} {'img/s':>8}")
+    for shard in report['shards']:
+        print(f"{shard['shard_id']:<16} {shard['files']:>7} {shard['errors']:>7} "
+              f"{shard['ingest_s']:>9.2f} {shard['images_per_s']:>8.1f}")
+    changes, timings = report['changes'], report['timings']
+    print(f"Sharded ingestion complete: {report['documents']} documents "
+          f"({changes['skipped']} skipped, {changes['added']} added, {changes['updated']} updated, "
+          f"{changes['removed']} removed, {report['errors']} errors) in {len(report['shards'])} shards; "
+          f"critical path {timings['critical_path_s']:.1f}s of {timings['total_ingest_s']:.1f}s ingest, "
+          f"merge {timings['merge_s']:.1f}s, total {report['duration_s']:.1f}s")
+    return report
+
+
+if __name__ == "__main__":
+    main()
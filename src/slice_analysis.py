@@ -0,0 +1,240 @@
+"""
+Slice Analysis
+Single-pass, chunked per-slice statistics (counts, means, rates, accuracy,
+prediction rates, correlations) over integer-coded categorical columns
+"""
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+MISSING = "<missing>"
+
+
+def dataset_source(paths: pd.Series) -> pd.Series:
+    """Dataset a document came from: the directory under data/raw in its source path"""
+    source = paths.astype("string").str.extract(r"(?:^|/)raw/([^/]+)/", expand=False)
+    return source.fillna(MISSING)
+
+
+class _Codebook:
+    """Stable integer codes for one column's values across chunks"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def encode(self, column: pd.Series) -> np.ndarray:
+        codes, uniques = pd.factorize(column, use_na_sentinel=True)
+        labels = [str(value) for value in uniques]
+        if (codes < 0).any():
+            # factorize marks missing values with -1, which indexes this last entry
+            labels.append(MISSING)
+        mapping = np.array([self._id(label) for label in labels], dtype=np.int64)
+        return mapping[codes]
+
+    def _id(self, label: str) -> int:
+        code = self.ids.get(label)
+        if code is None:
+            code = self.ids[label] = len(self.values)
+            self.values.append(label)
+        return code
+
+
+def _grow(array: np.ndarray, size: int) -> np.ndarray:
+    if len(array) >= size:
+        return array
+    return np.concatenate([array, np.zeros((size - len(array),) + array.shape[1:], dtype=array.dtype)])
+
+
+class SliceStats:
+    """Per-slice aggregates accumulated one chunk at a time
+
+    Every slice column is integer-coded, so each statistic is one
+    `np.bincount` per chunk whatever the number of slices; memory is
+    bounded by the chunk size plus a few floats per slice value.
+
+    - `value_columns`: per-slice count, mean and standard deviation
+    - `rate_columns`: per-slice share of truthy rows
+    - `correlation`: (x, y) pair whose Pearson correlation is tracked per
+      slice, alongside the overall correlation matrix of `value_columns`
+    - `label_column`/`prediction_column`: per-slice accuracy and the rate
+      at which each class is predicted
+
+    Sums are taken around the first chunk's means, which keeps the
+    variance and correlation arithmetic stable for large-valued columns
+    such as file sizes.
+    """
+
+    def __init__(self, slice_columns: Sequence[str], value_columns: Sequence[str] = (),
+                 rate_columns: Sequence[str] = (), correlation: Optional[Sequence[str]] = None,
+                 label_column: Optional[str] = None, prediction_column: Optional[str] = None):
+        self.slice_columns = list(slice_columns)
+        self.value_columns = list(value_columns)
+        self.rate_columns = list(rate_columns)
+        self.correlation = tuple(correlation) if correlation else None
+        self.label_column = label_column
+        self.prediction_column = prediction_column
+        self.rows = 0
+        self.chunks = 0
+        self._codebooks = {column: _Codebook() for column in self.slice_columns}
+        self._classes = _Codebook()
+        self._shift: Optional[np.ndarray] = None
+        n_values = len(self.value_columns)
+        self._overall_sum = np.zeros(n_values)
+        self._overall_products = np.zeros((n_values, n_values))
+        self._overall_count = np.zeros(n_values)
+        self._stats = {column: self._empty() for column in self.slice_columns}
+
+    def _empty(self) -> Dict[str, np.ndarray]:
+        n_values, n_rates = len(self.value_columns), len(self.rate_columns)
+        return {
+            "count": np.zeros(0),
+            "value_count": np.zeros((0, n_values)),
+            "value_sum": np.zeros((0, n_values)),
+            "value_sumsq": np.zeros((0, n_values)),
+            "rate_sum": np.zeros((0, n_rates)),
+            # n, x, y, x^2, y^2, xy over rows where both are present
+            "pair": np.zeros((0, 6)),
+            "scored": np.zeros(0),
+            "correct": np.zeros(0),
+            "predicted": np.zeros((0, 0)),
+        }
+
+    @property
+    def columns(self) -> List[str]:
+        """Input columns `update` reads"""
+        columns = self.slice_columns + self.value_columns + self.rate_columns
+        columns += [c for c in (self.label_column, self.prediction_column) if c]
+        return list(dict.fromkeys(columns))
+
+    def update(self, chunk: pd.DataFrame):
+        if not len(chunk):
+            return
+        values = np.column_stack([chunk[c].to_numpy(dtype=np.float64, na_value=np.nan)
+                                  for c in self.value_columns]) if self.value_columns else np.zeros((len(chunk), 0))
+        if self._shift is None:
+            self._shift = np.nan_to_num(np.nanmean(values, axis=0)) if len(self.value_columns) else np.zeros(0)
+        centered = values - self._shift
+        present = ~np.isnan(centered)
+        filled = np.where(present, centered, 0.0)
+        rates = np.column_stack([chunk[c].fillna(False).to_numpy(dtype=np.float64)
+                                 for c in self.rate_columns]) if self.rate_columns else np.zeros((len(chunk), 0))
+
+        self._overall_count += present.sum(axis=0)
+        self._overall_sum += filled.sum(axis=0)
+        self._overall_products += filled.T @ filled
+
+        if self.correlation:
+            x, y = (self.value_columns.index(c) for c in self.correlation)
+            both = present[:, x] & present[:, y]
+            px, py = filled[:, x] * both, filled[:, y] * both
+            pair_terms = (both.astype(np.float64), px, py, px * px, py * py, px * py)
+
+        scored = correct = predicted = None
+        if self.label_column and self.prediction_column:
+            labels = chunk[self.label_column]
+            predictions = chunk[self.prediction_column]
+            scored = (labels.notna() & predictions.notna()).to_numpy()
+            correct = (scored & (labels.astype("string") == predictions.astype("string")).fillna(False).to_numpy())
+            has_prediction = predictions.notna().to_numpy()
+            predicted = np.full(len(chunk), -1, dtype=np.int64)
+            predicted[has_prediction] = self._classes.encode(predictions[has_prediction])
+            n_classes = len(self._classes.values)
+
+        for column in self.slice_columns:
+            codes = self._codebooks[column].encode(chunk[column])
+            n = len(self._codebooks[column].values)
+            stats = self._stats[column]
+            for name in stats:
+                stats[name] = _grow(stats[name], n)
+            stats["count"] += np.bincount(codes, minlength=n)
+            for i in range(len(self.value_columns)):
+                stats["value_count"][:, i] += np.bincount(codes, weights=present[:, i], minlength=n)
+                stats["value_sum"][:, i] += np.bincount(codes, weights=filled[:, i], minlength=n)
+                stats["value_sumsq"][:, i] += np.bincount(codes, weights=filled[:, i] ** 2, minlength=n)
+            for i in range(len(self.rate_columns)):
+                stats["rate_sum"][:, i] += np.bincount(codes, weights=rates[:, i], minlength=n)
+            if self.correlation:
+                for i, term in enumerate(pair_terms):
+                    stats["pair"][:, i] += np.bincount(codes, weights=term, minlength=n)
+            if scored is not None:
+                stats["scored"] += np.bincount(codes, weights=scored, minlength=n)
+                stats["correct"] += np.bincount(codes, weights=correct, minlength=n)
+                if stats["predicted"].shape[1] < n_classes:
+                    stats["predicted"] = np.pad(stats["predicted"],
+                                                ((0, 0), (0, n_classes - stats["predicted"].shape[1])))
+                has_prediction = predicted >= 0
+                cells = codes[has_prediction] * n_classes + predicted[has_prediction]
+                stats["predicted"] += np.bincount(cells, minlength=n * n_classes).reshape(n, n_classes)
+        self.rows += len(chunk)
+        self.chunks += 1
+
+    def consume(self, chunks: Iterable[pd.DataFrame]) -> "SliceStats":
+        for chunk in chunks:
+            self.update(chunk)
+        return self
+
+    def correlation_matrix(self) -> Dict[str, Dict[str, float]]:
+        """Pearson correlations between value columns (pairwise over all rows)"""
+        n = np.maximum(self._overall_count, 1)
+        mean = self._overall_sum / n
+        covariance = self._overall_products / n[:, None] - np.outer(mean, mean)
+        std = np.sqrt(np.maximum(np.diag(covariance), 0.0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = covariance / np.outer(std, std)
+        return {a: {b: _finite(corr[i, j]) for j, b in enumerate(self.value_columns)}
+                for i, a in enumerate(self.value_columns)}
+
+    def slices(self, column: str) -> List[Dict]:
+        """One summary per value of `column`, largest slice first"""
+        stats = self._stats[column]
+        classes = self._classes.values
+        summaries = []
+        for code, value in enumerate(self._codebooks[column].values):
+            count = stats["count"][code]
+            summary = {"value": value, "count": int(count), "share": float(count / self.rows) if self.rows else 0.0}
+            for i, name in enumerate(self.value_columns):
+                n = stats["value_count"][code, i]
+                if n:
+                    mean = stats["value_sum"][code, i] / n
+                    variance = max(stats["value_sumsq"][code, i] / n - mean * mean, 0.0)
+                    summary[f"mean_{name}"] = float(mean + self._shift[i])
+                    summary[f"std_{name}"] = float(np.sqrt(variance))
+            for i, name in enumerate(self.rate_columns):
+                summary[f"rate_{name}"] = float(stats["rate_sum"][code, i] / count) if count else None
+            if self.correlation:
+                summary["correlation"] = _pearson(*stats["pair"][code])
+            if self.label_column and self.prediction_column:
+                scored = stats["scored"][code]
+                summary["accuracy"] = float(stats["correct"][code] / scored) if scored else None
+                predicted = stats["predicted"][code] if len(stats["predicted"]) else np.zeros(0)
+                total = predicted.sum()
+                summary["prediction_rates"] = {cls: float(predicted[i] / total) if total else 0.0
+                                               for i, cls in enumerate(classes)}
+            summaries.append(summary)
+        return sorted(summaries, key=lambda s: (-s["count"], s["value"]))
+
+    def summary(self) -> Dict:
+        return {
+            "rows": self.rows,
+            "chunks": self.chunks,
+            "correlations": self.correlation_matrix(),
+            "slices": {column: self.slices(column) for column in self.slice_columns},
+        }
+
+
+def _finite(value: float) -> Optional[float]:
+    # Clipped: rounding can put a perfect correlation a hair past 1
+    return float(np.clip(value, -1.0, 1.0)) if np.isfinite(value) else None
+
+
+def _pearson(n, sx, sy, sxx, syy, sxy) -> Optional[float]:
+    if n < 2:
+        return None
+    covariance = sxy / n - (sx / n) * (sy / n)
+    variance_x = sxx / n - (sx / n) ** 2
+    variance_y = syy / n - (sy / n) ** 2
+    if variance_x <= 0 or variance_y <= 0:
+        return None
+    return _finite(covariance / np.sqrt(variance_x * variance_y))
@@ -1,19 +1,225 @@
-import pandas as pd
+"""
+LedgerX Data Splitter
+Deterministic, group-aware train/val/test assignment in one streaming pass
+"""
+import argparse
+import csv
+import hashlib
+import json
+import shutil
+import sys
+import time
+from collections import defaultdict
 from pathlib import Path
-from sklearn.model_selection import train_test_split
-
-def main():
-    df = pd.read_csv("data/processed/sroie_cleaned.csv")
-    df_ok = df[df["has_all"] == True]
-    train, temp = train_test_split(df_ok, test_size=0.3, random_state=42)
-    val, test = train_test_split(temp, test_size=0.5, random_state=42)
-
-    out_dir = Path("data/splits")
-    out_dir.mkdir(parents=True, exist_ok=True)
-    train.to_csv(out_dir/"train.csv", index=False)
-    val.to_csv(out_dir/"val.csv", index=False)
-    test.to_csv(out_dir/"test.csv", index=False)
-    print("[OK] Train/Val/Test CSVs created in data/splits/")
+from typing import Dict, Optional, Tuple
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+SPLITS = ("train", "val", "test")
+
+
+def split_ratios(config: Dict) -> Tuple[float, float, float]:
+    pipeline = config.get("pipeline", {})
+    ratios = tuple(float(pipeline.get(f"{split}_ratio", default))
+                   for split, default in zip(SPLITS, (0.7, 0.15, 0.15)))
+    if min(ratios) < 0 or abs(sum(ratios) - 1.0) > 1e-6:
+        raise ValueError(f"Split ratios must be non-negative and sum to 1, got {ratios}")
+    return ratios
+
+
+def hash_position(group_key: str, seed: int = 42) -> float:
+    """Seeded 64-bit hash of a group key, as a position in [0, 1)"""
+    digest = hashlib.blake2b(f"{seed}:{group_key}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2**64
+
+
+def assign_split(group_key: str, seed: int = 42, ratios=(0.7, 0.15, 0.15)) -> str:
+    """Split for a group, from a seeded 64-bit hash of its key
+
+    Depends only on the key, the seed and the ratios, so a document keeps
+    its split across incremental runs and every member of a group lands in
+    the same split regardless of file order.
+    """
+    position = hash_position(group_key, seed)
+    cumulative = 0.0
+    for split, ratio in zip(SPLITS, ratios):
+        cumulative += ratio
+        if position < cumulative:
+            return split
+    return SPLITS[-1]
+
+
+def stratified_splits(input_path, group_column: str, key_column: str, stratify_column: str,
+                      seed: int = 42, ratios=(0.7, 0.15, 0.15),
+                      where: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Group key -> split, with the hash thresholds set per stratum
+
+    A group's stratum is that of its key row (the row whose `key_column`
+    equals the group key, else its first row), so groups are never split.
+    Within each stratum, groups are ordered by their seeded hash position
+    and the split boundaries are moved to where the cumulative row count
+    crosses the configured ratios, so every stratum matches the ratios up
+    to one group. One extra streaming pass; memory is per group, not row.
+    """
+    groups: Dict[str, list] = {}
+    with open(input_path, newline="") as src:
+        reader = csv.reader(src)
+        index = {name: i for i, name in enumerate(next(reader))}
+        key_at, row_key_at, stratum_at = index[group_column], index[key_column], index[stratify_column]
+        filters = [(index[column], value) for column, value in (where or {}).items()]
+        for row in reader:
+            if any(row[i] != value for i, value in filters):
+                continue
+            group = groups.get(row[key_at])
+            if group is None:
+                groups[row[key_at]] = [row[stratum_at], 1]
+            else:
+                group[1] += 1
+                if row[row_key_at] == row[key_at]:
+                    group[0] = row[stratum_at]
+
+    by_stratum: Dict[str, list] = defaultdict(list)
+    for key, (stratum, size) in groups.items():
+        by_stratum[stratum].append((hash_position(key, seed), key, size))
+    bounds = [sum(ratios[:i + 1]) for i in range(len(SPLITS))]
+    assignment = {}
+    for members in by_stratum.values():
+        members.sort()
+        total = sum(size for _, _, size in members)
+        seen = 0
+        for _, key, size in members:
+            # A group goes where its midpoint falls, so boundary groups round to the nearer side
+            midpoint = (seen + size / 2) / total
+            assignment[key] = next((split for split, bound in zip(SPLITS, bounds) if midpoint < bound), SPLITS[-1])
+            seen += size
+    return assignment
+
+
+def split_metadata(input_path, output_dir, seed: int = 42, ratios=(0.7, 0.15, 0.15),
+                   group_column: Optional[str] = "duplicate_group",
+                   stratify_column: Optional[str] = "quality_bin",
+                   key_column: str = "doc_id", where: Optional[Dict[str, str]] = None,
+                   parquet: bool = False, stratify: bool = False) -> Dict:
+    """Stream `input_path` into `{train,val,test}_metadata.csv` under `output_dir`
+
+    Rows are read and written one at a time with the csv module, so memory
+    stays constant in the file size. Rows are keyed by `group_column` when
+    the file has it (near-duplicate groups from ingestion), else by
+    `key_column`. By default assignment depends only on the group key, so
+    it is stable across incremental runs and every `stratify_column` bin
+    converges to the configured ratios; the report lists per-stratum
+    counts so drift is visible. With `stratify`, the thresholds are set
+    per stratum (see `stratified_splits`) so each bin matches the ratios,
+    at the cost of groups near a boundary moving when the data changes.
+    With `parquet`, the split files are also converted (streamed, in
+    record batches) into one Parquet dataset partitioned by split.
+    """
+    start = time.perf_counter()
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = {split: output_dir / f"{split}_metadata.csv" for split in SPLITS}
+    tmp_paths = {split: path.with_name(path.name + ".tmp") for split, path in paths.items()}
+
+    counts = dict.fromkeys(SPLITS, 0)
+    strata: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(SPLITS, 0))
+    skipped = 0
+    with open(input_path, newline="") as src:
+        reader = csv.reader(src)
+        header = next(reader)
+        index = {name: i for i, name in enumerate(header)}
+        group_column = group_column if group_column in index else None
+        key_at = index[group_column or key_column]
+        stratum_at = index.get(stratify_column) if stratify_column else None
+        filters = [(index[column], value) for column, value in (where or {}).items()]
+        assignment = None
+        if stratify and stratum_at is not None:
+            assignment = stratified_splits(input_path, group_column or key_column, key_column,
+                                           stratify_column, seed=seed, ratios=ratios, where=where)
+
+        files = {split: open(tmp_paths[split], "w", newline="") for split in SPLITS}
+        try:
+            writers = {split: csv.writer(f) for split, f in files.items()}
+            for writer in writers.values():
+                writer.writerow(header)
+            for row in reader:
+                if any(row[i] != value for i, value in filters):
+                    skipped += 1
+                    continue
+                if assignment is not None:
+                    split = assignment[row[key_at]]
+                else:
+                    split = assign_split(row[key_at], seed, ratios)
+                writers[split].writerow(row)
+                counts[split] += 1
+                if stratum_at is not None:
+                    strata[row[stratum_at]][split] += 1
+        finally:
+            for f in files.values():
+                f.close()
+    for split in SPLITS:
+        tmp_paths[split].replace(paths[split])
+    from src.metadata_store import SPLITS_DATASET, csv_to_parquet
+    if parquet:
+        for split in SPLITS:
+            csv_to_parquet(paths[split], output_dir / SPLITS_DATASET,
+                           partition_cols=["split"], extra_columns={"split": split})
+    elif (output_dir / SPLITS_DATASET).exists():
+        # Readers prefer Parquet; never leave one behind that disagrees with the CSVs
+        shutil.rmtree(output_dir / SPLITS_DATASET)
+
+    total = sum(counts.values())
+    stratum_report = {}
+    for stratum, stratum_counts in sorted(strata.items()):
+        n = sum(stratum_counts.values())
+        stratum_report[stratum] = {
+            "counts": stratum_counts,
+            "max_ratio_error": max(abs(stratum_counts[s] / n - r) for s, r in zip(SPLITS, ratios))
+        }
+    return {
+        "rows": total,
+        "filtered_out": skipped,
+        "counts": counts,
+        "ratios": {split: counts[split] / total if total else 0.0 for split in SPLITS},
+        "group_column": group_column or key_column,
+        "stratified": assignment is not None,
+        "strata": stratum_report,
+        "outputs": {split: str(path) for split, path in paths.items()},
+        "duration_s": time.perf_counter() - start
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--config", default="config/pipeline_config.yaml")
+    parser.add_argument("--input", help="metadata CSV (default: <processed_dir>/all_metadata.csv)")
+    parser.add_argument("--output-dir", help="default: data.splits_dir from the config")
+    parser.add_argument("--key-column", default="doc_id", help="per-row key when there is no group column")
+    parser.add_argument("--where", action="append", default=[], metavar="COLUMN=VALUE",
+                        help="keep only rows where COLUMN equals VALUE, e.g. has_all=True")
+    args = parser.parse_args(argv)
+
+    with open(args.config) as f:
+        config = yaml.safe_load(f)
+    splitting = config.get("splitting", {})
+    report = split_metadata(
+        args.input or Path(config["data"]["processed_dir"]) / "all_metadata.csv",
+        args.output_dir or config["data"]["splits_dir"],
+        seed=config.get("pipeline", {}).get("random_seed", 42),
+        ratios=split_ratios(config),
+        group_column=splitting.get("group_column", "duplicate_group"),
+        stratify_column=splitting.get("stratify_column", "quality_bin"),
+        key_column=args.key_column,
+        parquet=config.get("storage", {}).get("parquet", False),
+        stratify=splitting.get("stratify", False),
+        where=dict(item.split("=", 1) for item in args.where)
+    )
+    print(json.dumps(report, indent=2))
+    print(f"[OK] Train/Val/Test = {report['counts']['train']}/{report['counts']['val']}/"
+          f"{report['counts']['test']} written to {Path(report['outputs']['train']).parent}")
+    return report
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,108 @@
+"""
+Alert System Tests
+"""
+import json
+import numpy as np
+import pytest
+from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.alert_system import AlertSystem, SlidingWindowMetrics, StreamingAlertMonitor
+
+def record(ts, quality=0.8, blur=False, checksum=None, **fields):
+    return {'ts': ts, 'file_size_bytes': 40000, 'image_width': 640, 'image_height': 640,
+            'quality_score': quality, 'has_blur': blur, 'checksum': checksum or f'c{ts}', **fields}
+
+class TestRules:
+    def test_thresholds_and_rules_come_from_config(self, tmp_path):
+        config = tmp_path / 'alerts.json'
+        config.write_text(json.dumps({
+            'thresholds': {'blur_rate_max': 0.5},
+            'rules': [{'metric': 'latency_p99_ms', 'op': '>', 'threshold': 50, 'message': 'Slow'}]
+        }))
+        alerts = AlertSystem(config, log_path=tmp_path / 'alerts.jsonl')
+        assert alerts.config['thresholds']['blur_rate_max'] == 0.5
+        assert alerts.config['thresholds']['duplicate_rate_max'] == 0.02
+        assert alerts.check_thresholds({'blur_rate': 0.3, 'latency_p99_ms': 80}) == ['Slow']
+        assert alerts.check_thresholds({'missing_rate': 0.1, 'duplicate_rate': 0.05}) == [
+            'Missing values exceed threshold', 'Duplicate rate exceeds threshold']
+        assert alerts.check_thresholds({}) == []
+
+    def test_log_is_appended_not_rewritten(self, tmp_path):
+        log = tmp_path / 'alerts.jsonl'
+        alerts = AlertSystem(log_path=log)
+        alerts.raise_alert({'rule': 'first'})
+        first = log.read_bytes()
+        alerts.alert_failure('train', 'boom')
+        alerts.save_log()
+        alerts.save_log()
+        assert log.read_bytes().startswith(first)
+        lines = [json.loads(line) for line in log.read_text().splitlines()]
+        assert [line.get('rule', line.get('stage')) for line in lines] == ['first', 'train']
+
+class TestSlidingWindow:
+    def test_matches_brute_force_window(self):
+        rng = np.random.default_rng(0)
+        window = SlidingWindowMetrics(window_seconds=10.0, n_buckets=10)
+        events = []
+        ts = 0.0
+        for i in range(3000):
+            ts += rng.exponential(0.02) if rng.uniform() > 0.01 else 15.0
+            event = record(ts, quality=float(rng.uniform()), blur=bool(rng.uniform() < 0.2),
+                           checksum=f'c{rng.integers(40)}')
+            if rng.uniform() < 0.05:
+                event['quality_score'] = None
+            window.observe(event)
+            events.append(event)
+            if i % 97:
+                continue
+            # Buckets are 1s wide, so the window covers whole buckets back from the newest
+            start = (int(ts // 1.0) - 9) * 1.0
+            inside = [e for e in events if e['ts'] >= start]
+            metrics = window.metrics()
+            assert metrics['records'] == len(inside)
+            assert metrics['blur_rate'] == pytest.approx(np.mean([e['has_blur'] for e in inside]))
+            assert metrics['missing_rate'] == pytest.approx(np.mean([e['quality_score'] is None for e in inside]))
+            qualities = [e['quality_score'] for e in inside if e['quality_score'] is not None]
+            assert metrics['avg_quality_score'] == pytest.approx(np.mean(qualities))
+            seen, duplicates = set(), 0
+            for e in inside:
+                duplicates += e['checksum'] in seen
+                seen.add(e['checksum'])
+            assert metrics['duplicate_rate'] == pytest.approx(duplicates / len(inside))
+
+    def test_late_records_are_skipped(self):
+        window = SlidingWindowMetrics(window_seconds=10.0, n_buckets=10)
+        window.observe(record(100.0))
+        window.observe(record(50.0))
+        assert window.late == 1 and window.metrics()['records'] == 1
+
+class TestStreamingMonitor:
+    def test_alert_fires_once_and_resolves(self, tmp_path):
+        monitor = StreamingAlertMonitor(AlertSystem(log_path=tmp_path / 'alerts.jsonl'), windows=(10.0,),
+                                        evaluate_every_s=1.0, min_records=20)
+        good = [record(i * 0.1) for i in range(200)]
+        blurry = [record(20 + i * 0.1, blur=True) for i in range(200)]
+        recovered = [record(40 + i * 0.1) for i in range(200)]
+        assert monitor.consume(good) == []
+        raised = monitor.consume(blurry)
+        assert [(a['status'], a['rule']) for a in raised] == [('firing', 'Blur rate exceeds threshold')]
+        raised = monitor.consume(recovered)
+        assert [(a['status'], a['rule']) for a in raised] == [('resolved', 'Blur rate exceeds threshold')]
+        assert len((tmp_path / 'alerts.jsonl').read_text().splitlines()) == 2
+
+    def test_alert_resolves_when_traffic_stops(self, tmp_path):
+        monitor = StreamingAlertMonitor(AlertSystem(log_path=tmp_path / 'alerts.jsonl'), windows=(10.0,),
+                                        evaluate_every_s=1.0, min_records=20)
+        raised = monitor.consume(record(i * 0.1, blur=True) for i in range(200))
+        assert [a['status'] for a in raised] == ['firing']
+        # A trickle after the gap is too little to judge; the breach has left the window
+        raised = monitor.consume(record(60 + i, blur=True) for i in range(3))
+        assert [(a['status'], a['reason']) for a in raised] == [('resolved', 'insufficient_data')]
+        assert monitor.firing == {}
+
+        monitor.consume(record(100 + i * 0.1, blur=True) for i in range(200))
+        assert monitor.firing
+        assert [a['status'] for a in monitor.evaluate(ts=200.0)] == ['resolved']
+        assert monitor.evaluate(ts=201.0) == []
@@ -0,0 +1,380 @@
+"""
+Inference API Tests
+"""
+import pytest
+from datetime import datetime
+from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+fastapi = pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient
+
+DOC = {
+    "file_size_bytes": 45000,
+    "image_width": 800,
+    "image_height": 1000,
+    "quality_score": 0.65,
+    "has_blur": False
+}
+
+@pytest.fixture(scope="module")
+def client():
+    from api.main import app
+    return TestClient(app)
+
+class TestPredict:
+    def test_single_prediction(self, client):
+        response = client.post("/predict", json=DOC)
+        assert response.status_code == 200
+        body = response.json()
+        assert body["predicted_class"] in ["low", "medium", "high"]
+        assert abs(sum(body["probabilities"].values()) - 1.0) < 1e-6
+
+class TestResponseModes:
+    def test_fast_and_pydantic_paths_agree(self, client, monkeypatch):
+        import api.main
+        fast = client.post("/predict", json=DOC)
+        monkeypatch.setattr(api.main, "PREDICT_FAST_RESPONSE", False)
+        slow = client.post("/predict", json=DOC)
+        assert fast.headers["content-type"] == slow.headers["content-type"] == "application/json"
+        fast, slow = fast.json(), slow.json()
+        assert fast.keys() == slow.keys()
+        assert fast["probabilities"] == slow["probabilities"]
+        assert fast["predicted_class"] == slow["predicted_class"]
+        datetime.fromisoformat(fast["timestamp"])
+
+    def test_model_version_is_the_loaded_bundle(self, client, monkeypatch):
+        import dataclasses
+        import api.main
+        registry = api.main.registry
+        monkeypatch.setattr(registry, "_current", dataclasses.replace(registry.current, version="2099-01-01"))
+        assert client.post("/predict", json=DOC).json()["model_version"] == "2099-01-01"
+        assert client.post("/predict/batch", json={"documents": [DOC]}).json()["model_version"] == "2099-01-01"
+        monkeypatch.setattr(api.main, "PREDICT_FAST_RESPONSE", False)
+        assert client.post("/predict", json=DOC).json()["model_version"] == "2099-01-01"
+
+    def test_array_probabilities_follow_metadata_classes(self, client):
+        from api.main import registry
+        keyed = client.post("/predict", json=DOC).json()["probabilities"]
+        array = client.post("/predict", params={"probabilities": "array"}, json=DOC).json()["probabilities"]
+        classes = client.get("/model/info").json()["classes"]
+        assert registry.current.ordered_classes == tuple(classes)
+        assert array == [keyed[c] for c in classes]
+        assert client.post("/predict", params={"probabilities": "list"}, json=DOC).status_code == 422
+
+class TestBatchPredict:
+    def test_batch_matches_single(self, client):
+        docs = [DOC, dict(DOC, quality_score=0.1), dict(DOC, quality_score=0.95, has_blur=True)]
+        response = client.post("/predict/batch", json={"documents": docs})
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["index"] for r in results] == [0, 1, 2]
+        for doc, result in zip(docs, results):
+            single = client.post("/predict", json=doc).json()
+            assert result["predicted_class"] == single["predicted_class"]
+            assert result["confidence"] == pytest.approx(single["confidence"])
+
+    def test_columnar_payload(self, client):
+        columns = {key: [value, value] for key, value in DOC.items()}
+        response = client.post("/predict/batch", json={"columns": columns})
+        assert response.status_code == 200
+        assert response.json()["n_succeeded"] == 2
+
+    def test_invalid_items_do_not_fail_batch(self, client):
+        docs = [DOC, {"image_width": 10}, dict(DOC, image_height=0)]
+        response = client.post("/predict/batch", json={"documents": docs})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["n_succeeded"] == 1
+        assert body["n_failed"] == 2
+        assert body["results"][0]["error"] is None
+        assert body["results"][1]["error"]
+        assert body["results"][2]["error"]
+
+    def test_batch_size_limit(self, client, monkeypatch):
+        import api.main
+        monkeypatch.setattr(api.main, "MAX_BATCH_SIZE", 2)
+        response = client.post("/predict/batch", json={"documents": [DOC] * 3})
+        assert response.status_code == 413
+
+class TestMicroBatcher:
+    def test_coalesces_concurrent_requests(self):
+        import asyncio
+        import numpy as np
+        from api.batching import MicroBatcher
+
+        calls = []
+
+        def predict_fn(rows):
+            calls.append(len(rows))
+            return rows * 2
+
+        async def run():
+            batcher = MicroBatcher(predict_fn, max_batch_size=4, max_wait_ms=50)
+            await batcher.start()
+            rows = [np.array([float(i)]) for i in range(10)]
+            outputs = await asyncio.gather(*(batcher.submit(row) for row in rows))
+            await batcher.stop()
+            return outputs, batcher.stats()
+
+        outputs, stats = asyncio.run(run())
+        assert [float(out[0]) for out in outputs] == [2.0 * i for i in range(10)]
+        assert max(calls) <= 4
+        assert stats["items"] == 10
+        assert stats["batches"] == len(calls) < 10
+        assert sum(stats["batch_size_histogram"].values()) == stats["batches"]
+
+    def test_errors_propagate_to_callers(self):
+        import asyncio
+        import numpy as np
+        from api.batching import MicroBatcher
+
+        def predict_fn(rows):
+            raise ValueError("boom")
+
+        async def run():
+            batcher = MicroBatcher(predict_fn, max_batch_size=2, max_wait_ms=1)
+            await batcher.start()
+            try:
+                await batcher.submit(np.zeros(1))
+            finally:
+                await batcher.stop()
+
+        with pytest.raises(ValueError):
+            asyncio.run(run())
+
+    def test_bad_batch_does_not_stop_worker(self):
+        import asyncio
+        import numpy as np
+        from api.batching import MicroBatcher
+
+        async def run():
+            batcher = MicroBatcher(lambda rows: rows, max_batch_size=2, max_wait_ms=50)
+            await batcher.start()
+            # Rows of different widths cannot be stacked into one batch
+            bad = await asyncio.gather(batcher.submit(np.zeros(1)), batcher.submit(np.zeros(2)),
+                                       return_exceptions=True)
+            good = await batcher.submit(np.ones(1))
+            await batcher.stop()
+            return bad, good
+
+        bad, good = asyncio.run(run())
+        assert all(isinstance(result, ValueError) for result in bad)
+        assert float(good[0]) == 1.0
+
+    def test_stop_fails_batch_being_scored(self):
+        import asyncio
+        import threading
+        import numpy as np
+        from api.batching import MicroBatcher
+
+        started, release = threading.Event(), threading.Event()
+
+        def predict_fn(rows):
+            started.set()
+            release.wait(5)
+            return rows
+
+        async def run():
+            batcher = MicroBatcher(predict_fn, max_batch_size=1, max_wait_ms=1)
+            await batcher.start()
+            pending = asyncio.ensure_future(batcher.submit(np.zeros(1)))
+            await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+            await batcher.stop()
+            release.set()
+            return await asyncio.wait_for(pending, 1)
+
+        with pytest.raises(RuntimeError, match="stopped"):
+            asyncio.run(run())
+
+class TestMicroBatchedPredict:
+    def test_reload_before_batch_runs_uses_scoring_bundle(self, monkeypatch):
+        import dataclasses
+        import api.main
+        from api.prediction_cache import PredictionCache
+
+        registry = api.main.registry
+        swapped = dataclasses.replace(registry.current, version="swapped")
+        build = api.main.build_feature_matrix
+
+        def build_then_reload(docs):
+            # The request has captured the old bundle; the batch will see the new one
+            monkeypatch.setattr(registry, "_current", swapped)
+            return build(docs)
+
+        monkeypatch.setattr(api.main, "MICROBATCH_ENABLED", True)
+        monkeypatch.setattr(api.main, "build_feature_matrix", build_then_reload)
+        doc = dict(DOC, file_size_bytes=4242)
+        with TestClient(api.main.app) as client:
+            assert client.post("/predict", json=doc).status_code == 200
+        assert api.main.batcher is None
+        assert api.main.prediction_cache.get(PredictionCache.make_key("swapped", doc)) is not None
+
+class TestPredictionCache:
+    def test_repeat_request_hits_cache(self, client):
+        before = client.get("/cache/stats").json()
+        doc = dict(DOC, file_size_bytes=12345)
+        first = client.post("/predict", json=doc).json()
+        second = client.post("/predict", json=doc).json()
+        after = client.get("/cache/stats").json()
+        assert first["probabilities"] == second["probabilities"]
+        assert after["hits"] == before["hits"] + 1
+        assert after["misses"] == before["misses"] + 1
+
+    def test_reload_invalidates(self, client):
+        import api.main
+        client.post("/predict", json=DOC)
+        api.main.registry.reload(force=True)
+        assert client.get("/cache/stats").json()["size"] == 0
+
+    def test_lru_eviction_and_ttl(self, monkeypatch):
+        from api import prediction_cache
+        from api.prediction_cache import PredictionCache
+
+        cache = PredictionCache(max_entries=2, ttl_seconds=10)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1
+        cache.put("c", 3)
+        assert cache.get("b") is None
+        assert cache.stats()["evictions"] == 1
+
+        now = prediction_cache.time.monotonic()
+        monkeypatch.setattr(prediction_cache.time, "monotonic", lambda: now + 60)
+        assert cache.get("a") is None
+        assert cache.stats()["expirations"] == 1
+
+    def test_key_is_canonical(self):
+        from api.prediction_cache import PredictionCache
+
+        a = PredictionCache.make_key("v1", {"quality_score": 1.0, "has_blur": False})
+        b = PredictionCache.make_key("v1", {"has_blur": 0, "quality_score": 1})
+        assert a == b
+        assert a != PredictionCache.make_key("v2", {"quality_score": 1.0, "has_blur": False})
+
+class TestModelRegistry:
+    @pytest.fixture
+    def model_dir(self, tmp_path):
+        import shutil
+        shutil.copytree("models", tmp_path / "models")
+        return tmp_path / "models"
+
+    def test_reload_only_when_artifacts_change(self, model_dir):
+        import json
+        from api.model_registry import ModelRegistry
+
+        registry = ModelRegistry(model_dir)
+        assert registry.reload()["reloaded"]
+        old = registry.current
+        assert not registry.reload()["reloaded"]
+
+        metadata = json.loads((model_dir / "model_metadata.json").read_text())
+        metadata["trained_date"] = "2099-01-01T00:00:00"
+        (model_dir / "model_metadata.json").write_text(json.dumps(metadata))
+        result = registry.reload()
+        assert result["reloaded"]
+        assert result["previous_version"] == old.version
+        assert registry.current.version == "2099-01-01T00:00:00"
+
+    def test_failed_reload_keeps_serving(self, model_dir):
+        import json
+        from api.model_registry import ModelRegistry
+
+        registry = ModelRegistry(model_dir)
+        registry.reload()
+        old = registry.current
+
+        metadata = json.loads((model_dir / "model_metadata.json").read_text())
+        metadata["classes"] = ["good", "bad"]
+        (model_dir / "model_metadata.json").write_text(json.dumps(metadata))
+        result = registry.reload()
+        assert not result["reloaded"]
+        assert result["reason"] == "error"
+        assert registry.current is old
+        assert registry.status()["failed_reloads"] == 1
+
+    def test_admin_reload_endpoint(self, client):
+        response = client.post("/admin/reload", params={"force": True})
+        assert response.status_code == 200
+        assert response.json()["reloaded"]
+        assert client.get("/health").json()["model_loaded"]
+
+class TestLazyLoading:
+    def test_health_answers_while_loading(self, client, monkeypatch):
+        import api.main
+        from api.model_registry import ModelRegistry
+
+        monkeypatch.setattr(api.main, "registry", ModelRegistry("models"))
+        assert client.get("/health").json()["status"] == "loading"
+        assert client.post("/predict", json=dict(DOC, file_size_bytes=999)).status_code == 503
+
+        api.main.registry.load_in_background()
+        assert api.main.registry.wait_until_loaded(timeout=30)
+        assert client.get("/health").json()["status"] == "healthy"
+
+    def test_mmap_registry_skips_sklearn_artifacts(self):
+        import numpy as np
+        from api.model_registry import ModelRegistry
+
+        registry = ModelRegistry("models", mmap_mode="r")
+        registry.reload()
+        bundle = registry.current
+        assert bundle.scaler is None and bundle.scaler_folded
+        assert isinstance(bundle.model.value, np.memmap)
+        eager = ModelRegistry("models")
+        eager.reload()
+        features = np.array([[45000, 800, 1000, 0.65, 0, 0.8, 800000, 0.05625]])
+        np.testing.assert_allclose(bundle.predict_proba(features), eager.current.predict_proba(features))
+
+def metric_value(text, name):
+    for line in text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+class TestMetrics:
+    def test_prometheus_exposition(self, client):
+        from api.metrics import STAGES
+        requests_line = 'ledgerx_http_requests_total{endpoint="/predict",method="POST",status="200"}'
+        before = client.get("/metrics").text
+        client.post("/predict", json=dict(DOC, file_size_bytes=DOC["file_size_bytes"] + 7))
+        client.post("/predict", json={"file_size_bytes": "large"})
+        client.post("/predict/batch", json={"documents": [DOC, DOC]})
+        response = client.get("/metrics")
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = response.text
+        assert metric_value(text, requests_line) == metric_value(before, requests_line) + 1
+        assert metric_value(text, 'ledgerx_http_request_errors_total{endpoint="/predict",status="422"}') >= 1
+        for stage in STAGES:
+            assert f'ledgerx_stage_duration_seconds_count{{endpoint="/predict",stage="{stage}"}}' in text
+        assert 'ledgerx_stage_duration_seconds_count{endpoint="/predict/batch",stage="predict"} ' in text
+        version = client.get("/health").json()["model_version"]
+        assert f'ledgerx_model_info{{model_version="{version}"' in text
+        assert f'ledgerx_predictions_total{{endpoint="/predict/batch",model_version="{version}"' in text
+        assert metric_value(text, "process_resident_memory_bytes") > 0
+        assert "/metrics" not in text
+
+    def test_request_metrics_merge_thread_shards(self):
+        import threading
+        from api.metrics import NO_STAGES, RequestMetrics
+        metrics = RequestMetrics(buckets=(0.001, 0.01), fold_every=64)
+        stages = (0.0005,) + NO_STAGES[1:]
+
+        def worker():
+            for i in range(1000):
+                metrics.record("/predict", "POST", 200 if i % 10 else 500, 0.005, stages)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        text = "\n".join(metrics.render())
+        assert metric_value(text, 'ledgerx_http_requests_total{endpoint="/predict",method="POST",status="200"}') == 3600
+        assert metric_value(text, 'ledgerx_http_request_errors_total{endpoint="/predict",status="500"}') == 400
+        assert metric_value(text, 'ledgerx_http_request_duration_seconds_bucket{endpoint="/predict",le="0.001"}') == 0
+        assert metric_value(text, 'ledgerx_http_request_duration_seconds_bucket{endpoint="/predict",le="0.01"}') == 4000
+        assert metric_value(text, 'ledgerx_http_request_duration_seconds_sum{endpoint="/predict"}') == pytest.approx(20.0)
+        assert metric_value(text, 'ledgerx_stage_duration_seconds_count{endpoint="/predict",stage="validation"}') == 4000
+        assert 'stage="features"' not in text
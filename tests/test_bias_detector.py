@@ -0,0 +1,108 @@
+"""
+Bias Detector Tests
+"""
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.bias_detector import BiasDetector
+from src.slice_analysis import MISSING, SliceStats, dataset_source
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    n = 5000
+    df = pd.DataFrame({
+        'vendor': rng.choice(['acme', 'globex', 'initech'], n).astype(object),
+        'quality_score': rng.uniform(size=n),
+        'file_size_bytes': rng.integers(5000, 200000, n),
+        'has_blur': rng.integers(0, 2, n).astype(bool),
+        'quality_bin': rng.choice(['low', 'medium', 'high'], n),
+    })
+    df.loc[::50, 'vendor'] = None
+    df['predicted_class'] = np.where(rng.uniform(size=n) < 0.8, df['quality_bin'], 'low')
+    return df
+
+class TestSliceStats:
+    def test_chunked_pass_matches_groupby(self, frame):
+        stats = SliceStats(['vendor'], ['quality_score', 'file_size_bytes'], ['has_blur'],
+                           correlation=('file_size_bytes', 'quality_score'),
+                           label_column='quality_bin', prediction_column='predicted_class')
+        stats.consume(frame.iloc[i:i + 700] for i in range(0, len(frame), 700))
+        assert stats.rows == len(frame) and stats.chunks == 8
+
+        vendor = frame['vendor'].fillna(MISSING)
+        grouped = frame.groupby(vendor)
+        slices = {s['value']: s for s in stats.slices('vendor')}
+        assert set(slices) == {'acme', 'globex', 'initech', MISSING}
+        for value, group in grouped:
+            s = slices[value]
+            assert s['count'] == len(group)
+            assert s['mean_file_size_bytes'] == pytest.approx(group['file_size_bytes'].mean())
+            assert s['std_quality_score'] == pytest.approx(group['quality_score'].std(ddof=0))
+            assert s['rate_has_blur'] == pytest.approx(group['has_blur'].mean())
+            assert s['correlation'] == pytest.approx(group['file_size_bytes'].corr(group['quality_score']))
+            assert s['accuracy'] == pytest.approx((group['quality_bin'] == group['predicted_class']).mean())
+            rates = group['predicted_class'].value_counts(normalize=True)
+            assert s['prediction_rates']['low'] == pytest.approx(rates['low'])
+        overall = stats.correlation_matrix()['file_size_bytes']['quality_score']
+        assert overall == pytest.approx(frame['file_size_bytes'].corr(frame['quality_score']))
+
+    def test_dataset_source_from_path(self):
+        paths = pd.Series(['data/raw/dataset1/train/a.jpg', '/abs/data/raw/dataset2/b.jpg', 'elsewhere/c.jpg'])
+        assert dataset_source(paths).tolist() == ['dataset1', 'dataset2', MISSING]
+
+class ThresholdModel:
+    """Predicts from quality_score alone; wrong on every dataset2 document"""
+    classes_ = np.array(['high', 'low', 'medium'])
+
+    def predict(self, X):
+        X = np.asarray(X)
+        labels = np.where(X[:, 3] > 0.66, 'high', np.where(X[:, 3] > 0.33, 'medium', 'low'))
+        return np.where(X[:, 0] > 150000, 'low', labels)
+
+class TestBiasDetector:
+    def test_report_flags_source_and_accuracy_gaps(self, tmp_path):
+        rng = np.random.default_rng(1)
+        n = 3000
+        source = rng.choice(['dataset1', 'dataset2'], n)
+        quality = np.where(source == 'dataset2', rng.uniform(0.7, 1.0, n), rng.uniform(0.0, 1.0, n))
+        df = pd.DataFrame({
+            'doc_id': [f'doc_{i:06d}' for i in range(n)],
+            'source_path': [f'data/raw/{s}/train/{i}.jpg' for i, s in enumerate(source)],
+            'doc_type': 'invoice',
+            'file_format': 'jpg',
+            'file_size_bytes': np.where(source == 'dataset2', 180000, rng.integers(5000, 100000, n)),
+            'image_width': 640,
+            'image_height': 640,
+            'quality_score': quality,
+            'has_blur': False,
+            'vendor': None,
+            'quality_bin': pd.cut(quality, [-np.inf, 0.33, 0.66, np.inf], labels=['low', 'medium', 'high']),
+        })
+        csv_path = tmp_path / 'metadata.csv'
+        df.to_csv(csv_path, index=False)
+        model_dir = tmp_path / 'models'
+        model_dir.mkdir()
+        import joblib
+        joblib.dump(ThresholdModel(), model_dir / 'baseline_model.pkl')
+
+        detector = BiasDetector()
+        detector.config['chunk_rows'] = 1000
+        output = tmp_path / 'reports' / 'bias.json'
+        report = detector.analyze(csv_path, model_dir=model_dir, output_path=output)
+        assert report is detector.bias_report
+        assert json.loads(output.read_text())['rows'] == n
+        assert report['chunks'] == 3
+
+        found = {(b['type'], b.get('slice')): b for b in report['biases']}
+        assert found[('slice_bias', 'source')]['detected']
+        assert not found[('format_bias', 'file_format')]['detected']
+        assert found[('accuracy_bias', 'source')]['detected']
+        assert found[('accuracy_bias', 'source')]['worst_slice'] == 'dataset2'
+        assert ('slice_bias', 'quality_bin') not in found
+        assert report['total_biases'] == sum(b['detected'] for b in report['biases'])
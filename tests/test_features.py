@@ -0,0 +1,50 @@
+"""
+Feature Engineering Tests
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+from types import SimpleNamespace
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.features import FEATURE_NAMES, RAW_FEATURES, feature_matrix, records_matrix, safe_divide
+
+@pytest.fixture
+def metadata():
+    return pd.read_csv('data/splits/test_metadata.csv', usecols=list(RAW_FEATURES)).head(200)
+
+class TestFeatures:
+    def test_matches_reference_formulas(self, metadata):
+        X = feature_matrix(metadata)
+        assert X.shape == (200, len(FEATURE_NAMES))
+        width, height = metadata['image_width'], metadata['image_height']
+        np.testing.assert_allclose(X[:, FEATURE_NAMES.index('aspect_ratio')], width / height)
+        np.testing.assert_allclose(X[:, FEATURE_NAMES.index('size_per_pixel')],
+                                   metadata['file_size_bytes'] / (width * height))
+        np.testing.assert_array_equal(X[:, FEATURE_NAMES.index('has_blur')], metadata['has_blur'].astype(float))
+
+    def test_zero_dimensions_are_guarded(self):
+        X = feature_matrix({'file_size_bytes': [1000, 1000], 'image_width': [0, 10], 'image_height': [10, 0],
+                            'quality_score': [0.5, 0.5], 'has_blur': [False, True]})
+        assert np.isfinite(X).all()
+        assert X[:, FEATURE_NAMES.index('aspect_ratio')].tolist() == [0.0, 0.0]
+        assert X[:, FEATURE_NAMES.index('size_per_pixel')].tolist() == [0.0, 0.0]
+        assert safe_divide(np.array([1.0, 2.0]), np.array([0.0, 4.0])).tolist() == [0.0, 0.5]
+
+    def test_input_layouts_agree(self, metadata):
+        expected = feature_matrix(metadata)
+        structured = metadata.to_records(index=False)
+        np.testing.assert_array_equal(feature_matrix(structured), expected)
+        records = [SimpleNamespace(**row) for row in metadata.to_dict('records')]
+        np.testing.assert_array_equal(records_matrix(records), expected)
+
+    def test_trainer_and_api_share_the_transform(self, metadata):
+        pytest.importorskip("mlflow")
+        from api.main import DocumentMetadata, build_feature_matrix
+        from src.model_trainer import BaselineModelTrainer
+        trainer_X = BaselineModelTrainer().prepare_features(metadata)
+        assert list(trainer_X.columns) == list(FEATURE_NAMES)
+        docs = [DocumentMetadata(**row) for row in metadata.to_dict('records')]
+        np.testing.assert_array_equal(build_feature_matrix(docs), trainer_X.to_numpy())
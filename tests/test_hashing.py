@@ -0,0 +1,42 @@
+"""
+File Hashing Tests
+"""
+import hashlib
+import pytest
+from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.hashing import available_algorithms, fast_algorithm, hash_bytes, hash_file, hash_files
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for i, size in enumerate([0, 1, 4095, 4097, 3 * 2**20 + 7]):
+        path = tmp_path / f"file_{i}.bin"
+        path.write_bytes(bytes((j * 31 + i) % 256 for j in range(size)))
+        paths.append(path)
+    return paths
+
+class TestHashFile:
+    def test_md5_matches_hashlib_for_every_read_path(self, files):
+        for path in files:
+            expected = hashlib.md5(path.read_bytes()).hexdigest()
+            assert hash_file(path) == expected
+            assert hash_file(path, buffer_size=4096) == expected
+            assert hash_file(path, use_mmap=True) == expected
+
+    def test_all_algorithms_agree_with_hash_bytes(self, files):
+        for algorithm in available_algorithms() + ["fast"]:
+            data = files[-1].read_bytes()
+            assert hash_file(files[-1], algorithm) == hash_bytes(data, algorithm)
+        assert fast_algorithm() in available_algorithms()
+
+    def test_unknown_algorithm(self, files):
+        with pytest.raises(ValueError):
+            hash_file(files[0], "crc-nope")
+
+    def test_bulk_api_preserves_order(self, files):
+        digests = hash_files(files, workers=4)
+        assert list(digests) == [str(p) for p in files]
+        assert list(digests.values()) == [hash_file(p) for p in files]
@@ -0,0 +1,69 @@
+"""
+Hyperparameter Search Tests
+"""
+import numpy as np
+import pytest
+from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.hyperparameter_search import (HyperparameterSearch, pareto_front, pareto_ranks,
+                                       sample_configs)
+
+SPACE = {
+    "n_estimators": [5, 20],
+    "max_depth": [2, 6],
+    "min_samples_leaf": [1, 10],
+    "max_features": [1.0],
+}
+
+@pytest.fixture
+def data():
+    rng = np.random.RandomState(0)
+    X = rng.normal(size=(600, 4))
+    y = np.digitize(X[:, 0] + 0.3 * X[:, 1], [-0.5, 0.5])
+    return X[:400], y[:400], X[400:], y[400:]
+
+def summary(result):
+    return [(t["trial"], t["rung"], t["train_rows"], t["val_f1"], t["decision_cost"]) for t in result["trials"]]
+
+class TestPareto:
+    def test_front_keeps_only_non_dominated(self):
+        scores = [0.90, 0.95, 0.95, 0.80, 0.99]
+        costs = [10, 20, 15, 5, 40]
+        assert pareto_front(scores, costs) == [0, 2, 3, 4]
+
+    def test_ranks_peel_fronts(self):
+        assert pareto_ranks([0.9, 0.8, 0.7], [1, 2, 3]) == [0, 1, 2]
+
+class TestHyperparameterSearch:
+    def test_sampled_configs_are_distinct_and_seeded(self):
+        configs = sample_configs(SPACE, 8, seed=3)
+        assert len({tuple(sorted(c.items())) for c in configs}) == 8
+        assert sample_configs(SPACE, 8, seed=3) == configs
+        assert len(sample_configs(SPACE, 100, seed=3)) == 8
+
+    def test_successive_halving_promotes_a_shrinking_set(self, data):
+        search = HyperparameterSearch(n_trials=8, eta=2, min_fraction=0.25, workers=1,
+                                      space=SPACE, latency_repeats=5)
+        result = search.run(*data)
+        per_rung = [sum(t["rung"] == r for t in result["trials"]) for r in range(len(result["rung_fractions"]))]
+        assert per_rung == [8, 4, 2, 1]
+        assert result["trials"][-1]["train_rows"] == 400
+        assert result["selected"] in result["front"]
+        assert "latency_us" in result["selected"]
+
+    def test_selection_within_tolerance_prefers_cheaper_model(self, data):
+        result = HyperparameterSearch(strategy="random", n_trials=8, workers=1, space=SPACE,
+                                      f1_tolerance=1.0, latency_repeats=5).run(*data)
+        assert result["selected"]["decision_cost"] == min(t["decision_cost"] for t in result["trials"])
+
+    def test_reproducible_across_worker_counts(self, data):
+        serial = HyperparameterSearch(n_trials=8, eta=2, workers=1, space=SPACE, latency_repeats=5).run(*data)
+        parallel = HyperparameterSearch(n_trials=8, eta=2, workers=2, space=SPACE, latency_repeats=5).run(*data)
+        assert summary(serial) == summary(parallel)
+        assert serial["selected"]["params"] == parallel["selected"]["params"]
+
+    def test_rejects_unknown_strategy(self):
+        with pytest.raises(ValueError):
+            HyperparameterSearch(strategy="grid")
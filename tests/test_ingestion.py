@@ -0,0 +1,191 @@
+"""
+Ingestion Engine Tests
+"""
+import pytest
+import numpy as np
+import yaml
+from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+cv2 = pytest.importorskip("cv2")
+from src.data_pipeline import DataPipeline
+from src.ingestion import ImageIngestionEngine, IngestionCheckpoint, scan_images
+
+def write_images(root, n, offset=0):
+    rng = np.random.RandomState(offset)
+    paths = []
+    for i in range(offset, offset + n):
+        path = root / f"dataset{i % 2 + 1}" / f"img_{i:03d}.jpg"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        image = rng.randint(0, 255, size=(40 + i, 60, 3), dtype=np.uint8)
+        cv2.imwrite(str(path), image)
+        paths.append(path)
+    return paths
+
+@pytest.fixture
+def raw_dir(tmp_path):
+    raw = tmp_path / "raw"
+    write_images(raw, 6)
+    (raw / "dataset1" / "README.txt").write_text("not an image")
+    return raw
+
+class TestIngestionEngine:
+    def test_records_match_direct_computation(self, raw_dir):
+        docs = ImageIngestionEngine(workers=2, chunk_size=2).run(raw_dir)
+        assert [d.doc_id for d in docs] == [f"doc_{i:06d}" for i in range(6)]
+        assert [d.source_path for d in docs] == [str(p) for p in scan_images(raw_dir)]
+
+        pipeline = DataPipeline()
+        for doc in docs:
+            rgb = cv2.cvtColor(cv2.imread(doc.source_path), cv2.COLOR_BGR2RGB)
+            quality, blur = pipeline.assess_image_quality(rgb)
+            assert doc.quality_score == pytest.approx(quality)
+            assert doc.has_blur == blur
+            assert doc.checksum == pipeline.calculate_checksum(doc.source_path)
+            assert (doc.image_height, doc.image_width) == rgb.shape[:2]
+
+    def test_resume_skips_checkpointed_images(self, raw_dir, tmp_path):
+        checkpoint = tmp_path / "checkpoint.jsonl"
+        engine = ImageIngestionEngine(workers=1, chunk_size=4, checkpoint_path=checkpoint)
+        first = engine.run(raw_dir)
+        assert engine.stats["processed"] == 6
+
+        # Simulate a crash mid-write: torn last line must be ignored
+        with open(checkpoint, "a") as f:
+            f.write('{"source_path": "broken')
+        write_images(raw_dir, 2, offset=6)
+        second = engine.run(raw_dir)
+        assert engine.stats["resumed"] == 6
+        assert engine.stats["processed"] == 2
+        assert len(second) == 8
+        previous = {d.source_path: d.checksum for d in first}
+        assert all(previous[d.source_path] == d.checksum for d in second if d.source_path in previous)
+        assert len(IngestionCheckpoint(checkpoint).load()) == 8
+
+    def test_resume_reingests_images_changed_since_checkpoint(self, raw_dir, tmp_path):
+        checkpoint = tmp_path / "checkpoint.jsonl"
+        engine = ImageIngestionEngine(workers=1, checkpoint_path=checkpoint)
+        engine.run(raw_dir)
+
+        # Edited between a crash and the resume: the checkpointed record is stale
+        changed = scan_images(raw_dir)[3]
+        cv2.imwrite(str(changed), np.full((300, 200, 3), 128, dtype=np.uint8))
+        docs = engine.run(raw_dir)
+        assert engine.stats["resumed"] == 5
+        assert engine.stats["processed"] == 1
+        record = next(d for d in docs if d.source_path == str(changed))
+        assert record.checksum == DataPipeline().calculate_checksum(str(changed))
+        assert record.image_height == 300
+
+    def test_undecodable_images_are_reported_not_checkpointed(self, raw_dir, tmp_path):
+        (raw_dir / "dataset1" / "corrupt.jpg").write_bytes(b"not a jpeg")
+        checkpoint = tmp_path / "checkpoint.jsonl"
+        engine = ImageIngestionEngine(workers=1, checkpoint_path=checkpoint)
+        docs = engine.run(raw_dir)
+        assert len(docs) == 6
+        assert engine.stats["errors"] == 1
+        assert str(raw_dir / "dataset1" / "corrupt.jpg") not in IngestionCheckpoint(checkpoint).load()
+
+class TestQualityModes:
+    @pytest.fixture
+    def scan(self, tmp_path):
+        # Sharp text-like strokes on a large page, like a receipt scan
+        rng = np.random.RandomState(0)
+        page = np.full((1200, 900), 235, dtype=np.uint8)
+        for _ in range(400):
+            y, x = rng.randint(0, 1180), rng.randint(0, 880)
+            page[y:y + 3, x:x + 20] = 20
+        path = tmp_path / "scan.jpg"
+        cv2.imwrite(str(path), cv2.cvtColor(page, cv2.COLOR_GRAY2BGR), [cv2.IMWRITE_JPEG_QUALITY, 95])
+        return path
+
+    def test_fast_modes_track_exact(self, scan):
+        from src.ingestion import process_image
+        exact = process_image(str(scan))
+        for quality in ({"mode": "fast"}, {"mode": "tiles", "tile_size": 128, "tiles": 36}):
+            record = process_image(str(scan), quality=quality)
+            assert record["quality_score"] == pytest.approx(exact["quality_score"], rel=0.25)
+            assert record["has_blur"] == exact["has_blur"]
+            assert record["checksum"] == exact["checksum"]
+
+    def test_reduced_decode_keeps_full_dimensions(self, scan):
+        from src.ingestion import process_image
+        record = process_image(str(scan), quality={"mode": "reduced", "reduce_factor": 4})
+        assert (record["image_width"], record["image_height"]) == (900, 1200)
+
+    def test_unknown_mode_is_an_ingestion_error(self, scan):
+        from src.ingestion import process_image
+        assert "error" in process_image(str(scan), quality={"mode": "guess"})
+
+@pytest.fixture
+def config_path(raw_dir, tmp_path):
+    with open('config/pipeline_config.yaml') as f:
+        config = yaml.safe_load(f)
+    config['data'].update(
+        raw_dir=str(raw_dir),
+        processed_dir=str(tmp_path / "processed"),
+        splits_dir=str(tmp_path / "splits")
+    )
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.safe_dump(config))
+    return str(path)
+
+class TestRunPipeline:
+    def test_run_pipeline_writes_metadata(self, config_path, tmp_path):
+        import pandas as pd
+        report = DataPipeline(config_path).run_pipeline(workers=1)
+        assert report["documents"] == 6
+        df = pd.read_csv(report["metadata_path"])
+        assert list(df.columns)[-1] == "quality_bin"
+        assert df['checksum'].is_unique
+        assert df['perceptual_hash'].str.len().eq(64).all()
+        assert df['duplicate_group'].isin(df['doc_id']).all()
+        assert report["duplicates"]["groups"] == df['duplicate_group'].nunique()
+        assert not (tmp_path / "processed" / ".ingestion_checkpoint.jsonl").exists()
+
+class TestIncrementalPipeline:
+    def test_unchanged_files_are_skipped(self, config_path, monkeypatch):
+        import src.ingestion
+        pipeline = DataPipeline(config_path)
+        first = pipeline.run_pipeline(workers=1)
+        assert first["changes"] == {"skipped": 0, "added": 6, "updated": 0, "removed": 0}
+
+        def fail(*args, **kwargs):
+            raise AssertionError("unchanged image was decoded")
+        monkeypatch.setattr(src.ingestion, "process_image", fail)
+        second = pipeline.run_pipeline(workers=1)
+        assert second["changes"] == {"skipped": 6, "added": 0, "updated": 0, "removed": 0}
+        assert second["ingestion"]["total"] == 0
+
+    def test_added_updated_removed_are_merged(self, raw_dir, config_path):
+        import os
+        import pandas as pd
+        pipeline = DataPipeline(config_path)
+        before = pd.read_csv(pipeline.run_pipeline(workers=1)["metadata_path"]).set_index("source_path")
+
+        paths = scan_images(raw_dir)
+        paths[0].unlink()
+        image = np.full((300, 200, 3), 128, dtype=np.uint8)
+        cv2.imwrite(str(paths[1]), image)
+        # Touched but identical: re-hashed, not re-ingested
+        stat = paths[2].stat()
+        os.utime(paths[2], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        new = write_images(raw_dir, 1, offset=6)[0]
+
+        report = pipeline.run_pipeline(workers=1)
+        assert report["changes"] == {"skipped": 4, "added": 1, "updated": 1, "removed": 1}
+        after = pd.read_csv(report["metadata_path"]).set_index("source_path")
+        assert str(paths[0]) not in after.index
+        assert after.loc[str(paths[1]), "doc_id"] == before.loc[str(paths[1]), "doc_id"]
+        assert after.loc[str(paths[1]), "image_height"] == 300
+        assert after.loc[str(paths[1]), "checksum"] == pipeline.calculate_checksum(str(paths[1]))
+        assert after.loc[str(new), "doc_id"] == "doc_000006"
+        assert after["doc_id"].is_unique
+
+    def test_full_rebuild_ignores_manifest(self, config_path):
+        pipeline = DataPipeline(config_path)
+        pipeline.run_pipeline(workers=1)
+        report = pipeline.run_pipeline(workers=1, incremental=False)
+        assert report["changes"]["added"] == 6
+        assert report["documents"] == 6
@@ -0,0 +1,87 @@
+"""
+Metadata Store Tests
+"""
+import pytest
+import pandas as pd
+from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pytest.importorskip("pyarrow")
+from src.metadata_store import (SPLITS_DATASET, csv_to_parquet, iter_metadata, iter_split,
+                                metadata_columns, read_metadata, read_split, write_metadata)
+
+@pytest.fixture
+def metadata():
+    return pd.read_csv('data/processed/all_metadata.csv').head(600)
+
+class TestMetadataStore:
+    def test_round_trip_uses_typed_columns(self, metadata, tmp_path):
+        path = write_metadata(metadata, tmp_path / "all_metadata.csv", export_csv=True)
+        assert path.suffix == ".parquet" and (tmp_path / "all_metadata.csv").exists()
+        df = read_metadata(tmp_path / "all_metadata.csv")
+        assert len(df) == len(metadata)
+        assert isinstance(df['quality_bin'].dtype, pd.CategoricalDtype)
+        assert list(df['quality_bin'].cat.categories) == ['low', 'medium', 'high']
+        assert isinstance(df['file_format'].dtype, pd.CategoricalDtype)
+        assert df['has_blur'].dtype == bool
+        assert df['file_size_bytes'].dtype == 'int64'
+        assert df['checksum'].tolist() == metadata['checksum'].tolist()
+
+    def test_projection_and_filters_match_csv_path(self, metadata, tmp_path):
+        metadata.to_csv(tmp_path / "all_metadata.csv", index=False)
+        filters = [('quality_bin', 'in', ['low', 'medium']), ('file_size_bytes', '>', 15000)]
+        from_csv = read_metadata(tmp_path / "all_metadata.csv", columns=['doc_id', 'quality_score'], filters=filters)
+        write_metadata(metadata, tmp_path / "all_metadata.parquet")
+        from_parquet = read_metadata(tmp_path / "all_metadata.parquet", columns=['doc_id', 'quality_score'],
+                                     filters=filters)
+        assert list(from_parquet.columns) == ['doc_id', 'quality_score']
+        assert 0 < len(from_parquet) < len(metadata)
+        pd.testing.assert_frame_equal(from_csv, from_parquet)
+
+    def test_streamed_split_dataset(self, metadata, tmp_path):
+        for split, part in zip(('train', 'val', 'test'), (metadata[:400], metadata[400:500], metadata[500:])):
+            part.to_csv(tmp_path / f"{split}_metadata.csv", index=False)
+            csv_to_parquet(tmp_path / f"{split}_metadata.csv", tmp_path / SPLITS_DATASET,
+                           partition_cols=['split'], extra_columns={'split': split}, block_size=4096)
+        val = read_split(tmp_path, 'val')
+        assert val['doc_id'].tolist() == metadata['doc_id'][400:500].tolist()
+        assert 'split' not in val.columns
+        assert len(read_split(tmp_path, 'train', columns=['quality_score'])) == 400
+        assert 'split' in metadata_columns(tmp_path / SPLITS_DATASET)
+
+    def test_empty_split_replaces_previous_output(self, metadata, tmp_path):
+        metadata[100:].to_csv(tmp_path / "train_metadata.csv", index=False)
+        csv_to_parquet(tmp_path / "train_metadata.csv", tmp_path / SPLITS_DATASET,
+                       partition_cols=['split'], extra_columns={'split': 'train'})
+        for rows in (metadata[:100], metadata[:0]):
+            rows.to_csv(tmp_path / "val_metadata.csv", index=False)
+            csv_to_parquet(tmp_path / "val_metadata.csv", tmp_path / SPLITS_DATASET,
+                           partition_cols=['split'], extra_columns={'split': 'val'})
+            csv_to_parquet(tmp_path / "val_metadata.csv")
+        assert len(read_split(tmp_path, 'val', columns=['doc_id'])) == 0
+        assert len(read_split(tmp_path, 'train', columns=['doc_id'])) == len(metadata) - 100
+        assert len(read_metadata(tmp_path / "val_metadata.parquet")) == 0
+
+    def test_read_split_falls_back_to_csv(self, metadata, tmp_path):
+        metadata.to_csv(tmp_path / "val_metadata.csv", index=False)
+        val = read_split(tmp_path, 'val', columns=['doc_id'], filters=[('quality_bin', '=', 'low')])
+        assert val['doc_id'].tolist() == metadata.loc[metadata['quality_bin'] == 'low', 'doc_id'].tolist()
+
+    def test_batches_are_bounded_and_complete(self, metadata, tmp_path):
+        metadata.to_csv(tmp_path / "val_metadata.csv", index=False)
+        filters = [('quality_bin', '!=', 'high')]
+        expected = read_metadata(tmp_path / "val_metadata.csv", columns=['doc_id'], filters=filters)
+        for path in (tmp_path / "val_metadata.csv", write_metadata(metadata, tmp_path / "val_metadata.parquet")):
+            batches = list(iter_metadata(path, columns=['doc_id'], filters=filters, batch_rows=64))
+            assert max(len(batch) for batch in batches) <= 64
+            assert pd.concat(batches)['doc_id'].tolist() == expected['doc_id'].tolist()
+
+    def test_iter_split_over_dataset(self, metadata, tmp_path):
+        for split, part in zip(('train', 'val', 'test'), (metadata[:400], metadata[400:500], metadata[500:])):
+            part.to_csv(tmp_path / f"{split}_metadata.csv", index=False)
+            csv_to_parquet(tmp_path / f"{split}_metadata.csv", tmp_path / SPLITS_DATASET,
+                           partition_cols=['split'], extra_columns={'split': split})
+        batches = list(iter_split(tmp_path, 'train', batch_rows=150))
+        assert [len(batch) for batch in batches] == [150, 150, 100]
+        assert 'split' not in batches[0].columns
@@ -0,0 +1,61 @@
+"""
+Model Compression Tests
+"""
+import numpy as np
+import pytest
+from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from src.model_compression import (candidate_family, greedy_tree_selection, select_candidate,
+                                   subforest)
+
+@pytest.fixture
+def fitted():
+    rng = np.random.RandomState(0)
+    X = rng.normal(size=(800, 5))
+    y = np.array(["low", "medium", "high"])[np.digitize(X[:, 0] + 0.5 * X[:, 1], [-0.5, 0.5])]
+    scaler = StandardScaler().fit(X[:500])
+    model = RandomForestClassifier(n_estimators=30, max_depth=6, random_state=0).fit(scaler.transform(X[:500]), y[:500])
+    return model, scaler, scaler.transform(X[:500]), scaler.transform(X[500:]), y[500:]
+
+class TestTreeSelection:
+    def test_order_is_a_deterministic_permutation(self, fitted):
+        model, _, _, X_val, y_val = fitted
+        order = greedy_tree_selection(model, X_val, y_val)
+        assert sorted(order) == list(range(30))
+        assert greedy_tree_selection(model, X_val, y_val, max_trees=5) == order[:5]
+
+    def test_subforest_matches_manual_average(self, fitted):
+        model, _, _, X_val, _ = fitted
+        pruned = subforest(model, [3, 7, 11])
+        expected = np.mean([model.estimators_[i].predict_proba(X_val.astype(np.float32)) for i in (3, 7, 11)], axis=0)
+        np.testing.assert_allclose(pruned.predict_proba(X_val), expected)
+        assert len(model.estimators_) == 30
+
+class TestCandidateFamily:
+    def test_family_is_measured_and_cheaper(self, fitted):
+        model, scaler, X_train, X_val, y_val = fitted
+        family = candidate_family(model, scaler, X_train, X_val, y_val, tree_counts=(1, 5, 50),
+                                  distill_depths=(3,), latency_repeats=5)
+        assert [c["name"] for c in family] == ["full", "pruned_1", "pruned_5", "distilled_depth_3"]
+        full = family[0]
+        for candidate in family[1:]:
+            assert candidate["artifact_bytes"] < full["artifact_bytes"]
+            assert candidate["decision_cost"] < full["decision_cost"]
+            assert candidate["latency_us"] > 0
+
+    def test_selection_respects_tolerance(self, fitted):
+        model, scaler, X_train, X_val, y_val = fitted
+        family = candidate_family(model, scaler, X_train, X_val, y_val, tree_counts=(1, 5, 10),
+                                  distill_depths=(2, 6), latency_repeats=5)
+        full_accuracy = family[0]["val_accuracy"]
+        strict = select_candidate(family, accuracy_tolerance=0.0)
+        assert strict["val_accuracy"] >= full_accuracy
+        loose = select_candidate(family, accuracy_tolerance=1.0)
+        assert loose["decision_cost"] == min(c["decision_cost"] for c in family)
+        with pytest.raises(ValueError):
+            select_candidate(family, objective="accuracy")
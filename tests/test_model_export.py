@@ -0,0 +1,96 @@
+"""
+Model Export Tests
+"""
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+from src.model_export import (
+    FlatForest, FusedLinearModel, export_flat_forest,
+    export_inference_model, load_inference_model
+)
+
+@pytest.fixture(scope="module")
+def forest():
+    rng = np.random.RandomState(0)
+    X = rng.normal(size=(500, 8))
+    y = np.array(["low", "medium", "high"])[(X[:, 0] + X[:, 3] > 0).astype(int) + (X[:, 5] > 1)]
+    model = RandomForestClassifier(n_estimators=20, max_depth=6, random_state=42).fit(X, y)
+    return model, rng.normal(size=(3000, 8))
+
+class TestFlatForest:
+    def test_matches_sklearn_predict_proba(self, forest):
+        model, X = forest
+        flat = FlatForest.from_sklearn(model)
+        np.testing.assert_allclose(flat.predict_proba(X), model.predict_proba(X), atol=1e-12)
+        assert (flat.predict(X) == model.predict(X)).all()
+
+    def test_single_row_and_chunking(self, forest):
+        model, X = forest
+        flat = FlatForest.from_sklearn(model)
+        np.testing.assert_allclose(flat.predict_proba(X[:1]), model.predict_proba(X[:1]), atol=1e-12)
+        np.testing.assert_allclose(flat.predict_proba(X, chunk_size=7), flat.predict_proba(X), atol=1e-12)
+
+    def test_save_load_roundtrip(self, forest, tmp_path):
+        model, X = forest
+        path = export_flat_forest(model, tmp_path / "flat")
+        loaded = FlatForest.load(path)
+        assert list(loaded.classes_) == list(model.classes_)
+        np.testing.assert_allclose(loaded.predict_proba(X), model.predict_proba(X), atol=1e-12)
+
+    def test_rejects_wrong_shape(self, forest):
+        model, _ = forest
+        with pytest.raises(ValueError):
+            FlatForest.from_sklearn(model).predict_proba(np.zeros((2, 3)))
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.RandomState(1)
+    X = rng.lognormal(mean=5, sigma=2, size=(800, 8))
+    y = np.array(["low", "medium", "high"])[np.digitize(np.log(X[:, 1] * X[:, 2]), [9.5, 10.5])]
+    scaler = StandardScaler().fit(X)
+    X_new = X[rng.randint(0, len(X), 5000)] * rng.uniform(0.9, 1.1, size=(5000, 8))
+    return X, y, scaler, X_new
+
+class TestScalerFolding:
+    def test_fused_forest_matches_scaler_and_model(self, data, tmp_path):
+        X, y, scaler, X_new = data
+        model = RandomForestClassifier(n_estimators=15, max_depth=8, random_state=0)
+        model.fit(scaler.transform(X), y)
+        fused = load_inference_model(export_inference_model(model, scaler, tmp_path / "fused"))
+        assert fused.scaler_folded
+        for X_eval in (X, X_new):
+            expected = model.predict_proba(scaler.transform(X_eval))
+            np.testing.assert_allclose(fused.predict_proba(X_eval), expected, atol=1e-12)
+
+    @pytest.mark.parametrize("n_classes", [2, 3])
+    def test_fused_linear_matches_scaler_and_model(self, data, tmp_path, n_classes):
+        X, y, scaler, X_new = data
+        if n_classes == 2:
+            y = np.where(y == "high", "high", "other")
+        model = LogisticRegression(max_iter=2000).fit(scaler.transform(X), y)
+        fused = load_inference_model(export_inference_model(model, scaler, tmp_path / "linear"))
+        assert isinstance(fused, FusedLinearModel)
+        expected = model.predict_proba(scaler.transform(X_new))
+        np.testing.assert_allclose(fused.predict_proba(X_new), expected, atol=1e-9)
+        assert (fused.predict(X_new) == model.predict(scaler.transform(X_new))).all()
+
+    def test_exported_model_matches_pickle(self):
+        if not Path('models/baseline_model_fused').exists():
+            pytest.skip("Fused model not exported")
+        pytest.importorskip("mlflow")
+        import joblib
+        import pandas as pd
+        model = joblib.load('models/baseline_model.pkl')
+        scaler = joblib.load('models/scaler.pkl')
+        df = pd.read_csv('data/splits/test_metadata.csv')
+        from src.model_trainer import BaselineModelTrainer
+        X = BaselineModelTrainer().prepare_features(df)
+        fused = load_inference_model('models/baseline_model_fused')
+        expected = model.predict_proba(scaler.transform(X))
+        np.testing.assert_allclose(fused.predict_proba(X.values), expected, atol=1e-12)
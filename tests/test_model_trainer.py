@@ -0,0 +1,86 @@
+"""
+Model Trainer Tests
+"""
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pytest.importorskip("mlflow")
+from sklearn.metrics import accuracy_score, confusion_matrix, f1_score
+
+from src.model_trainer import BaselineModelTrainer, LABELS, confusion_metrics, label_edges
+
+@pytest.fixture
+def chunked_config(tmp_path, monkeypatch):
+    monkeypatch.setenv("MLFLOW_TRACKING_URI", (tmp_path / "mlruns").as_uri())
+    splits_dir = tmp_path / "splits"
+    splits_dir.mkdir()
+    for split in ('train', 'val', 'test'):
+        pd.read_csv(f'data/splits/{split}_metadata.csv').head(900).to_csv(
+            splits_dir / f"{split}_metadata.csv", index=False)
+
+    with open('config/pipeline_config.yaml') as f:
+        config = yaml.safe_load(f)
+    config['data']['splits_dir'] = str(splits_dir)
+    config['training']['chunked'].update(enabled=True, chunk_rows=200, epochs=3)
+    path = tmp_path / "config.yaml"
+    with open(path, 'w') as f:
+        yaml.safe_dump(config, f)
+    return path
+
+class TestLabels:
+    def test_edges_match_pd_cut(self, tmp_path):
+        scores = pd.Series(np.random.RandomState(0).uniform(0.1, 0.9, 500))
+        expected = pd.cut(scores, bins=3, labels=LABELS)
+        trainer = BaselineModelTrainer(tmp_path / "models")
+        labels = trainer.create_labels(scores.to_frame('quality_score'))
+        assert labels.tolist() == expected.tolist()
+        fixed = trainer.create_labels(pd.DataFrame({'quality_score': [-1.0, 5.0]}),
+                                      label_edges(scores.min(), scores.max()))
+        assert fixed.tolist() == ['low', 'high']
+
+    def test_confusion_metrics_match_sklearn(self):
+        rng = np.random.RandomState(1)
+        y_true = rng.choice(LABELS, 300)
+        y_pred = np.where(rng.uniform(size=300) < 0.7, y_true, rng.choice(LABELS, 300))
+        metrics = confusion_metrics(confusion_matrix(y_true, y_pred, labels=LABELS))
+        assert metrics['accuracy'] == pytest.approx(accuracy_score(y_true, y_pred))
+        assert metrics['f1'] == pytest.approx(f1_score(y_true, y_pred, average='weighted'))
+
+class TestChunkedTraining:
+    def test_chunked_training_exports_fused_model(self, chunked_config, tmp_path):
+        from src.model_export import load_inference_model
+        trainer = BaselineModelTrainer(tmp_path / "models", config_path=chunked_config)
+        metadata = trainer.train()
+        assert metadata['model_type'] == 'SGDClassifier'
+        assert metadata['train_samples'] == 900
+        assert metadata['memory']['chunk_rows'] == 200
+        assert metadata['metrics']['val_accuracy'] > 0.8
+
+        X = trainer.prepare_features(pd.read_csv(tmp_path / "splits" / "test_metadata.csv"))
+        fused = load_inference_model(tmp_path / "models" / "baseline_model_fused")
+        np.testing.assert_allclose(fused.predict_proba(X.to_numpy(dtype=float)),
+                                   trainer.model.predict_proba(trainer.scaler.transform(X)), atol=1e-9)
+
+class TestCompressedTraining:
+    def test_mlflow_logs_the_selected_model_type(self, chunked_config, tmp_path):
+        import mlflow
+        with open(chunked_config) as f:
+            config = yaml.safe_load(f)
+        config['training']['chunked']['enabled'] = False
+        config['training']['model'].update(n_estimators=10, max_depth=4)
+        config['training']['compression'].update(enabled=True, tree_counts=[1, 3], distill_depths=[4])
+        with open(chunked_config, 'w') as f:
+            yaml.safe_dump(config, f)
+
+        metadata = BaselineModelTrainer(tmp_path / "models", config_path=chunked_config).train()
+        run = mlflow.search_runs(search_all_experiments=True, output_format="list")[0]
+        assert run.data.params["model_type"] == metadata["model_type"]
+        assert metadata["source_hyperparameters"]["n_estimators"] == 10
+        served = metadata["hyperparameters"]
+        assert served["n_estimators"] == int(run.data.params["n_estimators"]) < 10
+        assert served["max_depth"] <= 4
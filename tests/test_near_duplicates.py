@@ -0,0 +1,71 @@
+"""
+Near-Duplicate Detection Tests
+"""
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+cv2 = pytest.importorskip("cv2")
+from src.near_duplicates import MultiIndexHashIndex, dhash, duplicate_groups, hamming, hash_matrix, source_key
+
+def brute_force_pairs(hashes, radius):
+    codes = hash_matrix(hashes)
+    dist = hamming(codes[:, None, :], codes[None, :, :])
+    i, j = np.nonzero(np.triu(dist <= radius, k=1))
+    return set(zip(i.tolist(), j.tolist()))
+
+class TestMultiIndexHashIndex:
+    @pytest.mark.parametrize("radius", [0, 3, 8, 20])
+    def test_matches_brute_force(self, radius):
+        rng = np.random.RandomState(radius)
+        codes = rng.randint(0, 256, size=(400, 32), dtype=np.uint8)
+        near = codes[:150].copy()
+        for row in near:
+            for bit in rng.choice(256, rng.randint(0, radius + 3), replace=False):
+                row[bit // 8] ^= 1 << (bit % 8)
+        hashes = [c.tobytes().hex() for c in np.vstack([codes, near])]
+        pairs = MultiIndexHashIndex(hashes, radius).pairs()
+        assert set(map(tuple, pairs.tolist())) == brute_force_pairs(hashes, radius)
+
+    def test_oversized_buckets_are_verified_not_dropped(self):
+        hashes = ["00" * 32] * 100 + ["ff" * 32] * 3
+        pairs = MultiIndexHashIndex(hashes, radius=4, max_bucket=8).pairs()
+        assert len(pairs) == 100 * 99 // 2 + 3
+
+class TestDhash:
+    def test_survives_reencoding_and_resizing(self):
+        def page(seed):
+            rng = np.random.RandomState(seed)
+            image = np.full((400, 300), 230, dtype=np.uint8)
+            for _ in range(40):
+                y, x = rng.randint(0, 380), rng.randint(0, 280)
+                image[y:y + rng.randint(10, 60), x:x + rng.randint(10, 120)] = rng.randint(0, 200)
+            return image
+
+        page, other = page(0), page(1)
+        ok, encoded = cv2.imencode(".jpg", cv2.resize(page, (240, 320)), [cv2.IMWRITE_JPEG_QUALITY, 60])
+        copy = cv2.imdecode(encoded, cv2.IMREAD_GRAYSCALE)
+
+        distance = lambda a, b: int(hamming(hash_matrix([dhash(a)]), hash_matrix([dhash(b)]))[0])
+        assert distance(page, copy) <= 8
+        assert distance(page, other) > 64
+
+class TestDuplicateGroups:
+    def test_groups_are_transitive_and_include_source_names(self):
+        a = "00" * 32
+        b = "01" + "00" * 31
+        c = "03" + "00" * 31
+        far = "ff" * 32
+        paths = [
+            "raw/train/x.jpg", "raw/train/y.jpg", "raw/valid/z.jpg",
+            "raw/train/1000-receipt_jpg.rf." + "a" * 32 + ".jpg",
+            "raw/test/1000-receipt_jpg.rf." + "b" * 32 + ".jpg",
+            "raw/test/solo.jpg",
+        ]
+        result = duplicate_groups([a, b, c, far, None, "f0" * 32], radius=1, source_paths=paths)
+        assert result["labels"].tolist() == [0, 0, 0, 3, 3, 5]
+        assert result["groups"] == 3
+        assert source_key(paths[3]) == "1000-receipt_jpg"
+        assert source_key(paths[0]) is None
@@ -0,0 +1,55 @@
+"""
+SROIE Preprocessing Tests
+"""
+import csv
+import json
+import pytest
+from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pytest.importorskip("loguru")
+from src.preprocess_sroie import collect_pairs, iter_rows, main, normalize_total, parse_label_json
+
+@pytest.fixture
+def label_dir(tmp_path):
+    labels = tmp_path / "labels"
+    labels.mkdir()
+    for i in range(50):
+        label = {"company": f"SHOP {i}", "date": "01/01/2019", "total": f"1,{i:03d}.50"}
+        if i % 10 == 0:
+            del label["date"]
+        (labels / f"X{i:03d}.txt").write_text(json.dumps(label))
+    (labels / "bom.txt").write_bytes(b"\xef\xbb\xbf" + json.dumps({"company": "BOM", "date": "x", "total": "9"}).encode())
+    (labels / "broken.txt").write_text("{not json")
+    (labels / "notes.md").write_text("ignored")
+    return labels
+
+class TestPreprocessSroie:
+    def test_normalize_total(self):
+        assert normalize_total("RM 1,234.50") == 1234.5
+        assert normalize_total("TOTAL 12 / 15.90") == 15.9
+        assert normalize_total("") is None
+        assert normalize_total("n/a") is None
+
+    def test_bom_and_broken_files(self, label_dir):
+        assert parse_label_json(label_dir / "bom.txt")["company"] == "BOM"
+        assert parse_label_json(label_dir / "broken.txt") == {}
+
+    @pytest.mark.parametrize("executor", ["process", "thread"])
+    def test_parallel_matches_serial(self, label_dir, executor):
+        serial = [row for chunk in iter_rows(label_dir, workers=1, chunk_size=7) for row in chunk]
+        parallel = [row for chunk in iter_rows(label_dir, workers=2, chunk_size=7, executor=executor)
+                    for row in chunk]
+        assert parallel == serial
+        assert len(serial) == 52
+        assert sum(row["has_all"] for row in serial) == 46
+
+    def test_main_streams_csv_and_reports_throughput(self, label_dir, tmp_path):
+        report = main(["--input", str(label_dir), "--output-dir", str(tmp_path / "out"),
+                       "--workers", "2", "--chunk-size", "8"])
+        assert report["records"] == 52 and report["files_per_s"] > 0
+        with open(tmp_path / "out" / "sroie_cleaned.csv", newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == 52
+        assert len(collect_pairs(label_dir)) == 52
@@ -0,0 +1,136 @@
+"""
+Request Log and Drift Monitor Tests
+"""
+import json
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from api.request_log import RequestLogger
+from src.drift_monitor import drift_report, ks_statistic, load_requests, psi
+from src.alert_system import AlertSystem
+from src.features import RAW_FEATURES
+
+def document(rng, quality_low=0.2, quality_high=0.9):
+    return {
+        'file_size_bytes': int(rng.integers(5000, 200000)),
+        'image_width': int(rng.integers(200, 2000)),
+        'image_height': int(rng.integers(200, 2000)),
+        'quality_score': float(rng.uniform(quality_low, quality_high)),
+        'has_blur': bool(rng.integers(2)),
+    }
+
+def read_lines(log_dir):
+    return [json.loads(line) for path in sorted(Path(log_dir).glob('requests-*.jsonl'))
+            for line in path.read_text().splitlines()]
+
+class TestRequestLogger:
+    def test_stop_flushes_every_record(self, tmp_path):
+        logger = RequestLogger(tmp_path, flush_interval_s=0.05)
+        logger.start()
+        for i in range(500):
+            logger.log({'ts': time.time(), 'i': i, 'inputs': {'x': np.arange(3)}})
+        logger.stop()
+        records = read_lines(tmp_path)
+        assert [r['i'] for r in records] == list(range(500))
+        assert records[0]['inputs'] == {'x': [0, 1, 2]}
+        stats = logger.stats()
+        assert stats['written'] == 500 and stats['dropped'] == 0 and not stats['running']
+
+    def test_segments_rotate_by_size(self, tmp_path):
+        logger = RequestLogger(tmp_path, batch_size=10, segment_max_bytes=200)
+        logger.start()
+        for i in range(100):
+            logger.log({'i': i, 'padding': 'x' * 50})
+        logger.stop()
+        assert len(list(tmp_path.glob('requests-*.jsonl'))) > 1
+        assert [r['i'] for r in read_lines(tmp_path)] == list(range(100))
+
+    def test_full_queue_drops_instead_of_blocking(self, tmp_path):
+        logger = RequestLogger(tmp_path, max_queue=5)
+        accepted = [logger.log({'i': i}) for i in range(8)]
+        assert accepted == [True] * 5 + [False] * 3
+        assert logger.stats()['dropped'] == 3
+
+    def test_stop_with_stuck_writer_and_full_queue_returns(self, tmp_path):
+        import threading
+        writing, release = threading.Event(), threading.Event()
+        logger = RequestLogger(tmp_path, max_queue=5, batch_size=1)
+
+        def stuck_write(records):
+            writing.set()
+            release.wait(5)
+        logger._write = stuck_write
+        logger.start()
+        logger.log({'i': 0})
+        assert writing.wait(5)
+        for i in range(1, 20):
+            logger.log({'i': i})
+        assert logger.stats()['queued'] == 5
+        logger.stop(timeout=0.1)
+        release.set()
+
+class TestDriftMonitor:
+    def test_psi_and_ks_separate_shifted_samples(self):
+        rng = np.random.default_rng(0)
+        reference = rng.normal(size=5000)
+        assert psi(reference, rng.normal(size=5000)) < 0.05
+        assert ks_statistic(reference, rng.normal(size=5000)) < 0.05
+        assert psi(reference, rng.normal(1.0, size=5000)) > 0.2
+        assert ks_statistic(reference, rng.normal(1.0, size=5000)) > 0.3
+        assert psi(np.array([0.0, 1.0] * 50), np.ones(100)) > 0.2
+
+    def test_batch_records_expand_to_documents(self, tmp_path):
+        rng = np.random.default_rng(0)
+        docs = [document(rng) for _ in range(4)]
+        logger = RequestLogger(tmp_path)
+        logger.start()
+        logger.log({'ts': 1.0, 'endpoint': '/predict', 'inputs': docs[0],
+                    'timings_ms': {'total_ms': 1.5}})
+        logger.log({'ts': 2.0, 'endpoint': '/predict/batch',
+                    'inputs': {name: np.array([d[name] for d in docs[1:]]) for name in RAW_FEATURES},
+                    'timings_ms': {'total_ms': 3.0}})
+        logger.stop()
+        inputs, timings = load_requests(tmp_path)
+        assert inputs['ts'].tolist() == [1.0, 2.0, 2.0, 2.0]
+        assert inputs['quality_score'].tolist() == [d['quality_score'] for d in docs]
+        assert timings['rows'].tolist() == [1, 3]
+        assert timings['total_ms'].tolist() == [1.5, 3.0]
+
+    def test_report_flags_shifted_traffic(self, tmp_path):
+        rng = np.random.default_rng(0)
+        splits_dir = tmp_path / 'splits'
+        splits_dir.mkdir()
+        pd.DataFrame([document(rng) for _ in range(1000)]).to_csv(splits_dir / 'train_metadata.csv', index=False)
+
+        logger = RequestLogger(tmp_path / 'logs')
+        logger.start()
+        now = time.time()
+        for i in range(300):
+            logger.log({'ts': now + i * 0.01, 'endpoint': '/predict', 'inputs': document(rng, 0.0, 0.3),
+                        'timings_ms': {'features_ms': 0.1, 'total_ms': 1.0}})
+        logger.stop()
+
+        report = drift_report(tmp_path / 'logs', splits_dir, window_minutes=60, min_window_rows=100)
+        assert report['documents'] == 300
+        metrics = report['alert_metrics']
+        assert 'quality_score' in metrics['drifted_features']
+        assert 'image_width' not in metrics['drifted_features']
+        assert metrics['latency_p99_ms'] == pytest.approx(1.0)
+        violations = AlertSystem().check_thresholds(metrics)
+        assert 'Feature drift (PSI) exceeds threshold' in violations
+        lenient = drift_report(tmp_path / 'logs', splits_dir, psi_threshold=metrics['max_psi'])
+        assert lenient['alert_metrics']['drifted_features'] == []
+
+    def test_empty_log_reports_no_drift(self, tmp_path):
+        splits_dir = tmp_path / 'splits'
+        splits_dir.mkdir()
+        rng = np.random.default_rng(0)
+        pd.DataFrame([document(rng) for _ in range(50)]).to_csv(splits_dir / 'train_metadata.csv', index=False)
+        report = drift_report(tmp_path / 'logs', splits_dir)
+        assert report['documents'] == 0 and report['windows'] == []
+        assert AlertSystem().check_thresholds(report['alert_metrics']) == []
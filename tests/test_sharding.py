@@ -0,0 +1,86 @@
+"""
+Sharded Ingestion Tests
+"""
+import pytest
+import numpy as np
+import yaml
+from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+cv2 = pytest.importorskip("cv2")
+import pandas as pd
+from src.data_pipeline import DataPipeline
+from src.ingestion import scan_images
+from src.sharding import group_shards, ingest_shard, merge_shards, plan_shards, run_sharded
+
+def write_images(root, n):
+    # Nested like data/raw: <dataset>/<split>/<class>/<image>
+    rng = np.random.RandomState(0)
+    for i in range(n):
+        path = root / f"dataset{i % 2 + 1}" / ("train" if i % 3 else "test") / "receipt" / f"img_{i:03d}.jpg"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        cv2.imwrite(str(path), rng.randint(0, 255, size=(40 + i, 60, 3), dtype=np.uint8))
+
+def make_config(tmp_path, raw_dir, name):
+    with open('config/pipeline_config.yaml') as f:
+        config = yaml.safe_load(f)
+    config['data'].update(
+        raw_dir=str(raw_dir),
+        processed_dir=str(tmp_path / name / "processed"),
+        splits_dir=str(tmp_path / name / "splits")
+    )
+    path = tmp_path / f"{name}.yaml"
+    path.write_text(yaml.safe_dump(config))
+    return str(path)
+
+@pytest.fixture
+def raw_dir(tmp_path):
+    raw = tmp_path / "raw"
+    write_images(raw, 12)
+    return raw
+
+class TestShardPlan:
+    def test_every_image_in_exactly_one_stable_shard(self, raw_dir):
+        paths = scan_images(raw_dir)
+        shards = group_shards(paths, raw_dir, prefix_chars=1)
+        assigned = [path for shard in shards.values() for path in shard]
+        assert sorted(assigned) == sorted(str(p) for p in paths)
+        assert {shard_id.rsplit("-", 1)[0] for shard_id in shards} == {"dataset1", "dataset2"}
+        assert all(path.startswith(str(raw_dir / shard_id.rsplit("-", 1)[0]))
+                   for shard_id, shard in shards.items() for path in shard)
+        assert group_shards(reversed(paths), raw_dir, prefix_chars=1) == shards
+        assert len(group_shards(paths, raw_dir, prefix_chars=0)) == 2
+
+class TestShardedIngestion:
+    def test_matches_single_process_pipeline(self, tmp_path, raw_dir):
+        direct = DataPipeline(make_config(tmp_path, raw_dir, "direct")).run_pipeline(workers=1)
+        sharded = run_sharded(make_config(tmp_path, raw_dir, "sharded"), parallel=1)
+
+        assert sharded["changes"] == direct["changes"]
+        assert len(sharded["shards"]) > 2
+        assert sum(shard["records"] for shard in sharded["shards"]) == 12
+        assert all(shard["ingest_s"] > 0 for shard in sharded["shards"])
+        assert sharded["timings"]["critical_path_s"] <= sharded["timings"]["total_ingest_s"]
+        expected = pd.read_csv(direct["metadata_path"]).drop(columns="timestamp")
+        actual = pd.read_csv(sharded["metadata_path"]).drop(columns="timestamp")
+        pd.testing.assert_frame_equal(actual, expected)
+        assert not (tmp_path / "sharded" / "processed" / ".shards").exists()
+
+    def test_incremental_run_without_shards_still_merges(self, tmp_path, raw_dir):
+        config_path = make_config(tmp_path, raw_dir, "sharded")
+        run_sharded(config_path, parallel=1)
+        scan_images(raw_dir)[0].unlink()
+
+        assert plan_shards(config_path) == []
+        report = merge_shards(config_path)
+        assert report["changes"] == {"skipped": 11, "added": 0, "updated": 0, "removed": 1}
+        assert report["documents"] == 11
+
+    def test_missing_shard_output_fails_merge(self, tmp_path, raw_dir):
+        config_path = make_config(tmp_path, raw_dir, "sharded")
+        shards = plan_shards(config_path)
+        for shard in shards[1:]:
+            ingest_shard(shard["shard_id"], config_path)
+        with pytest.raises(FileNotFoundError, match=shards[0]["shard_id"]):
+            merge_shards(config_path)
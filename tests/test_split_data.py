@@ -0,0 +1,87 @@
+"""
+Data Splitter Tests
+"""
+import csv
+import pytest
+from pathlib import Path
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.split_data import SPLITS, assign_split, main, split_metadata
+
+def write_metadata(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+def read_splits(output_dir):
+    assignment = {}
+    for split in SPLITS:
+        with open(Path(output_dir) / f"{split}_metadata.csv", newline="") as f:
+            for row in csv.DictReader(f):
+                assignment[row["doc_id"]] = split
+    return assignment
+
+@pytest.fixture
+def rows():
+    bins = ["low", "medium", "high"]
+    return [
+        {"doc_id": f"doc_{i:06d}", "duplicate_group": f"doc_{i - i % 4:06d}",
+         "quality_bin": bins[i % 3], "has_all": str(i % 5 != 0)}
+        for i in range(4000)
+    ]
+
+class TestSplitData:
+    def test_groups_stay_together_and_ratios_hold(self, rows, tmp_path):
+        write_metadata(tmp_path / "all.csv", rows)
+        report = split_metadata(tmp_path / "all.csv", tmp_path / "splits")
+        assignment = read_splits(tmp_path / "splits")
+        assert len(assignment) == report["rows"] == 4000
+        for row in rows:
+            assert assignment[row["doc_id"]] == assignment[row["duplicate_group"]]
+        for split, ratio in zip(SPLITS, (0.7, 0.15, 0.15)):
+            assert report["ratios"][split] == pytest.approx(ratio, abs=0.04)
+        assert set(report["strata"]) == {"low", "medium", "high"}
+        assert all(s["max_ratio_error"] < 0.06 for s in report["strata"].values())
+
+    def test_assignment_is_stable_across_runs(self, rows, tmp_path):
+        write_metadata(tmp_path / "all.csv", rows[:3000])
+        split_metadata(tmp_path / "all.csv", tmp_path / "first")
+        write_metadata(tmp_path / "all.csv", list(reversed(rows)))
+        split_metadata(tmp_path / "all.csv", tmp_path / "second")
+        first, second = read_splits(tmp_path / "first"), read_splits(tmp_path / "second")
+        assert all(second[doc_id] == split for doc_id, split in first.items())
+        assert assign_split("doc_000001", seed=1) == assign_split("doc_000001", seed=1)
+
+    def test_stratified_thresholds_match_ratios_per_bin(self, rows, tmp_path):
+        write_metadata(tmp_path / "all.csv", rows)
+        plain = split_metadata(tmp_path / "all.csv", tmp_path / "plain")
+        report = split_metadata(tmp_path / "all.csv", tmp_path / "splits", stratify=True)
+        assignment = read_splits(tmp_path / "splits")
+        assert report["stratified"] and not plain["stratified"]
+        for row in rows:
+            assert assignment[row["doc_id"]] == assignment[row["duplicate_group"]]
+        # Within one 4-row group of the exact ratios, well inside hash-only drift
+        for stratum in report["strata"].values():
+            n = sum(stratum["counts"].values())
+            assert stratum["max_ratio_error"] <= 4 / n + 1e-9
+        assert max(s["max_ratio_error"] for s in report["strata"].values()) < \
+            max(s["max_ratio_error"] for s in plain["strata"].values())
+        split_metadata(tmp_path / "all.csv", tmp_path / "again", stratify=True)
+        assert read_splits(tmp_path / "again") == assignment
+
+    def test_falls_back_to_row_key_and_filters(self, rows, tmp_path):
+        for row in rows:
+            del row["duplicate_group"]
+        write_metadata(tmp_path / "all.csv", rows)
+        report = split_metadata(tmp_path / "all.csv", tmp_path / "splits", where={"has_all": "True"})
+        assert report["group_column"] == "doc_id"
+        assert report["rows"] == 3200
+        assert report["filtered_out"] == 800
+
+    def test_cli_writes_trainer_file_names(self, rows, tmp_path):
+        write_metadata(tmp_path / "all.csv", rows)
+        main(["--input", str(tmp_path / "all.csv"), "--output-dir", str(tmp_path / "splits")])
+        for split in SPLITS:
+            assert (tmp_path / "splits" / f"{split}_metadata.csv").exists()